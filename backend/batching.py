@@ -0,0 +1,96 @@
+"""
+📦 Micro-batching des requêtes
+Les requêtes concurrentes sont regroupées en lots pour une seule passe du
+modèle: un lot part dès qu'il est plein ou que l'attente max est écoulée
+"""
+
+import asyncio
+import time
+
+# ============================================================================
+# MICRO-BATCHER
+# ============================================================================
+class MicroBatcher:
+    """
+    File asynchrone devant une fonction de lot synchrone.
+
+    submit(item) attend le résultat de son item. Une seule tâche consomme la
+    file: le premier item ouvre un lot, les suivants le rejoignent jusqu'à
+    max_batch_size ou jusqu'à max_wait secondes. Le lot est exécuté par
+    run_batch(items) -> résultats (même ordre) dans `executor`, hors de la
+    boucle asyncio; pendant ce temps les nouvelles requêtes s'accumulent et
+    forment le lot suivant.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait=0.01, executor=None):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max_wait
+        self.executor = executor
+        self.stats = {'batches': 0, 'items': 0, 'max_batch': 0}
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item):
+        """
+        Ajoute un item au prochain lot et attend son résultat.
+        Renvoie (résultat, attente en file en secondes).
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    def mean_batch_size(self):
+        return self.stats['items'] / self.stats['batches'] if self.stats['batches'] else 0.0
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # Le lot se remplit jusqu'à l'échéance du premier item
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Requêtes abandonnées par leur client (déconnexion)
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.run_batch, [item for item, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
+            for (_, future, queued_at), result in zip(batch, results):
+                if not future.done():
+                    future.set_result((result, started - queued_at))
@@ -0,0 +1,84 @@
+"""
+🚦 Test de charge de l'API
+Envoie des requêtes /predict concurrentes et mesure latences et débit.
+
+Comparer avec et sans micro-batching (même machine):
+    MAX_BATCH_SIZE=1 uvicorn main:app --port 8000     # une passe par requête
+    uvicorn main:app --port 8000                      # micro-lots
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 16 --requests 128
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import sys
+import time
+
+import httpx
+import numpy as np
+from PIL import Image
+
+
+def make_payload(image_path=None):
+    """Image envoyée: fichier fourni, ou image synthétique 640x480"""
+    if image_path:
+        with open(image_path, 'rb') as f:
+            return f.read()
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray((rng.random((480, 640, 3)) * 255).astype(np.uint8)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+async def run(url, payload, total, concurrency):
+    latencies = []
+    batch_sizes = []
+    pending = iter(range(total))
+
+    async def worker(client):
+        for _ in pending:
+            start = time.perf_counter()
+            response = await client.post(
+                f"{url}/predict", files={'file': ('image.jpg', payload, 'image/jpeg')}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            batch_sizes.append(response.json()['batch_size'])
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        # Préchauffage
+        await client.post(f"{url}/predict", files={'file': ('image.jpg', payload, 'image/jpeg')})
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'throughput_rps': total / elapsed,
+        'latency_ms': {
+            'mean': float(latencies.mean()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95))
+        },
+        'mean_batch_size': float(np.mean(batch_sizes))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de l'API /predict")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--image", default=None, help="Image envoyée (défaut: synthétique)")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args.url, make_payload(args.image), args.requests, args.concurrency))
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+🗑️ Détecteur de Poubelles - API FastAPI
+Classification PLEINE/VIDE avec YOLOv9, mêmes fonctions de détection que
+l'application Streamlit (streamlit_app/detection.py)
+
+Les requêtes concurrentes sont regroupées en micro-lots (batching.py).
+
+Démarrage local:
+    uvicorn main:app --host 127.0.0.1 --port 8000
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import List
+
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+# La logique de détection est partagée avec l'application Streamlit
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "streamlit_app"))
+
+from detection import build_result, detect_raw_batch, ingest, DEFAULT_BATCH_SIZE  # noqa: E402
+from backends import find_weights, load_detector, warm_up, DEFAULT_BACKEND  # noqa: E402
+from metrics import MetricsRegistry  # noqa: E402
+from gate import SceneGate, GATE_THRESHOLD  # noqa: E402
+from workers import WorkerPool  # noqa: E402
+
+from batching import MicroBatcher  # noqa: E402
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", DEFAULT_BACKEND)
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+MAX_BATCH_WAIT_MS = float(os.environ.get("MAX_BATCH_WAIT_MS", 10))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0))    # > 0: pool de processus (workers.py)
+MAX_UPLOAD_MB = 10
+MAX_FILES = 32
+ALLOWED_TYPES = ('image/jpeg', 'image/png', 'image/jpg')
+CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*").split(",")
+
+state = {'model': None, 'model_path': None, 'batcher': None, 'pool': None}
+metrics = MetricsRegistry()
+# Caméras fixes: une source (?source=) dont la scène n'a pas changé réutilise sa dernière analyse
+scene_gate = SceneGate(metrics=metrics) if GATE_THRESHOLD > 0 else None
+
+# ============================================================================
+# CYCLE DE VIE
+# ============================================================================
+@asynccontextmanager
+async def lifespan(app):
+    weights = find_weights()
+    if weights is not None:
+        if INFERENCE_WORKERS > 0:
+            # Lots répartis sur des processus; poids mmap partagés avec le modèle local (métadonnées)
+            state['pool'] = await run_in_threadpool(WorkerPool, weights, INFERENCE_WORKERS)
+            state['model'] = await run_in_threadpool(load_detector, weights, 'pytorch-mmap')
+            infer = state['pool'].detect_batch
+        else:
+            state['model'] = await run_in_threadpool(load_detector, weights, MODEL_BACKEND)
+            # Avant d'accepter des requêtes: la première ne paie pas l'initialisation
+            await run_in_threadpool(warm_up, state['model'], (1, MAX_BATCH_SIZE))
+            infer = lambda images: list(detect_raw_batch(images, state['model'], len(images)))
+        state['model_path'] = str(weights.absolute())
+
+        # Un seul thread pour le modèle: le prédicteur YOLO n'est pas thread-safe
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        batcher = MicroBatcher(
+            infer,
+            max_batch_size=MAX_BATCH_SIZE,
+            max_wait=MAX_BATCH_WAIT_MS / 1000,
+            executor=executor
+        )
+        await batcher.start()
+        state['batcher'] = batcher
+    try:
+        yield
+    finally:
+        if state['batcher'] is not None:
+            await state['batcher'].stop()
+            state['batcher'].executor.shutdown(wait=False)
+        if state['pool'] is not None:
+            state['pool'].close()
+
+
+app = FastAPI(
+    title="Détecteur de Poubelles API",
+    description="Classification PLEINE/VIDE de poubelles avec YOLOv9",
+    version="1.1.0",
+    lifespan=lifespan
+)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=CORS_ORIGINS,
+    allow_methods=["*"],
+    allow_headers=["*"]
+)
+
+# ============================================================================
+# DÉTECTION
+# ============================================================================
+async def read_image(file):
+    """Valide et décode un upload (décodage hors de la boucle asyncio)"""
+    if file.content_type not in ALLOWED_TYPES:
+        raise HTTPException(status_code=400, detail=f"Type de fichier non supporté: {file.content_type}")
+    data = await file.read()
+    if len(data) > MAX_UPLOAD_MB * 2**20:
+        raise HTTPException(status_code=413, detail=f"Fichier trop volumineux (max {MAX_UPLOAD_MB} MB)")
+    try:
+        # Décodage réduit + letterbox: la pleine résolution n'est jamais matérialisée
+        return await run_in_threadpool(ingest, data)
+    except Exception:
+        raise HTTPException(status_code=400, detail=f"Image illisible: {file.filename}")
+
+
+async def predict_image(image, confidence, source=None):
+    """Détection d'une image via le micro-batcher; réponse au format /predict"""
+    if state['batcher'] is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé (best.pt introuvable)")
+
+    raw, pending = None, None
+    if source is not None and scene_gate is not None:
+        raw, pending = scene_gate.check(source, image)
+    if raw is None:
+        raw, queue_wait = await state['batcher'].submit(image)
+        if pending is not None:
+            scene_gate.record(pending, raw)
+    else:
+        queue_wait = 0.0
+    result = await run_in_threadpool(build_result, raw, confidence)
+
+    metrics.observe('queue_wait', queue_wait)
+    metrics.record_timings(result['timings'])
+
+    return {
+        'success': True,
+        'status': result['status'],
+        'emoji': result['emoji'],
+        'color': result['color'],
+        'message': result['message'],
+        'confidence': round(result['confidence'], 4),
+        'confidence_percent': round(result['confidence'] * 100, 2),
+        'class_name': result.get('class_name'),
+        'bbox': result.get('bbox'),
+        'num_detections': result['num_detections'],
+        'batch_size': raw['batch_size'],
+        'reused': result['reused'],
+        'queue_wait': round(queue_wait, 4),
+        'processing_time': round(result['processing_time'] + queue_wait, 4)
+    }
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+@app.get("/")
+async def root():
+    return {
+        'message': "🗑️ Détecteur de Poubelles API",
+        'docs': "/docs",
+        'endpoints': ["/health", "/predict", "/predict/batch", "/model-info", "/metrics", "/metrics.json"]
+    }
+
+
+@app.get("/health")
+async def health():
+    return {
+        'status': "healthy" if state['model'] is not None else "degraded",
+        'model_loaded': state['model'] is not None,
+        'model_path': state['model_path']
+    }
+
+
+@app.get("/model-info")
+async def model_info():
+    if state['model'] is None:
+        raise HTTPException(status_code=503, detail="Modèle non chargé (best.pt introuvable)")
+    return {
+        'model_path': state['model_path'],
+        'backend': 'pytorch-mmap' if state['pool'] is not None else MODEL_BACKEND,
+        'inference_workers': len(state['pool'].workers) if state['pool'] is not None else 0,
+        'classes': state['model'].names,
+        'max_batch_size': MAX_BATCH_SIZE,
+        'max_batch_wait_ms': MAX_BATCH_WAIT_MS
+    }
+
+
+@app.post("/predict")
+async def predict(file: UploadFile = File(...),
+                  confidence: float = Query(0.25, ge=0.0, le=1.0),
+                  source: str = Query(None, description="Caméra fixe: active le filtre de changement de scène")):
+    image = await read_image(file)
+    return await predict_image(image, confidence, source)
+
+
+@app.post("/predict/batch")
+async def predict_batch(files: List[UploadFile] = File(...),
+                        confidence: float = Query(0.25, ge=0.0, le=1.0)):
+    if len(files) > MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Trop de fichiers (max {MAX_FILES})")
+    images = await asyncio.gather(*(read_image(file) for file in files))
+    # Soumises ensemble: les images rejoignent les mêmes micro-lots
+    results = await asyncio.gather(*(predict_image(image, confidence) for image in images))
+    for file, result in zip(files, results):
+        result['filename'] = file.filename
+    return {'success': True, 'count': len(results), 'results': results}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    return metrics.to_prometheus()
+
+
+@app.get("/metrics.json")
+async def metrics_json():
+    snapshot = metrics.snapshot()
+    batcher = state['batcher']
+    if batcher is not None:
+        snapshot['batching'] = dict(batcher.stats, mean_batch_size=batcher.mean_batch_size())
+    if scene_gate is not None:
+        snapshot['scene_gate'] = scene_gate.snapshot()
+    if state['pool'] is not None:
+        snapshot['pool'] = dict(state['pool'].stats, memory=await run_in_threadpool(state['pool'].memory))
+    return snapshot
@@ -0,0 +1,258 @@
+"""
+📈 Agrégats en flux
+Comptes PLEINE/VIDE/AUCUNE_DETECTION par intervalle de temps et
+distributions (latence, confiance) en DDSketch: mémoire constante, mise à
+jour O(1) par résultat, fusionnables entre sessions et entre processus
+
+Fusion des instantanés de plusieurs processus:
+    python aggregates.py dossier_instantanes/
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SKETCH_ACCURACY = 0.01      # Erreur relative des quantiles (1%)
+SKETCH_MAX_BINS = 2048      # Borne mémoire d'un sketch
+BUCKET_SECONDS = 3600       # Intervalle des comptes par statut
+BUCKET_RETENTION = 7 * 24   # Intervalles gardés (7 jours à l'heure)
+PERSIST_INTERVAL = 10.0     # Secondes entre deux instantanés sur disque
+
+# ============================================================================
+# DDSKETCH
+# ============================================================================
+class DDSketch:
+    """
+    Sketch de quantiles à erreur relative garantie (DDSketch).
+
+    Chaque valeur positive tombe dans le bin ceil(log_gamma(x)); deux
+    sketches de même précision se fusionnent en additionnant leurs bins.
+    Au-delà de max_bins, les bins les plus bas sont regroupés.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_ACCURACY, max_bins=SKETCH_MAX_BINS):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Sketches de précisions différentes")
+        for index, n in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def _collapse(self):
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': {str(k): v for k, v in self.bins.items()},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum,
+            'min': self.min if self.count else None,
+            'max': self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(k): v for k, v in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+# ============================================================================
+# AGRÉGATS
+# ============================================================================
+class StreamingAggregates:
+    """
+    Agrégats thread-safe mis à jour à chaque résultat de build_result.
+
+    persist_path: si fourni, un instantané JSON y est réécrit au plus toutes
+    les persist_interval secondes; merge_snapshots() combine ceux de
+    plusieurs processus.
+    """
+
+    def __init__(self, bucket_seconds=BUCKET_SECONDS, retention=BUCKET_RETENTION,
+                 persist_path=None, persist_interval=PERSIST_INTERVAL):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.buckets = {}       # début d'intervalle -> {statut: nombre}
+        self.latency = DDSketch()
+        self.confidence = DDSketch()
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.persist_interval = persist_interval
+        self._persisted_at = 0.0
+        self._lock = threading.Lock()
+        self._persist_lock = threading.Lock()   # Une seule écriture d'instantané à la fois
+
+    def update(self, result):
+        """Ajoute un résultat: O(1)"""
+        bucket = int(result['timestamp'].timestamp()) // self.bucket_seconds * self.bucket_seconds
+        with self._lock:
+            counts = self.buckets.get(bucket)
+            if counts is None:
+                counts = self.buckets[bucket] = {}
+                self._evict()
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            self.latency.add(result['processing_time'])
+            if result['status'] != 'AUCUNE_DETECTION':
+                self.confidence.add(result['confidence'])
+        self._maybe_persist()
+
+    def merge(self, other):
+        with self._lock:
+            for bucket, counts in other.buckets.items():
+                mine = self.buckets.setdefault(bucket, {})
+                for status, n in counts.items():
+                    mine[status] = mine.get(status, 0) + n
+            while len(self.buckets) > self.retention:
+                self._evict()
+            self.latency.merge(other.latency)
+            self.confidence.merge(other.confidence)
+
+    def hourly(self):
+        """Intervalles triés: comptes par statut et taux de poubelles pleines"""
+        with self._lock:
+            rows = []
+            for bucket in sorted(self.buckets):
+                counts = dict(self.buckets[bucket])
+                classified = counts.get('PLEINE', 0) + counts.get('VIDE', 0)
+                rows.append({
+                    'bucket': bucket,
+                    'counts': counts,
+                    'full_rate': counts.get('PLEINE', 0) / classified if classified else None
+                })
+            return rows
+
+    def summary(self, quantiles=(0.5, 0.95, 0.99)):
+        with self._lock:
+            return {
+                'count': self.latency.count,
+                'latency': {'mean': self.latency.mean(),
+                            **{f"p{round(q * 100)}": self.latency.quantile(q) for q in quantiles}},
+                'confidence': {'mean': self.confidence.mean(),
+                               **{f"p{round(q * 100)}": self.confidence.quantile(q) for q in quantiles}}
+            }
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'bucket_seconds': self.bucket_seconds,
+                'buckets': {str(k): dict(v) for k, v in self.buckets.items()},
+                'latency': self.latency.to_dict(),
+                'confidence': self.confidence.to_dict()
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls(bucket_seconds=data['bucket_seconds'])
+        aggregates.buckets = {int(k): v for k, v in data['buckets'].items()}
+        aggregates.latency = DDSketch.from_dict(data['latency'])
+        aggregates.confidence = DDSketch.from_dict(data['confidence'])
+        return aggregates
+
+    def _evict(self):
+        # Création d'un intervalle: le plus ancien sort au-delà de la rétention
+        if len(self.buckets) > self.retention:
+            del self.buckets[min(self.buckets)]
+
+    def _maybe_persist(self):
+        if self.persist_path is None or time.monotonic() - self._persisted_at < self.persist_interval:
+            return
+        # Écriture déjà en cours dans un autre thread: inutile d'attendre
+        if not self._persist_lock.acquire(blocking=False):
+            return
+        tmp = self.persist_path.with_suffix('.tmp')
+        try:
+            if time.monotonic() - self._persisted_at < self.persist_interval:
+                return
+            self._persisted_at = time.monotonic()
+            tmp.write_text(json.dumps(self.to_dict()))
+            tmp.replace(self.persist_path)
+        except OSError:
+            # Instantané manqué (disque plein, dossier supprimé): réessayé au prochain intervalle
+            tmp.unlink(missing_ok=True)
+        finally:
+            self._persist_lock.release()
+
+
+def merge_snapshots(folder, exclude=None):
+    """Fusionne les instantanés JSON d'un dossier (un par processus)"""
+    merged = StreamingAggregates()
+    for path in sorted(Path(folder).glob("*.json")):
+        if exclude is not None and path == exclude:
+            continue
+        merged.merge(StreamingAggregates.from_dict(json.loads(path.read_text())))
+    return merged
+
+
+def snapshot_path(folder):
+    """Instantané du processus courant dans un dossier partagé"""
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"aggregates-{os.getpid()}.json"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python aggregates.py dossier_instantanes/")
+    merged = merge_snapshots(sys.argv[1])
+    print(json.dumps({'summary': merged.summary(), 'hourly': merged.hourly()}, indent=2))
@@ -4,17 +4,27 @@ Classification intelligente de poubelles avec YOLOv9
 """
 
 import streamlit as st
-from ultralytics import YOLO
 from PIL import Image
-import numpy as np
-import cv2
 import time
-import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
 import json
+import os
+import queue
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from detection import (build_result, ingest, ingest_images, DEFAULT_BATCH_SIZE, MIN_CONFIDENCE, MAX_CONFIDENCE,
+                       STAGES)
+from cache import ResultCache, hash_file, make_key
+from metrics import MetricsRegistry, start_metrics_server
+from startup import MODEL_BACKEND, get_model, report as startup_report
+from scheduler import InferenceScheduler, SchedulerBusy
+from store import DetectionStore
+from aggregates import StreamingAggregates, merge_snapshots, snapshot_path
+
 # ============================================================================
 # CONFIGURATION PAGE
 # ============================================================================
@@ -186,6 +196,8 @@ if 'analyses_history' not in st.session_state:
     st.session_state.analyses_history = []
 if 'total_analyses' not in st.session_state:
     st.session_state.total_analyses = 0
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex  # File du planificateur
 if 'stats' not in st.session_state:
     st.session_state.stats = {
         'pleine': 0,
@@ -197,120 +209,331 @@ if 'stats' not in st.session_state:
 # ============================================================================
 # CHARGEMENT DU MODÈLE
 # ============================================================================
+# Backend d'inférence (MODEL_BACKEND): pytorch, onnx ou openvino (export mis en cache).
+# Lancé via `python startup.py`, le modèle est chargé et préchauffé dès le
+# démarrage du serveur; sinon à la première session.
+
+# Cascade de résolutions (ex: 320): passe rapide, pleine résolution si incertain
+CASCADE_IMGSZ = int(os.environ.get("CASCADE_IMGSZ", 0)) or None
+
 @st.cache_resource
-def load_model():
-    """Charge le modèle YOLOv9 avec cache"""
-    model_paths = [
-        Path(__file__).parent / "best.pt",  # Même dossier que app.py
-        Path("best.pt"),
-        Path("streamlit_app/best.pt"),
-        Path("../best.pt"),
-        Path("backend/best.pt"),
-        Path("../backend/best.pt"),
-    ]
-    
-    for path in model_paths:
-        if path.exists():
+def load_model(backend=MODEL_BACKEND):
+    """Modèle YOLOv9 chargé et préchauffé, partagé par toutes les sessions"""
+    model, path = get_model(backend)
+    boot = startup_report(backend)
+    for error in boot['errors']:
+        st.error(error)
+    for stage, seconds in boot['timings'].items():
+        get_metrics().set_gauge(f"startup_{stage}_seconds", seconds)
+    return model, path
+
+# ============================================================================
+# EXÉCUTION EN ARRIÈRE-PLAN
+# ============================================================================
+STAGE_LABELS = {
+    'queue': "⏳ En file d'attente...",
+    'decode': "📂 Décodage de l'image...",
+    'preprocess': "🧮 Prétraitement...",
+    'inference': "🤖 Inférence du modèle...",
+    'postprocess': "📦 Post-traitement...",
+    'draw': "🎨 Dessin des détections..."
+}
+
+def run_in_background(fn, on_event):
+    """
+    Exécute fn(emit) hors du thread de la session (le modèle est appelé via
+    le planificateur); les événements émis sont relayés à on_event depuis
+    le thread de la session
+    """
+    events = queue.Queue()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="session") as executor:
+        future = executor.submit(fn, events.put)
+        while True:
             try:
-                model = YOLO(str(path))
-                return model, str(path.absolute())
-            except Exception as e:
-                st.error(f"Erreur chargement {path}: {e}")
-                continue
+                on_event(events.get(timeout=0.05))
+            except queue.Empty:
+                if future.done() and events.empty():
+                    break
+    return future.result()
+
+# ============================================================================
+# CACHE DES RÉSULTATS
+# ============================================================================
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 128))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR")  # Niveau disque optionnel
+
+@st.cache_resource
+def get_result_cache():
+    """Cache LRU des résultats, partagé par toutes les sessions"""
+    return ResultCache(max_entries=RESULT_CACHE_SIZE, cache_dir=RESULT_CACHE_DIR)
+
+@st.cache_resource
+def get_model_fingerprint(model_path):
+    """Empreinte des poids du modèle (calculée une seule fois)"""
+    return hash_file(model_path)
+
+def result_key(uploaded_file, **params):
+    """Clé de cache d'un fichier uploadé (inférence au seuil plancher)"""
+    return make_key(uploaded_file.getvalue(), get_model_fingerprint(model_path),
+                    conf=MIN_CONFIDENCE, backend=MODEL_BACKEND,
+                    cascade=[CASCADE_IMGSZ, MAX_CONFIDENCE] if CASCADE_IMGSZ else None, **params)
+
+# ============================================================================
+# MÉTRIQUES DE LATENCE
+# ============================================================================
+METRICS_PORT = os.environ.get("METRICS_PORT")  # Export /metrics et /metrics.json
+
+@st.cache_resource
+def get_metrics():
+    """Registre des latences par étape, partagé par toutes les sessions"""
+    registry = MetricsRegistry()
+    if METRICS_PORT:
+        try:
+            start_metrics_server(registry, int(METRICS_PORT))
+        except OSError as e:
+            st.warning(f"Serveur de métriques non démarré (port {METRICS_PORT}): {e}")
+    return registry
+
+# ============================================================================
+# PLANIFICATEUR D'INFÉRENCE
+# ============================================================================
+@st.cache_resource
+def get_scheduler(_model, model_path):
+    """File d'inférence unique devant le modèle, partagée par toutes les sessions"""
+    return InferenceScheduler(_model, metrics=get_metrics(), cascade_imgsz=CASCADE_IMGSZ)
+
+# ============================================================================
+# STOCKAGE PERSISTANT
+# ============================================================================
+DETECTIONS_DB = os.environ.get("DETECTIONS_DB", str(Path(__file__).parent / "detections.db"))
+
+@st.cache_resource
+def get_store():
+    """Base des détections (SQLite WAL), partagée par toutes les sessions"""
+    return DetectionStore(DETECTIONS_DB)
+
+# ============================================================================
+# AGRÉGATS EN FLUX
+# ============================================================================
+AGGREGATES_DIR = os.environ.get("AGGREGATES_DIR")  # Instantanés partagés entre processus
+
+@st.cache_resource
+def get_aggregates():
+    """Comptes horaires et sketches de quantiles, partagés par toutes les sessions"""
+    return StreamingAggregates(persist_path=snapshot_path(AGGREGATES_DIR) if AGGREGATES_DIR else None)
+
+def aggregates_view():
+    """Agrégats du processus, fusionnés avec ceux des autres processus si partagés"""
+    if not AGGREGATES_DIR:
+        return aggregates
+    merged = merge_snapshots(AGGREGATES_DIR, exclude=aggregates.persist_path)
+    merged.merge(aggregates)
+    return merged
+
+# ============================================================================
+# FILTRE DE CHANGEMENT DE SCÈNE
+# ============================================================================
+@st.cache_resource
+def get_scene_gate():
+    """Dernière analyse par poubelle/caméra, partagée par toutes les sessions (None si désactivé)"""
+    from gate import SceneGate, GATE_THRESHOLD
+    return SceneGate(metrics=get_metrics()) if GATE_THRESHOLD > 0 else None
+
+# ============================================================================
+# FLUX DE CAMÉRAS
+# ============================================================================
+STREAM_SOURCES = os.environ.get("STREAM_SOURCES")  # nom=uri,nom=uri (RTSP/HTTP, vidéo, dossier)
+
+@st.cache_resource
+def get_stream_manager(_scheduler):
+    """Caméras en direct analysées en continu via le planificateur, partagées par toutes les sessions"""
+    from streams import StreamManager, parse_sources
+    sources = parse_sources(spec.strip() for spec in STREAM_SOURCES.split(",") if spec.strip())
+    return StreamManager(sources, scheduler=_scheduler, store=get_store(), metrics=get_metrics()).start()
+
+# ============================================================================
+# IMAGES D'AFFICHAGE
+# ============================================================================
+@st.cache_resource
+def get_display_cache():
+    """Images annotées encodées à la résolution d'affichage, partagées par toutes les sessions"""
+    from display import EncodedImageCache
+    return EncodedImageCache()
+
+def display_key(key, confidence, multi=False):
+    """Identifiant d'une image annotée: résultat en cache, seuil et mode"""
+    return f"{key}:{confidence:.2f}:{int(multi)}"
+
+def with_display_image(raw, data):
+    """Détections sans pixels (cache): image redécodée à échelle réduite pour l'affichage"""
+    if 'image' in raw:
+        return raw
+    ingested = ingest(data)
+    return dict(raw, image=ingested.display, scale=ingested.scale,
+                image_size=raw.get('image_size', ingested.original_size))
+
+def full_resolution_image(raw, data, confidence, multi=False):
+    """Image annotée en pleine résolution (JPEG), produite seulement à la demande"""
+    from display import encode_image, load_full_resolution, FULL_QUALITY
+    if raw.get('scale', 1.0) != 1.0:
+        # Upload décodé à échelle réduite: redécodage complet
+        raw = dict(raw, image=load_full_resolution(data), scale=1.0)
+    annotated = build_result(raw, confidence, multi=multi)['image_with_detection']
+    return encode_image(annotated, max_side=None, fmt='jpeg', quality=FULL_QUALITY)
+
+# ============================================================================
+# MISE À JOUR DES STATISTIQUES
+# ============================================================================
+def record_result(result):
+    """Ajoute un résultat aux statistiques, à l'historique de la session et à la base"""
+    from history import HistoryRecord
+    metrics.record_timings(result['timings'])
+    aggregates.update(result)
+    store.append(result, source=st.session_state.get('source_id') or "default",
+                 session=st.session_state.session_id)
+    st.session_state.total_analyses += 1
+    st.session_state.stats['total_confidence'] += result['confidence']
+    st.session_state.stats['total_time'] += result['processing_time']
+    
+    if result['status'] == 'PLEINE':
+        st.session_state.stats['pleine'] += 1
+    elif result['status'] == 'VIDE':
+        st.session_state.stats['vide'] += 1
     
-    return None, None
+    # Ajout à l'historique: scalaires, bbox et miniature seulement
+    st.session_state.analyses_history.insert(0, HistoryRecord.from_result(result))
+    if len(st.session_state.analyses_history) > 10:
+        st.session_state.analyses_history.pop()
 
 # ============================================================================
-# FONCTION DE DÉTECTION
+# AFFICHAGE DES RÉSULTATS
 # ============================================================================
-def detect_bin(image, model, confidence_threshold=0.25):
+def bin_counts(result):
+    """Résumé des comptes du mode multi-poubelles"""
+    counts = result['counts']
+    text = f"🔴 {counts['PLEINE']} pleine(s) • 🟢 {counts['VIDE']} vide(s)"
+    return text + (f" • 🟡 {counts['INCONNU']} inconnue(s)" if counts['INCONNU'] else "")
+
+def show_result(result, image_id, full_resolution=None):
     """
-    Effectue la détection sur une image
+    Affiche le résultat de détection d'une image. L'image annotée est
+    encodée une fois par image_id; full_resolution() ne produit l'image
+    pleine résolution que si elle est demandée.
     """
-    start_time = time.time()
-    
-    # Conversion en RGB si nécessaire
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
+    shown = display_cache.get_or_encode(image_id, lambda: result['image_with_detection'])
+    st.markdown("#### 🎯 Résultat de Détection")
+    if result['reused']:
+        st.info("♻️ Scène inchangée depuis la dernière analyse de cette poubelle/caméra: résultat réutilisé")
     
-    # Conversion PIL vers numpy
-    img_array = np.array(image)
+    # Badge de statut
+    if result['status'] != 'AUCUNE_DETECTION':
+        status_class = "status-pleine" if result['status'] == "PLEINE" else "status-vide"
+        st.markdown(f"""
+            <div class='status-badge {status_class}'>
+                {result['emoji']} {result['status']}
+            </div>
+        """, unsafe_allow_html=True)
+
+        # Image avec détection
+        st.image(shown, use_container_width=True)
+        if full_resolution is not None and st.checkbox("🔎 Préparer l'image en pleine résolution",
+                                                       key=f"full_{image_id}"):
+            st.download_button(
+                "📥 Télécharger l'image annotée",
+                full_resolution(),
+                file_name="detection.jpg",
+                mime="image/jpeg",
+                use_container_width=True
+            )
+
+        # Métriques
+        metric_col1, metric_col2, metric_col3 = st.columns(3)
+        with metric_col1:
+            st.metric("Confiance", f"{result['confidence']*100:.1f}%")
+        with metric_col2:
+            st.metric("Temps", f"{result['processing_time']:.3f}s")
+        with metric_col3:
+            st.metric("Détections", result['num_detections'])
+
+        if 'counts' in result:
+            st.markdown(f"**Poubelles détectées:** {bin_counts(result)}")
+
+        # Barre de confiance
+        st.markdown("**Niveau de confiance:**")
+        st.progress(result['confidence'])
+
+        # Message
+        if result['status'] == "PLEINE":
+            st.error(result['message'])
+        else:
+            st.success(result['message'])
+
+        # Détails techniques
+        with st.expander("🔧 Détails Techniques"):
+            st.json({
+                'Classe': result['class_name'],
+                'Confiance': f"{result['confidence']:.4f}",
+                'Bounding Box': result['bbox'],
+                'Temps de traitement': f"{result['processing_time']:.3f}s",
+                'Résolution': f"{result['tier']} px" + (" (après passe basse résolution)" if result['escalated'] else ""),
+                'Étapes (ms)': {stage: round(t * 1000, 1) for stage, t in result['timings'].items()}
+            })
+    else:
+        st.warning(result['message'])
+        st.image(shown, use_container_width=True)
+
+def show_video_analysis(analysis):
+    """Affiche la chronologie et la vidéo annotée d'une analyse vidéo"""
+    import plotly.graph_objects as go
+
+    summary = analysis['summary']
+    timeline = analysis['timeline']
     
-    # Prédiction
-    results = model(img_array, conf=confidence_threshold, verbose=False)
-    processing_time = time.time() - start_time
+    st.markdown(f"#### 🎯 Résultat - {analysis['name']}")
     
-    result_data = {
-        'timestamp': datetime.now(),
-        'processing_time': processing_time,
-        'image_size': image.size
-    }
+    metric_col1, metric_col2, metric_col3, metric_col4, metric_col5 = st.columns(5)
+    with metric_col1:
+        st.metric("Images analysées", summary['frames_analyzed'])
+    with metric_col2:
+        st.metric("Images abandonnées", summary['dropped'])
+    with metric_col3:
+        st.metric("Passes du modèle", summary['detected'], f"{summary['detection_ratio'] * 100:.0f}% des images",
+                  delta_color="off")
+    with metric_col4:
+        st.metric("Débit", f"{summary['analysis_fps']:.1f} img/s")
+    with metric_col5:
+        pleine = summary['status_counts'].get('PLEINE', 0)
+        st.metric("Poubelle pleine", f"{pleine / max(1, summary['frames_analyzed']) * 100:.0f}% du temps")
     
-    if len(results[0].boxes) > 0:
-        boxes = results[0].boxes
-        best_idx = boxes.conf.argmax()
-        best_box = boxes[best_idx]
-        
-        class_id = int(best_box.cls[0])
-        confidence = float(best_box.conf[0])
-        class_name = results[0].names[class_id]
-        bbox = best_box.xyxy[0].cpu().numpy()
-        
-        # Détermination du statut
-        if "pleine" in class_name.lower() or "full" in class_name.lower():
-            status = "PLEINE"
-            emoji = "🔴"
-            color = "#ef4444"
-            message = "⚠️ Collecte requise immédiatement!"
-        elif "vide" in class_name.lower() or "empty" in class_name.lower():
-            status = "VIDE"
-            emoji = "🟢"
-            color = "#10b981"
-            message = "✅ Aucune action nécessaire"
-        else:
-            status = "INCONNU"
-            emoji = "🟡"
-            color = "#f59e0b"
-            message = "🔍 Vérification manuelle recommandée"
-        
-        # Dessiner la bounding box
-        img_with_box = img_array.copy()
-        x1, y1, x2, y2 = bbox.astype(int)
-        
-        # Couleur selon status
-        box_color = (239, 68, 68) if status == "PLEINE" else (16, 185, 129)
-        
-        cv2.rectangle(img_with_box, (x1, y1), (x2, y2), box_color, 3)
-        
-        # Label
-        label = f"{status} {confidence*100:.1f}%"
-        (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
-        cv2.rectangle(img_with_box, (x1, y1 - label_h - 10), (x1 + label_w, y1), box_color, -1)
-        cv2.putText(img_with_box, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-        
-        result_data.update({
-            'status': status,
-            'emoji': emoji,
-            'color': color,
-            'message': message,
-            'confidence': confidence,
-            'class_name': class_name,
-            'bbox': bbox.tolist(),
-            'image_with_detection': img_with_box,
-            'num_detections': len(boxes)
-        })
-    else:
-        result_data.update({
-            'status': 'AUCUNE_DETECTION',
-            'emoji': '❌',
-            'color': '#6b7280',
-            'message': 'Aucune poubelle détectée',
-            'confidence': 0.0,
-            'image_with_detection': img_array,
-            'num_detections': 0
-        })
+    if timeline:
+        # Chronologie du statut image par image
+        colors = {'PLEINE': '#ef4444', 'VIDE': '#10b981', 'INCONNU': '#f59e0b', 'AUCUNE_DETECTION': '#6b7280'}
+        fig_timeline = go.Figure(data=[go.Scatter(
+            x=[entry['time'] for entry in timeline],
+            y=[entry['status'] for entry in timeline],
+            mode='markers',
+            marker=dict(size=8, color=[colors.get(entry['status'], '#667eea') for entry in timeline]),
+            customdata=[[entry['frame'], entry['confidence'] * 100] for entry in timeline],
+            hovertemplate="Image %{customdata[0]} • %{x:.2f}s<br>%{y} • %{customdata[1]:.1f}%<extra></extra>"
+        )])
+        fig_timeline.update_layout(
+            title="Statut par image",
+            xaxis_title="Temps (s)",
+            yaxis_title="Statut",
+            height=300
+        )
+        st.plotly_chart(fig_timeline, use_container_width=True)
     
-    return result_data
+    output_path = Path(analysis['output_path'])
+    if output_path.exists():
+        st.video(str(output_path))
+        with open(output_path, 'rb') as f:
+            st.download_button(
+                "📥 Télécharger la vidéo annotée",
+                f,
+                file_name=f"{Path(analysis['name']).stem}_annotee.mp4",
+                mime="video/mp4"
+            )
 
 # ============================================================================
 # SIDEBAR
@@ -331,14 +554,29 @@ with st.sidebar:
     # Chargement du modèle
     with st.spinner("🔄 Chargement du modèle..."):
         model, model_path = load_model()
+        result_cache = get_result_cache()
+        metrics = get_metrics()
+        store = get_store()
+        aggregates = get_aggregates()
+        display_cache = get_display_cache()
     
     if model:
+        scheduler = get_scheduler(model, model_path)
+        stream_manager = get_stream_manager(scheduler) if STREAM_SOURCES else None
         st.success("✅ Modèle chargé")
-        st.caption(f"📁 {Path(model_path).name}")
+        st.caption(f"📁 {Path(model_path).name} • {MODEL_BACKEND}")
     else:
         st.error("❌ Modèle non trouvé")
         st.stop()
     
+    st.text_input(
+        "🏷️ Poubelle / caméra",
+        value="default",
+        key="source_id",
+        help="Identifiant enregistré avec chaque détection. Une source explicite (caméra fixe) "
+             "active aussi la réutilisation du dernier résultat si la scène n'a pas changé"
+    )
+    
     st.markdown("---")
     
     # Statistiques rapides
@@ -352,11 +590,27 @@ with st.sidebar:
             st.metric("Confiance", f"{avg_conf:.1f}%")
         else:
             st.metric("Confiance", "N/A")
+    
+    cache_stats = result_cache.stats()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Cache hits", cache_stats['hits'])
+    with col2:
+        st.metric("Cache miss", cache_stats['misses'])
+    st.caption(f"💾 Taux de succès du cache: {cache_stats['hit_rate']*100:.0f}%")
+    display_stats = display_cache.stats()
+    st.caption(f"🖼️ Images d'affichage: {display_stats['entries']} encodées "
+               f"({display_stats['bytes'] / 2**20:.1f} MB), {display_stats['hit_rate']*100:.0f}% réutilisées")
 
 # ============================================================================
 # PAGE PRINCIPALE
 # ============================================================================
 if page == "🏠 Accueil":
+    # Imports limités à la page d'analyse (OpenCV, vidéo, tuiles)
+    from display import DISPLAY_MAX_SIDE, load_full_resolution
+    from tiling import detect_raw_tiled, MAX_TILES
+    scene_gate = get_scene_gate()
+    
     # Header avec animation
     st.markdown("""
         <div style='text-align: center; padding: 2rem 0;'>
@@ -396,21 +650,26 @@ if page == "🏠 Accueil":
     with tab1:
         st.markdown("### 📸 Uploader une image")
         
-        # Upload d'image
-        uploaded_file = st.file_uploader(
-            "Choisissez une image de poubelle",
+        # Upload d'image(s)
+        uploaded_files = st.file_uploader(
+            "Choisissez une ou plusieurs images de poubelle",
             type=['jpg', 'jpeg', 'png'],
-            help="Formats acceptés: JPG, JPEG, PNG"
+            accept_multiple_files=True,
+            help="Formats acceptés: JPG, JPEG, PNG - plusieurs images = mode lot"
         )
+        uploaded_file = uploaded_files[0] if len(uploaded_files) == 1 else None
         
         if uploaded_file:
+            upload_key = result_key(uploaded_file)
             # Colonnes pour affichage
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown("#### 🖼️ Image Originale")
-                image = Image.open(uploaded_file)
-                st.image(image, use_container_width=True)
+                image = Image.open(uploaded_file)   # En-tête seulement
+                st.image(display_cache.get_or_encode(f"{upload_key}:original",
+                                                     lambda: ingest(uploaded_file.getvalue()).display),
+                         use_container_width=True)
                 
                 # Infos image
                 with st.expander("ℹ️ Informations Image"):
@@ -423,130 +682,325 @@ if page == "🏠 Accueil":
                 with st.expander("⚙️ Paramètres", expanded=True):
                     confidence = st.slider(
                         "Seuil de confiance",
-                        min_value=0.1,
-                        max_value=0.9,
+                        min_value=MIN_CONFIDENCE,
+                        max_value=MAX_CONFIDENCE,
                         value=0.25,
                         step=0.05,
                         help="Seuil minimum de confiance pour la détection"
                     )
+                    multi = st.checkbox(
+                        "🗑️ Toutes les poubelles de l'image",
+                        value=False,
+                        help="Garde et dessine chaque poubelle détectée, avec le compte pleines / vides"
+                    )
+                    tiled = st.checkbox(
+                        "🔲 Découpage en tuiles",
+                        value=False,
+                        help=f"Images haute résolution: l'image est analysée en tuiles qui se chevauchent "
+                             f"(au plus {MAX_TILES}) pour ne pas manquer les poubelles lointaines"
+                    )
+                
+                key = result_key(uploaded_file, tiled=True) if tiled else upload_key
+                download = lambda raw: lambda: full_resolution_image(raw, uploaded_file.getvalue(), confidence, multi)
+                session_id = st.session_state.session_id
+                # Filtre de scène seulement pour une source explicite: les uploads sans source
+                # (identifiant "default", commun à toutes les sessions) ne se réutilisent pas entre eux
+                source_id = st.session_state.get('source_id') or "default"
+                gate = scene_gate if source_id != "default" else None
                 
                 # Bouton d'analyse
                 if st.button("🔍 Analyser l'image", type="primary", use_container_width=True):
                     with st.spinner("🤖 Analyse en cours..."):
-                        # Barre de progression animée
+                        # Barre de progression pilotée par les étapes réelles
                         progress_bar = st.progress(0)
-                        for i in range(100):
-                            time.sleep(0.01)
-                            progress_bar.progress(i + 1)
                         
-                        # Détection
-                        result = detect_bin(image, model, confidence)
+                        def analyse(emit):
+                            # Détection au seuil plancher (en cache si déjà analysée)
+                            raw = result_cache.get(key)
+                            if raw is None:
+                                emit('decode')
+                                if tiled:
+                                    # Pleine résolution, orientation EXIF appliquée: boîtes en coordonnées d'origine
+                                    full = load_full_resolution(uploaded_file.getvalue())
+                                    # Tuiles envoyées au planificateur comme un lot de la session
+                                    raw = detect_raw_tiled(full, None, run_batch=lambda tiles: scheduler.detect_batch(
+                                        session_id, tiles, progress=emit))
+                                    raw['image_size'] = (full.shape[1], full.shape[0])
+                                    del raw['image']   # L'affichage repart d'un décodage réduit
+                                else:
+                                    # Décodage à échelle réduite, directement dans le tampon du modèle
+                                    ingested = ingest(uploaded_file.getvalue())
+                                    run = lambda img: scheduler.detect(session_id, img, progress=emit)
+                                    raw = (run(ingested) if gate is None
+                                           else gate.detect(source_id, ingested, run))
+                                if not raw.get('reused'):
+                                    # Résultat réutilisé: celui d'une autre image, pas de celle-ci
+                                    result_cache.put(key, raw)
+                            raw = with_display_image(raw, uploaded_file.getvalue())
+                            # Application du seuil choisi
+                            return raw, build_result(raw, confidence, progress=emit, multi=multi,
+                                                     max_side=DISPLAY_MAX_SIDE)
                         
-                        # Mise à jour stats
-                        st.session_state.total_analyses += 1
-                        st.session_state.stats['total_confidence'] += result['confidence']
-                        st.session_state.stats['total_time'] += result['processing_time']
+                        def show_stage(stage):
+                            done = STAGES.index(stage) / len(STAGES) if stage in STAGES else 0.0
+                            progress_bar.progress(done, text=STAGE_LABELS[stage])
                         
-                        if result['status'] == 'PLEINE':
-                            st.session_state.stats['pleine'] += 1
-                        elif result['status'] == 'VIDE':
-                            st.session_state.stats['vide'] += 1
-                        
-                        # Ajout à l'historique
-                        st.session_state.analyses_history.insert(0, result)
-                        if len(st.session_state.analyses_history) > 10:
-                            st.session_state.analyses_history.pop()
+                        try:
+                            raw, result = run_in_background(analyse, show_stage)
+                        except SchedulerBusy as e:
+                            result = None
+                            st.warning(f"⏳ {e}")
+                        else:
+                            st.session_state.current_analysis = {'key': key, 'raw': dict(raw, cached=True)}
+                            
+                            # Mise à jour stats
+                            record_result(result)
                         
                         progress_bar.empty()
                     
                     # Affichage résultats
-                    st.markdown("#### 🎯 Résultat de Détection")
-                    
-                    # Badge de statut
-                    if result['status'] != 'AUCUNE_DETECTION':
-                        status_class = "status-pleine" if result['status'] == "PLEINE" else "status-vide"
-                        st.markdown(f"""
-                            <div class='status-badge {status_class}'>
-                                {result['emoji']} {result['status']}
-                            </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Image avec détection
-                        st.image(result['image_with_detection'], use_container_width=True)
-                        
-                        # Métriques
-                        metric_col1, metric_col2, metric_col3 = st.columns(3)
-                        with metric_col1:
-                            st.metric("Confiance", f"{result['confidence']*100:.1f}%")
-                        with metric_col2:
-                            st.metric("Temps", f"{result['processing_time']:.3f}s")
-                        with metric_col3:
-                            st.metric("Détections", result['num_detections'])
-                        
-                        # Barre de confiance
-                        st.markdown("**Niveau de confiance:**")
-                        st.progress(result['confidence'])
-                        
-                        # Message
-                        if result['status'] == "PLEINE":
-                            st.error(result['message'])
-                        else:
-                            st.success(result['message'])
-                        
-                        # Détails techniques
-                        with st.expander("🔧 Détails Techniques"):
-                            st.json({
-                                'Classe': result['class_name'],
-                                'Confiance': f"{result['confidence']:.4f}",
-                                'Bounding Box': result['bbox'],
-                                'Temps de traitement': f"{result['processing_time']:.3f}s"
-                            })
-                    else:
-                        st.warning(result['message'])
-                        st.image(image, use_container_width=True)
-    
+                    if result is not None:
+                        show_result(result, display_key(key, confidence, multi), download(raw))
+                
+                elif st.session_state.get('current_analysis', {}).get('key') == key:
+                    # Seuil modifié: re-filtrage des détections, sans nouvelle inférence
+                    raw = st.session_state.current_analysis['raw']
+                    result = build_result(raw, confidence, multi=multi, max_side=DISPLAY_MAX_SIDE)
+                    show_result(result, display_key(key, confidence, multi), download(raw))
+
+        elif uploaded_files:
+            # Mode lot: plusieurs images
+            st.markdown(f"#### 🗂️ Mode lot - {len(uploaded_files)} images")
+
+            with st.expander("⚙️ Paramètres", expanded=True):
+                confidence = st.slider(
+                    "Seuil de confiance",
+                    min_value=MIN_CONFIDENCE,
+                    max_value=MAX_CONFIDENCE,
+                    value=0.25,
+                    step=0.05,
+                    help="Seuil minimum de confiance pour la détection"
+                )
+                batch_size = st.slider(
+                    "Taille des lots",
+                    min_value=1,
+                    max_value=32,
+                    value=DEFAULT_BATCH_SIZE,
+                    help="Nombre d'images envoyées ensemble au planificateur d'inférence"
+                )
+                multi = st.checkbox(
+                    "🗑️ Toutes les poubelles de chaque image",
+                    value=False,
+                    help="Garde et dessine chaque poubelle détectée, avec le compte pleines / vides"
+                )
+
+            if st.button(f"🔍 Analyser les {len(uploaded_files)} images", type="primary", use_container_width=True):
+                start_time = time.time()
+
+                # Seules les images absentes du cache sont décodées et analysées
+                keys = [result_key(f) for f in uploaded_files]
+                cached_raws = [result_cache.get(key) for key in keys]
+                missing = [i for i, r in enumerate(cached_raws) if r is None]
+
+                session_id = st.session_state.session_id
+
+                def analyse_batch(emit):
+                    # Décodage et inférence des images manquantes, lot par lot
+                    for start in range(0, len(missing), batch_size):
+                        chunk = missing[start:start + batch_size]
+                        images = ingest_images([uploaded_files[i] for i in chunk])
+                        for idx, raw in zip(chunk, scheduler.detect_batch(session_id, images)):
+                            result_cache.put(keys[idx], raw)
+                            emit((idx, raw))
+
+                progress_bar = st.progress(0)
+                summary = st.empty()
+                grid = st.columns(3)
+                shown = []
+
+                def show_batch_result(event):
+                    # Affichage d'un résultat dès qu'il est disponible
+                    idx, raw = event
+                    raw = with_display_image(raw, uploaded_files[idx].getvalue())
+                    result = build_result(raw, confidence, multi=multi, max_side=DISPLAY_MAX_SIDE)
+                    record_result(result)
+                    shown.append(idx)
+
+                    with grid[(len(shown) - 1) % 3]:
+                        st.image(display_cache.get_or_encode(display_key(keys[idx], confidence, multi),
+                                                             lambda: result['image_with_detection']),
+                                 use_container_width=True)
+                        st.markdown(f"**{uploaded_files[idx].name}**  \n"
+                                    f"{result['emoji']} {result['status']} • "
+                                    f"{result['confidence']*100:.1f}%"
+                                    + (f" • {bin_counts(result)}" if 'counts' in result else ""))
+
+                    progress_bar.progress(len(shown) / len(uploaded_files))
+                    elapsed = time.time() - start_time
+                    summary.caption(f"⚡ {len(shown)}/{len(uploaded_files)} images • "
+                                    f"{len(shown) / elapsed:.1f} images/s • {len(missing)} analysées")
+
+                # Résultats en cache d'abord, puis au fur et à mesure des lots
+                for idx in range(len(uploaded_files)):
+                    if cached_raws[idx] is not None:
+                        show_batch_result((idx, cached_raws[idx]))
+                if missing:
+                    try:
+                        run_in_background(analyse_batch, show_batch_result)
+                    except SchedulerBusy as e:
+                        st.warning(f"⏳ {e}")
+
+                progress_bar.empty()
+
     with tab2:
-        st.info("🚧 Fonctionnalité en développement - Analyse vidéo temps réel à venir!")
-        st.markdown("""
-        ### 🎥 Analyse Vidéo (Prochainement)
+        st.markdown("### 🎥 Uploader une vidéo")
         
-        Fonctionnalités prévues:
-        - ✅ Analyse temps réel via webcam
-        - ✅ Upload de fichiers vidéo
-        - ✅ Détection multi-objets
-        - ✅ Tracking des poubelles
-        - ✅ Statistiques par frame
-        """)
+        uploaded_video = st.file_uploader(
+            "Choisissez une vidéo de poubelle",
+            type=['mp4', 'avi', 'mov', 'mkv'],
+            key="video_uploader",
+            help="Formats acceptés: MP4, AVI, MOV, MKV"
+        )
+        
+        if uploaded_video:
+            from video import VideoAnalyzer, summarize_timeline
+            
+            with st.expander("⚙️ Paramètres", expanded=True):
+                video_confidence = st.slider(
+                    "Seuil de confiance",
+                    min_value=MIN_CONFIDENCE,
+                    max_value=MAX_CONFIDENCE,
+                    value=0.25,
+                    step=0.05,
+                    key="video_confidence",
+                    help="Seuil minimum de confiance pour la détection"
+                )
+                sampling = st.radio(
+                    "Échantillonnage",
+                    ["Pas fixe", "FPS cible"],
+                    horizontal=True,
+                    help="FPS cible: des images sont abandonnées si l'analyse prend du retard"
+                )
+                if sampling == "Pas fixe":
+                    stride = st.number_input("Analyser une image sur", min_value=1, max_value=60, value=5)
+                    target_fps = None
+                else:
+                    stride = 1
+                    target_fps = st.slider("FPS cible", min_value=1, max_value=30, value=5)
+                video_batch_size = st.slider(
+                    "Taille des lots",
+                    min_value=1,
+                    max_value=32,
+                    value=DEFAULT_BATCH_SIZE,
+                    key="video_batch_size",
+                    help="Nombre d'images traitées par passe du modèle"
+                )
+                track = st.checkbox(
+                    "Suivi des poubelles",
+                    value=True,
+                    help="Suit chaque poubelle d'une image à l'autre et lisse son statut dans le temps"
+                )
+                detect_every = st.slider(
+                    "Détection toutes les N images analysées",
+                    min_value=1,
+                    max_value=15,
+                    value=5,
+                    disabled=not track,
+                    help="Entre deux détections, les poubelles suivies sont propagées sans passer par le modèle"
+                )
+            
+            if st.button("🎬 Analyser la vidéo", type="primary", use_container_width=True):
+                # Une seule vidéo de travail par session
+                previous = st.session_state.pop('video_analysis', None)
+                if previous:
+                    shutil.rmtree(previous['workdir'], ignore_errors=True)
+                
+                # OpenCV lit un fichier: copie de l'upload sur disque, par blocs
+                workdir = Path(tempfile.mkdtemp(prefix="smartbin_video_"))
+                source_path = workdir / Path(uploaded_video.name).name
+                with open(source_path, 'wb') as f:
+                    uploaded_video.seek(0)
+                    shutil.copyfileobj(uploaded_video, f, 1 << 20)
+                output_path = workdir / "annotee.mp4"
+                
+                analyzer = VideoAnalyzer(
+                    model,
+                    confidence_threshold=video_confidence,
+                    stride=stride,
+                    target_fps=target_fps,
+                    batch_size=video_batch_size,
+                    scheduler=scheduler,
+                    session_id=st.session_state.session_id,
+                    track=track,
+                    detect_every=detect_every
+                )
+                
+                progress_bar = st.progress(0, text="🎞️ Démarrage de l'analyse...")
+                timeline = []
+                try:
+                    for entry in analyzer.run(source_path, output_path):
+                        timeline.append(entry)
+                        total_frames = max(1, analyzer.stats['total_frames'])
+                        progress_bar.progress(
+                            min(1.0, (entry['frame'] + 1) / total_frames),
+                            text=f"🎞️ Image {entry['frame'] + 1}/{total_frames} • {entry['status']}"
+                        )
+                except (ValueError, RuntimeError) as e:
+                    st.error(f"❌ Analyse impossible: {e}")
+                    shutil.rmtree(workdir, ignore_errors=True)
+                else:
+                    st.session_state.video_analysis = {
+                        'name': uploaded_video.name,
+                        'workdir': str(workdir),
+                        'output_path': str(output_path),
+                        'timeline': timeline,
+                        'summary': summarize_timeline(timeline, analyzer.stats)
+                    }
+                finally:
+                    progress_bar.empty()
+            
+            if 'video_analysis' in st.session_state:
+                show_video_analysis(st.session_state.video_analysis)
 
 # ============================================================================
 # PAGE STATISTIQUES
 # ============================================================================
 elif page == "📊 Statistiques":
+    import plotly.graph_objects as go  # Import limité aux pages avec graphiques
+
     st.markdown("# 📊 Statistiques & Analyses")
     
-    if st.session_state.total_analyses == 0:
+    # Agrégats de la base (toutes sessions), filtrés par période et source
+    periods = {"24 heures": 86400, "7 jours": 7 * 86400, "30 jours": 30 * 86400, "Tout": None}
+    col1, col2 = st.columns(2)
+    with col1:
+        # Période bornée par défaut: "Tout" relit les cumuls de tout l'historique
+        period = st.selectbox("Période", list(periods), index=list(periods).index("7 jours"))
+    with col2:
+        source = st.selectbox("Poubelle / caméra", ["Toutes"] + store.sources())
+    since = time.time() - periods[period] if periods[period] else None
+    source = None if source == "Toutes" else source
+    
+    store.flush(timeout=1.0)  # Inclut les analyses encore en file d'écriture
+    summary = store.summary(since, source)
+    
+    if summary['total'] == 0:
         st.info("Aucune analyse effectuée pour le moment. Commencez par analyser une image!")
     else:
         # Métriques globales
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric(
-                "Total Analyses",
-                st.session_state.total_analyses,
-                delta=f"+1" if st.session_state.total_analyses > 0 else None
-            )
+            st.metric("Total Analyses", summary['total'])
         
         with col2:
-            avg_conf = (st.session_state.stats['total_confidence'] / st.session_state.total_analyses) * 100
-            st.metric("Confiance Moyenne", f"{avg_conf:.1f}%")
+            st.metric("Confiance Moyenne", f"{summary['avg_confidence'] * 100:.1f}%")
         
         with col3:
-            avg_time = st.session_state.stats['total_time'] / st.session_state.total_analyses
-            st.metric("Temps Moyen", f"{avg_time:.3f}s")
+            st.metric("Temps Moyen", f"{summary['avg_processing_time']:.3f}s")
         
         with col4:
-            pleine_percent = (st.session_state.stats['pleine'] / st.session_state.total_analyses) * 100
+            pleine_percent = summary['status_counts'].get('PLEINE', 0) / summary['total'] * 100
             st.metric("Poubelles Pleines", f"{pleine_percent:.0f}%")
         
         st.markdown("---")
@@ -558,7 +1012,7 @@ elif page == "📊 Statistiques":
             # Camembert
             fig_pie = go.Figure(data=[go.Pie(
                 labels=['Pleines', 'Vides'],
-                values=[st.session_state.stats['pleine'], st.session_state.stats['vide']],
+                values=[summary['status_counts'].get('PLEINE', 0), summary['status_counts'].get('VIDE', 0)],
                 hole=0.4,
                 marker_colors=['#ef4444', '#10b981']
             )])
@@ -569,36 +1023,169 @@ elif page == "📊 Statistiques":
             )
             st.plotly_chart(fig_pie, use_container_width=True)
         
+        # Agrégats en flux (sans relecture de l'historique)
+        view = aggregates_view()
+        hourly = [row for row in view.hourly() if row['full_rate'] is not None]
+        
         with col2:
-            # Historique confiance
-            if st.session_state.analyses_history:
-                confidences = [a['confidence']*100 for a in st.session_state.analyses_history[::-1]]
+            # Taux de poubelles pleines par heure
+            if hourly:
                 fig_line = go.Figure(data=[go.Scatter(
-                    y=confidences,
+                    x=[datetime.fromtimestamp(row['bucket']) for row in hourly],
+                    y=[row['full_rate'] * 100 for row in hourly],
                     mode='lines+markers',
-                    line=dict(color='#667eea', width=3),
+                    line=dict(color='#ef4444', width=3),
                     marker=dict(size=10)
                 )])
                 fig_line.update_layout(
-                    title="Évolution de la Confiance",
-                    xaxis_title="Analyse #",
-                    yaxis_title="Confiance (%)",
+                    title="Taux de Poubelles Pleines par Heure",
+                    xaxis_title="Heure",
+                    yaxis_title="Pleines (%)",
                     height=400
                 )
                 st.plotly_chart(fig_line, use_container_width=True)
         
+        # Distributions (DDSketch, erreur relative 1%)
+        flow = view.summary()
+        if flow['count']:
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Latence p50", f"{flow['latency']['p50'] * 1000:.0f} ms")
+            with col2:
+                st.metric("Latence p95", f"{flow['latency']['p95'] * 1000:.0f} ms")
+            with col3:
+                st.metric("Confiance p50", f"{flow['confidence']['p50'] * 100:.1f}%")
+            with col4:
+                st.metric("Confiance p5", f"{view.confidence.quantile(0.05) * 100:.1f}%")
+            st.caption(f"{flow['count']} résultats depuis le démarrage"
+                       + (" • tous processus" if AGGREGATES_DIR else ""))
+        
+        # Activité par heure (ou par jour au-delà d'une semaine)
+        bucket = 3600 if periods[period] and periods[period] <= 7 * 86400 else 86400
+        activity = store.timeseries(bucket, since, source)
+        colors = {'PLEINE': '#ef4444', 'VIDE': '#10b981', 'INCONNU': '#f59e0b', 'AUCUNE_DETECTION': '#6b7280'}
+        fig_activity = go.Figure(data=[
+            go.Bar(
+                name=status,
+                x=[datetime.fromtimestamp(r['bucket']) for r in activity if r['status'] == status],
+                y=[r['count'] for r in activity if r['status'] == status],
+                marker_color=colors.get(status, '#667eea')
+            )
+            for status in sorted({r['status'] for r in activity})
+        ])
+        fig_activity.update_layout(
+            barmode='stack',
+            title="Activité par " + ("heure" if bucket == 3600 else "jour"),
+            xaxis_title="Date",
+            yaxis_title="Analyses",
+            height=350
+        )
+        st.plotly_chart(fig_activity, use_container_width=True)
+        
         # Historique détaillé
         st.markdown("### 📜 Historique des Analyses")
         
         for idx, analysis in enumerate(st.session_state.analyses_history[:5]):
-            with st.expander(f"#{idx+1} - {analysis['timestamp'].strftime('%H:%M:%S')} - {analysis['emoji']} {analysis['status']}"):
-                col1, col2, col3 = st.columns(3)
+            with st.expander(f"#{idx+1} - {analysis.timestamp.strftime('%H:%M:%S')} - {analysis.emoji} {analysis.status}"):
+                col1, col2, col3, col4 = st.columns(4)
                 with col1:
-                    st.write(f"**Confiance:** {analysis['confidence']*100:.1f}%")
+                    if analysis.thumbnail:
+                        st.image(analysis.thumbnail)
                 with col2:
-                    st.write(f"**Temps:** {analysis['processing_time']:.3f}s")
+                    st.write(f"**Confiance:** {analysis.confidence*100:.1f}%")
                 with col3:
-                    st.write(f"**Détections:** {analysis.get('num_detections', 'N/A')}")
+                    st.write(f"**Temps:** {analysis.processing_time:.3f}s")
+                with col4:
+                    st.write(f"**Détections:** {analysis.num_detections}")
+    
+    # Caméras en direct
+    if stream_manager is not None:
+        st.markdown("### 📡 Caméras en Direct")
+        from streams import STREAM_FPS
+        stream_stats = stream_manager.snapshot()
+        st.caption(f"Budget {STREAM_FPS:g} analyse(s)/s par caméra • "
+                   f"{stream_stats['mean_batch_size']:.1f} caméras par passe du modèle en moyenne")
+        st.dataframe([{
+            'Caméra': name,
+            'État': row['state'],
+            'Statut': f"{row['emoji']} {row['status']}" if row['status'] else "-",
+            'Confiance': f"{row['confidence']*100:.1f}%" if row['confidence'] is not None else "-",
+            'Retard (ms)': round(row['lag'] * 1000) if row['lag'] is not None else None,
+            'Analyses/s': round(row['fps'], 2),
+            'Images lues': row['read'],
+            'Abandonnées': row['dropped'],
+            'Erreur': row['error'] or ""
+        } for name, row in stream_manager.status().items()], use_container_width=True, hide_index=True)
+    
+    # Latence par étape (toutes sessions confondues)
+    snapshot = metrics.snapshot()
+    if snapshot['stages']:
+        st.markdown("### ⏱️ Latence par Étape")
+        st.caption(f"Toutes sessions • fenêtre glissante de {snapshot['window_size']} mesures par étape")
+        
+        stage_order = [s for s in STAGES + ('total',) if s in snapshot['stages']]
+        rows = [{
+            'Étape': stage,
+            'Mesures': snapshot['stages'][stage]['count'],
+            'p50 (ms)': round(snapshot['stages'][stage]['p50'] * 1000, 1),
+            'p95 (ms)': round(snapshot['stages'][stage]['p95'] * 1000, 1),
+            'p99 (ms)': round(snapshot['stages'][stage]['p99'] * 1000, 1)
+        } for stage in stage_order]
+        
+        fig_stages = go.Figure(data=[
+            go.Bar(name=q, x=stage_order, y=[row[f'{q} (ms)'] for row in rows], marker_color=color)
+            for q, color in [('p50', '#667eea'), ('p95', '#764ba2'), ('p99', '#ef4444')]
+        ])
+        fig_stages.update_layout(
+            barmode='group',
+            xaxis_title="Étape",
+            yaxis_title="Latence (ms)",
+            height=400
+        )
+        st.plotly_chart(fig_stages, use_container_width=True)
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+        
+        # File d'inférence partagée
+        st.markdown("### 🚦 Planificateur d'Inférence")
+        scheduler_stats = scheduler.snapshot()
+        queue_wait = snapshot['stages'].get('queue_wait')
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("File d'attente", scheduler_stats['queue_depth'],
+                      f"{scheduler_stats['active_sessions']} sessions", delta_color="off")
+        with col2:
+            st.metric("Attente p95", f"{queue_wait['p95'] * 1000:.0f} ms" if queue_wait else "N/A")
+        with col3:
+            st.metric("Taille moyenne des lots", f"{scheduler_stats['mean_batch_size']:.1f}")
+        with col4:
+            st.metric("Requêtes refusées", scheduler_stats['rejected'])
+        if CASCADE_IMGSZ:
+            st.caption(f"🪜 Cascade {CASCADE_IMGSZ} → 640 px: "
+                       f"{scheduler_stats['escalated_fraction']*100:.0f}% des images repassées en pleine résolution")
+        scene_gate = get_scene_gate()
+        if scene_gate is not None:
+            gate_stats = scene_gate.snapshot()
+            st.caption(f"🚪 Scène inchangée: {gate_stats['hits']}/{gate_stats['checks']} analyses évitées "
+                       f"({gate_stats['hit_rate']*100:.0f}%) • {gate_stats['saved_seconds']:.1f}s de calcul économisées "
+                       f"• {gate_stats['sources']} sources suivies, analyse forcée toutes les {scene_gate.refresh_interval:.0f}s")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "📥 Métriques JSON",
+                metrics.to_json(),
+                file_name="metrics.json",
+                mime="application/json",
+                use_container_width=True
+            )
+        with col2:
+            st.download_button(
+                "📥 Métriques Prometheus",
+                metrics.to_prometheus(),
+                file_name="metrics.prom",
+                mime="text/plain",
+                use_container_width=True
+            )
 
 # ============================================================================
 # PAGE PARAMÈTRES
@@ -615,8 +1202,44 @@ elif page == "⚙️ Paramètres":
     
     st.markdown("### 🤖 Modèle")
     st.info(f"**Modèle actuel:** {Path(model_path).name}")
+    st.write(f"**Backend:** {MODEL_BACKEND}")
+    if MODEL_BACKEND == 'onnx-int8':
+        from quantization import DEFAULT_QUANT_MODE, load_report
+        report = load_report(model_path, DEFAULT_QUANT_MODE)
+        if report:
+            st.markdown(f"**Quantification INT8 ({report['mode']})** • "
+                        f"{report['images']} images d'évaluation")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Latence INT8", f"{report['int8']['latency_ms']['mean']:.0f} ms",
+                          delta=f"{report['int8']['latency_ms']['mean'] - report['fp32']['latency_ms']['mean']:+.0f} ms vs FP32",
+                          delta_color="inverse")
+            with col2:
+                # RSS maximal de chaque processus de mesure (anciens rapports: RSS ajouté)
+                memory = 'peak_rss_mb' if 'peak_rss_mb' in report['int8'] else 'rss_added_mb'
+                st.metric("Mémoire INT8 (pic)", f"{report['int8'][memory]:.0f} Mo",
+                          delta=f"{report['int8'][memory] - report['fp32'][memory]:+.0f} Mo vs FP32",
+                          delta_color="inverse")
+            with col3:
+                st.metric("Accord PLEINE/VIDE", f"{report['status_agreement']*100:.1f}%")
+        else:
+            st.warning("Aucun rapport d'évaluation INT8: lancer `python quantization.py --holdout <dossier>`")
     st.write(f"**Classes:** {list(model.names.values())}")
     st.write(f"**Nombre de classes:** {len(model.names)}")
+
+    st.markdown("### 🚀 Démarrage")
+    boot = startup_report()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Imports", f"{boot['timings'].get('import', 0):.1f}s")
+    with col2:
+        st.metric("Chargement", f"{boot['timings'].get('load', 0):.1f}s")
+    with col3:
+        st.metric("Préchauffage", f"{boot['timings'].get('warmup', 0):.1f}s")
+    with col4:
+        st.metric("Prêt après", f"{boot['ready_after']:.1f}s" if boot['ready_after'] else "N/A")
+    st.caption("Délai depuis le lancement du processus. `python startup.py` charge le modèle "
+               "dès le démarrage du serveur, avant la première session.")
     
     st.markdown("### 💾 Données")
     col1, col2 = st.columns(2)
@@ -0,0 +1,339 @@
+"""
+⚙️ Backends d'inférence
+Chargement du modèle en PyTorch, ONNX Runtime (FP32 ou INT8) ou OpenVINO (CPU)
+pytorch-mmap: poids PyTorch projetés en mémoire, partagés entre processus
+
+Les modèles exportés sont mis en cache à côté des poids, sous un nom
+dérivé de leur empreinte: un nouveau best.pt déclenche un nouvel export.
+
+Vérification de parité avec PyTorch:
+    python backends.py --backend onnx --images dossier_images/
+"""
+
+import argparse
+import functools
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import psutil
+
+from cache import hash_file
+from detection import load_image, to_rgb_array
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'onnx-int8', 'pytorch-mmap')
+DEFAULT_BACKEND = 'pytorch'
+EXPORT_IMGSZ = 640
+
+MODEL_PATHS = [
+    Path(__file__).parent / "best.pt",  # Même dossier que app.py
+    Path("best.pt"),
+    Path("streamlit_app/best.pt"),
+    Path("../best.pt"),
+    Path("backend/best.pt"),
+    Path("../backend/best.pt"),
+]
+
+# Tolérances de la vérification de parité
+PARITY_BOX_TOLERANCE = 2.0      # Écart max des coordonnées (pixels)
+PARITY_CONF_TOLERANCE = 0.02    # Écart max de confiance
+PARITY_MATCH_IOU = 0.5          # IoU min pour apparier deux boîtes
+
+# ============================================================================
+# EXPORT ET CHARGEMENT
+# ============================================================================
+def find_weights():
+    """Premier fichier de poids existant parmi MODEL_PATHS"""
+    for path in MODEL_PATHS:
+        if path.exists():
+            return path
+    return None
+
+
+def exported_path(weights_path, backend, imgsz=EXPORT_IMGSZ):
+    """
+    Emplacement du modèle exporté, à côté des poids et indexé par leur hash
+    """
+    weights_path = Path(weights_path)
+    tag = f"{weights_path.stem}.{hash_file(weights_path)[:12]}.{imgsz}"
+    if backend == 'onnx':
+        return weights_path.with_name(f"{tag}.onnx")
+    if backend == 'openvino':
+        # Ultralytics reconnaît les modèles OpenVINO au suffixe du dossier
+        return weights_path.with_name(f"{tag}_openvino_model")
+    if backend == 'pytorch-mmap':
+        return weights_path.with_name(f"{tag}.mmap.pt")
+    raise ValueError(f"Backend sans export: {backend}")
+
+
+def export_model(weights_path, backend, imgsz=EXPORT_IMGSZ):
+    """
+    Exporte les poids vers le backend demandé (une seule fois) et
+    retourne le chemin de l'artefact en cache
+    """
+    target = exported_path(weights_path, backend, imgsz)
+    if target.exists():
+        return target
+
+    from ultralytics import YOLO
+
+    if backend == 'pytorch-mmap':
+        _export_mapped(weights_path, target)
+        return target
+
+    # Batch dynamique pour garder le mode lot de detect_raw_batch
+    exported = Path(YOLO(str(weights_path)).export(
+        format=backend, imgsz=imgsz, dynamic=True, verbose=False
+    ))
+    if exported.is_dir() and target.exists():
+        shutil.rmtree(target)
+    exported.replace(target)
+    return target
+
+
+def _export_mapped(weights_path, target):
+    """
+    Checkpoint fusionné (conv + BN) en float32: chargé par mmap, il est
+    utilisé tel quel, sans conversion ni fusion qui recopieraient les poids
+    """
+    import torch
+    from ultralytics import YOLO
+
+    model = YOLO(str(weights_path))
+    checkpoint = {k: v for k, v in model.ckpt.items() if k not in ('ema', 'optimizer')}
+    checkpoint['model'] = model.model.float().fuse().eval()
+    # Écriture atomique: plusieurs processus peuvent charger l'artefact
+    partial = target.with_name(target.name + ".partial")
+    torch.save(checkpoint, partial)
+    partial.replace(target)
+
+
+@functools.lru_cache(maxsize=None)
+def _mapped_yolo_class():
+    """
+    Classe YOLO dont le prédicteur utilise le module projeté tel quel.
+    Ultralytics recopie le module en préparant le prédicteur (deepcopy) et
+    convertit les convolutions en channels_last sur CPU x86: les deux
+    remplacent les poids projetés par des copies privées à chaque processus.
+    """
+    from ultralytics import YOLO
+    from ultralytics.models.yolo.detect import DetectionPredictor
+
+    class MappedPredictor(DetectionPredictor):
+        def setup_model(self, model, verbose=True):
+            # Le deepcopy de setup_model renvoie le module lui-même
+            model.__deepcopy__ = lambda memo: model
+            try:
+                super().setup_model(model, verbose)
+            finally:
+                del model.__deepcopy__
+
+    class MappedYOLO(YOLO):
+        def predict(self, source=None, stream=False, predictor=None, **kwargs):
+            kwargs.setdefault('channels_last', False)
+            return super().predict(source, stream, predictor or MappedPredictor, **kwargs)
+
+    return MappedYOLO
+
+
+def load_mapped(weights_path):
+    """
+    Poids projetés en mémoire (mmap, torch >= 2.5): les tenseurs restent
+    adossés au fichier et les réplicas de plusieurs processus partagent
+    les mêmes pages du cache disque au lieu d'en avoir chacun une copie
+    """
+    from torch.utils.serialization import config
+
+    path = export_model(weights_path, 'pytorch-mmap')
+    previous, config.load.mmap = config.load.mmap, True
+    try:
+        return _mapped_yolo_class()(str(path))
+    finally:
+        config.load.mmap = previous
+
+
+def mapped_tensors(model, path):
+    """
+    (tenseurs adossés au fichier projeté, total) pour le module qui sert
+    réellement l'inférence (celui du prédicteur s'il est préparé);
+    None si les projections du processus ne sont pas lisibles (hors Linux)
+    """
+    module = model.predictor.model.model if model.predictor is not None else model.model
+    try:
+        maps = psutil.Process().memory_maps(grouped=False)
+    except (AttributeError, NotImplementedError, psutil.Error):
+        return None
+    path = str(Path(path).resolve())
+    ranges = [[int(bound, 16) for bound in m.addr.split('-')] for m in maps if m.path == path]
+    tensors = list(module.parameters()) + list(module.buffers())
+    mapped = sum(any(start <= t.untyped_storage().data_ptr() < end for start, end in ranges)
+                 for t in tensors)
+    return mapped, len(tensors)
+
+
+def mapped_memory(pid, path):
+    """RSS et PSS (octets) du fichier projeté dans un processus; None hors Linux"""
+    try:
+        maps = psutil.Process(pid).memory_maps(grouped=True)
+    except (AttributeError, NotImplementedError, psutil.Error):
+        return None
+    path = str(Path(path).resolve())
+    rows = [m for m in maps if m.path == path]
+    return {'rss': sum(m.rss for m in rows), 'pss': sum(getattr(m, 'pss', m.rss) for m in rows)}
+
+
+def load_detector(weights_path, backend=DEFAULT_BACKEND):
+    """
+    Charge le modèle pour le backend demandé.
+
+    Tous les backends passent par l'API YOLO d'Ultralytics: les résultats
+    (boxes, names) ont la même forme et detect_bin fonctionne à l'identique.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inconnu: {backend} (choix: {', '.join(BACKENDS)})")
+    # Import différé: ultralytics (et torch) coûte plusieurs secondes
+    from ultralytics import YOLO
+
+    if backend == 'pytorch':
+        return YOLO(str(weights_path))
+    if backend == 'onnx-int8':
+        # Mode et calibration: QUANT_MODE, QUANT_CALIBRATION_DIR
+        from quantization import load_quantized
+        return load_quantized(weights_path)
+    if backend == 'pytorch-mmap':
+        return load_mapped(weights_path)
+    return YOLO(str(export_model(weights_path, backend)), task='detect')
+
+
+def warm_up(model, batch_sizes=(1,), imgsz=EXPORT_IMGSZ):
+    """
+    Inférences sur des images noires: la première vraie requête ne paie
+    plus l'initialisation du prédicteur ni la croissance des allocations
+    """
+    blank = np.zeros((imgsz, imgsz, 3), dtype=np.uint8)
+    for batch_size in batch_sizes:
+        model([blank] * batch_size, verbose=False)
+
+# ============================================================================
+# PARITÉ
+# ============================================================================
+def box_iou(a, b):
+    """IoU entre deux ensembles de boîtes xyxy (N,4) x (M,4)"""
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_boxes(ref, cand, iou_threshold=PARITY_MATCH_IOU):
+    """
+    Appariement un à un (glouton par IoU décroissant) de boîtes de même
+    classe (N,6) x (M,6): liste de paires (i, j); chaque boîte sert au plus une fois
+    """
+    if len(ref) == 0 or len(cand) == 0:
+        return []
+    iou = box_iou(ref[:, :4], cand[:, :4])
+    iou[ref[:, 5][:, None] != cand[:, 5][None, :]] = 0.0
+    pairs, used_ref, used_cand = [], set(), set()
+    for flat in np.argsort(iou, axis=None)[::-1]:
+        i, j = np.unravel_index(flat, iou.shape)
+        if iou[i, j] <= iou_threshold:
+            break
+        if i in used_ref or j in used_cand:
+            continue
+        pairs.append((i, j))
+        used_ref.add(i)
+        used_cand.add(j)
+    return pairs
+
+
+def check_parity(reference, candidate, images, confidence_threshold=0.25,
+                 box_tolerance=PARITY_BOX_TOLERANCE, conf_tolerance=PARITY_CONF_TOLERANCE):
+    """
+    Compare les détections d'un backend à la référence PyTorch.
+
+    Les boîtes de même classe sont appariées une à une (match_boxes); on
+    mesure l'écart max des coordonnées et des confiances des paires, les
+    boîtes restées sans partenaire de chaque côté, et le nombre d'images
+    dont le nombre de boîtes diffère. Tout écart de nombre fait échouer.
+    """
+    max_box_diff = 0.0
+    max_conf_diff = 0.0
+    count_mismatches = 0
+    unmatched_ref = 0
+    unmatched_cand = 0
+
+    for image in images:
+        ref = reference(image, conf=confidence_threshold, verbose=False)[0].boxes.data.cpu().numpy()
+        cand = candidate(image, conf=confidence_threshold, verbose=False)[0].boxes.data.cpu().numpy()
+
+        if len(ref) != len(cand):
+            count_mismatches += 1
+        pairs = match_boxes(ref, cand)
+        unmatched_ref += len(ref) - len(pairs)
+        unmatched_cand += len(cand) - len(pairs)
+
+        if pairs:
+            rows, cols = map(list, zip(*pairs))
+            pairs_ref, pairs_cand = ref[rows], cand[cols]
+            max_box_diff = max(max_box_diff, float(np.abs(pairs_ref[:, :4] - pairs_cand[:, :4]).max()))
+            max_conf_diff = max(max_conf_diff, float(np.abs(pairs_ref[:, 4] - pairs_cand[:, 4]).max()))
+
+    return {
+        'images': len(images),
+        'max_box_diff_px': max_box_diff,
+        'max_conf_diff': max_conf_diff,
+        'count_mismatches': count_mismatches,
+        'unmatched_boxes': unmatched_ref + unmatched_cand,
+        'unmatched_reference': unmatched_ref,
+        'unmatched_candidate': unmatched_cand,
+        'passed': (max_box_diff <= box_tolerance and max_conf_diff <= conf_tolerance
+                   and count_mismatches == 0 and unmatched_ref + unmatched_cand == 0)
+    }
+
+
+def load_parity_images(folder=None, count=8, seed=0):
+    """Images d'un dossier, ou images synthétiques si aucun dossier"""
+    if folder:
+        paths = sorted(p for p in Path(folder).iterdir()
+                       if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))
+        return [to_rgb_array(load_image(p)) for p in paths[:count]]
+    rng = np.random.default_rng(seed)
+    return [(rng.random((480, 640, 3)) * 255).astype(np.uint8) for _ in range(count)]
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vérifie la parité d'un backend avec PyTorch")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default='onnx')
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--images", type=Path, default=None, help="Dossier d'images de test")
+    parser.add_argument("--count", type=int, default=8, help="Nombre d'images comparées")
+    parser.add_argument("--conf", type=float, default=0.25, help="Seuil de confiance")
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    report = check_parity(
+        load_detector(weights, 'pytorch'),
+        load_detector(weights, args.backend),
+        load_parity_images(args.images, args.count),
+        confidence_threshold=args.conf
+    )
+    report['backend'] = args.backend
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
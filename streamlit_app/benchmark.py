@@ -0,0 +1,266 @@
+"""
+🏁 Banc de performance de la détection
+Balaye backend, résolution, taille de lot et nombre de threads (et, avec
+--cascade, la cascade 320 → 640) sur un dossier d'images (ou des images
+synthétiques) et produit un rapport JSON: débit, latences p50/p95/p99,
+RSS max, durée par étape et part des images repassées en pleine résolution.
+Chaque configuration tourne dans un processus neuf: son RSS max ne dépend
+pas des configurations mesurées avant elle
+
+Mesure, puis comparaison à une référence (code retour 1 si régression):
+    python benchmark.py --images dossier/ --output bench.json
+    python benchmark.py --images dossier/ --compare bench.json --tolerance 0.1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backends import BACKENDS, find_weights, load_detector, load_parity_images
+from cache import hash_file
+from detection import detect_bin, detect_bins, to_rgb_array, load_image, STAGES
+from quantization import peak_rss_mb
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_RESOLUTIONS = ('320x240', '640x480', '1280x720')
+DEFAULT_BATCH_SIZES = (1, 8)
+DEFAULT_THREADS = (os.cpu_count() or 1,)
+DEFAULT_ITERATIONS = 20     # Appels mesurés par configuration
+WARMUP_ITERATIONS = 2
+REGRESSION_TOLERANCE = 0.10 # Baisse de débit / hausse de p95 tolérée
+
+# ============================================================================
+# MESURE
+# ============================================================================
+def parse_resolution(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def prepare_images(folder, count, resolution):
+    """Images du dossier (ou synthétiques) redimensionnées à la résolution"""
+    width, height = resolution
+    if folder:
+        paths = sorted(p for p in Path(folder).iterdir()
+                       if p.suffix.lower() in ('.jpg', '.jpeg', '.png'))[:count]
+        arrays = [to_rgb_array(load_image(p)) for p in paths]
+    else:
+        arrays = load_parity_images(None, count)
+    return [cv2.resize(a, (width, height), interpolation=cv2.INTER_AREA) for a in arrays]
+
+
+def set_threads(threads):
+    """Threads intra-opération de PyTorch (sans effet sur les sessions ONNX/OpenVINO déjà créées)"""
+    import torch
+    torch.set_num_threads(threads)
+
+
+def run_config(model, images, batch_size, iterations, confidence_threshold=0.25, cascade=False):
+    """
+    Mesure une configuration: chaque appel traite batch_size images
+    (detect_bin si 1, detect_bins sinon, dessin compris)
+    """
+    def call(i):
+        batch = [images[(i * batch_size + k) % len(images)] for k in range(batch_size)]
+        if batch_size == 1:
+            return [detect_bin(batch[0], model, confidence_threshold, cascade=cascade)]
+        return list(detect_bins(batch, model, confidence_threshold, batch_size, cascade=cascade))
+
+    for i in range(WARMUP_ITERATIONS):
+        call(i)
+
+    latencies = []
+    stages = {}
+    escalated = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        results = call(i)
+        latencies.append(time.perf_counter() - t0)
+        for result in results:
+            escalated += result['escalated']
+            for stage, seconds in result['timings'].items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+    elapsed = time.perf_counter() - start
+
+    total_images = iterations * batch_size
+    latencies = np.array(latencies) * 1000
+    return {
+        'images': total_images,
+        'throughput_ips': total_images / elapsed,
+        'latency_ms': {
+            'mean': float(latencies.mean()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95)),
+            'p99': float(np.percentile(latencies, 99))
+        },
+        'escalated_fraction': escalated / total_images if cascade else None,
+        # Durée moyenne par image et par étape
+        'stages_ms': {stage: stages[stage] / total_images * 1000
+                      for stage in STAGES if stage in stages}
+    }
+
+
+def _run_config_process(weights, backend, n_threads, images_dir, count, resolution,
+                        batch_size, iterations, cascade):
+    """
+    Corps du processus de mesure: threads fixés avant le chargement (pris
+    en compte aussi par les sessions ONNX/OpenVINO), puis run_config().
+    peak_rss_mb: RSS max du processus, inférences comprises (ru_maxrss);
+    peak_added_mb: part due aux inférences, au-delà du modèle chargé
+    """
+    set_threads(n_threads)
+    model = load_detector(weights, backend)
+    images = prepare_images(images_dir, count, parse_resolution(resolution))
+    baseline = peak_rss_mb()
+    result = run_config(model, images, batch_size, iterations, cascade=cascade)
+    peak = peak_rss_mb()
+    result.update(peak_rss_mb=peak, peak_added_mb=peak - baseline)
+    return result
+
+
+def run_isolated(*args):
+    """Une configuration dans un processus neuf (spawn)"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(_run_config_process, *args).result()
+
+
+def run_benchmark(weights, backends, resolutions, batch_sizes, threads, images_dir=None,
+                  count=16, iterations=DEFAULT_ITERATIONS, cascades=(False,)):
+    """Balaye toutes les combinaisons; un processus (et un chargement du modèle) par configuration"""
+    import torch
+    import ultralytics
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'weights': Path(weights).name,
+            'weights_sha256': hash_file(weights)[:12],
+            'images': str(images_dir) if images_dir else 'synthetic',
+            'iterations': iterations,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'torch': torch.__version__,
+            'ultralytics': ultralytics.__version__
+        },
+        'results': []
+    }
+
+    for backend in backends:
+        for n_threads in threads:
+            for res in resolutions:
+                for batch_size in batch_sizes:
+                    for cascade in cascades:
+                        result = run_isolated(weights, backend, n_threads, images_dir, count, res,
+                                              batch_size, iterations, cascade)
+                        result.update(backend=backend, resolution=res, batch_size=batch_size,
+                                      threads=n_threads, cascade=cascade)
+                        report['results'].append(result)
+                        print(f"{backend:>10} {res:>9} lot={batch_size:<3} threads={n_threads:<3} "
+                              f"{'cascade' if cascade else '640':>7} "
+                              f"{result['throughput_ips']:7.1f} img/s  p95={result['latency_ms']['p95']:8.1f} ms"
+                              + (f"  escaladées={result['escalated_fraction']*100:.0f}%" if cascade else ""),
+                              file=sys.stderr)
+    return report
+
+# ============================================================================
+# COMPARAISON
+# ============================================================================
+def config_key(result):
+    return (result['backend'], result['resolution'], result['batch_size'], result['threads'],
+            result.get('cascade', False))
+
+
+def compare(baseline, current, tolerance=REGRESSION_TOLERANCE):
+    """
+    Compare deux rapports configuration par configuration: régression si
+    le débit baisse ou si la latence p95 augmente de plus de `tolerance`
+    """
+    reference = {config_key(r): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        base = reference.get(config_key(result))
+        if base is None:
+            continue
+        throughput_change = result['throughput_ips'] / base['throughput_ips'] - 1
+        p95_change = result['latency_ms']['p95'] / base['latency_ms']['p95'] - 1
+        rows.append({
+            'backend': result['backend'],
+            'resolution': result['resolution'],
+            'batch_size': result['batch_size'],
+            'threads': result['threads'],
+            'cascade': result.get('cascade', False),
+            'throughput_change': throughput_change,
+            'p95_change': p95_change,
+            'regression': throughput_change < -tolerance or p95_change > tolerance
+        })
+    return {
+        'tolerance': tolerance,
+        'compared': len(rows),
+        'regressions': [row for row in rows if row['regression']],
+        'changes': rows
+    }
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de performance de la détection")
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--images", type=Path, default=None, help="Dossier d'images (défaut: synthétiques)")
+    parser.add_argument("--count", type=int, default=16, help="Images distinctes par résolution")
+    parser.add_argument("--backends", default="pytorch", help=f"Liste parmi: {', '.join(BACKENDS)}")
+    parser.add_argument("--resolutions", default=",".join(DEFAULT_RESOLUTIONS))
+    parser.add_argument("--batch-sizes", default=",".join(map(str, DEFAULT_BATCH_SIZES)))
+    parser.add_argument("--threads", default=",".join(map(str, DEFAULT_THREADS)))
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--cascade", action="store_true", help="Mesure aussi la cascade 320 → 640")
+    parser.add_argument("--output", type=Path, default=None, help="Rapport JSON (défaut: stdout)")
+    parser.add_argument("--compare", type=Path, default=None, help="Rapport de référence")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    report = run_benchmark(
+        weights,
+        backends=args.backends.split(","),
+        resolutions=args.resolutions.split(","),
+        batch_sizes=[int(b) for b in args.batch_sizes.split(",")],
+        threads=[int(t) for t in args.threads.split(",")],
+        images_dir=args.images,
+        count=args.count,
+        iterations=args.iterations,
+        cascades=(False, True) if args.cascade else (False,)
+    )
+
+    status = 0
+    if args.compare:
+        report['comparison'] = compare(json.loads(args.compare.read_text()), report, args.tolerance)
+        status = 1 if report['comparison']['regressions'] else 0
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
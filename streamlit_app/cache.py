@@ -0,0 +1,161 @@
+"""
+💾 Cache des résultats de détection
+Cache LRU borné (mémoire + disque optionnel) indexé par le contenu de l'image
+Les entrées sont les détections brutes (seuil plancher) de detect_raw,
+sans les pixels: l'appelant redécode l'image pour l'affichage
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_MAX_ENTRIES = 128        # Résultats gardés en mémoire
+DEFAULT_MAX_DISK_ENTRIES = 2048  # Résultats gardés sur disque
+PIXEL_KEYS = ('image',)          # Retirés des entrées (jusqu'à 36 Mo par image 4000x3000)
+
+# ============================================================================
+# EMPREINTES
+# ============================================================================
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Empreinte SHA-256 d'un fichier (poids du modèle), lue par blocs
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_key(image_bytes, model_fingerprint, **params):
+    """
+    Clé de cache: hash des octets de l'image, des poids et des paramètres
+    """
+    digest = hashlib.sha256()
+    digest.update(image_bytes)
+    digest.update(model_fingerprint.encode())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+# ============================================================================
+# CACHE LRU
+# ============================================================================
+class ResultCache:
+    """
+    Cache LRU thread-safe des détections brutes, partagé entre sessions.
+
+    Le niveau mémoire est borné à max_entries; si cache_dir est fourni, les
+    résultats sont aussi écrits sur disque (pickle) et relus en cas d'échec
+    mémoire, le nombre de fichiers étant borné à max_disk_entries.
+    Seuls les détections, noms, temps et échelle sont gardés (PIXEL_KEYS
+    retirés): une entrée pèse quelques Ko, le nombre d'entrées borne donc
+    aussi la mémoire.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, cache_dir=None,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Retourne une copie du résultat en cache, ou None"""
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                result = self._read_disk(key)
+                if result is not None:
+                    self._store(key, result)
+                    self.hits += 1
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+
+        if result is None:
+            return None
+
+        # Copie pour ne pas modifier l'entrée partagée
+        result = dict(result)
+        result['cached'] = True
+        return result
+
+    def put(self, key, result):
+        """Ajoute un résultat au cache (sans les pixels)"""
+        result = {k: v for k, v in result.items() if k not in PIXEL_KEYS}
+        with self._lock:
+            self._store(key, result)
+            self._write_disk(key, result)
+
+    def clear(self):
+        """Vide le niveau mémoire et remet les compteurs à zéro"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self):
+        """Compteurs du cache"""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+    # ------------------------------------------------------------------------
+    # Interne (appelé avec le verrou)
+    # ------------------------------------------------------------------------
+    def _store(self, key, result):
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self.cache_dir / f"{key}.pkl"
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        path.touch()
+        return result
+
+    def _write_disk(self, key, result):
+        if not self.cache_dir:
+            return
+        tmp_path = self.cache_dir / f"{key}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(self.cache_dir / f"{key}.pkl")
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        # Éviction des fichiers les moins récemment utilisés
+        files = list(self.cache_dir.glob("*.pkl"))
+        if len(files) > self.max_disk_entries:
+            files.sort(key=lambda p: p.stat().st_mtime)
+            for old in files[:len(files) - self.max_disk_entries]:
+                old.unlink(missing_ok=True)
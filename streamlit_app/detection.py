@@ -0,0 +1,600 @@
+"""
+🔍 Détection de poubelles - Logique d'inférence
+Fonctions partagées par l'application Streamlit (image unique et lots)
+"""
+
+import io
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import cv2
+from PIL import Image
+
+from display import fit
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_BATCH_SIZE = 8      # Images par passe avant du modèle
+DECODE_WORKERS = 4          # Threads de décodage des uploads
+MIN_CONFIDENCE = 0.1        # Seuil plancher de l'inférence (minimum du slider)
+MAX_CONFIDENCE = 0.9        # Seuil le plus haut proposé (maximum du slider)
+FULL_IMGSZ = 640            # Résolution d'entrée du modèle
+CASCADE_IMGSZ = 320         # Premier étage de la cascade
+CASCADE_MARGIN = 0.2        # Marge au-dessus du seuil pour accepter le premier étage
+
+# Étapes signalées au callback de progression, dans l'ordre
+STAGES = ('decode', 'preprocess', 'inference', 'postprocess', 'draw')
+
+
+def _no_progress(stage):
+    pass
+
+
+class StageTimer:
+    """
+    Chronomètre par étape sur horloge monotone (perf_counter).
+
+    start(stage) clôt l'étape en cours, en ouvre une nouvelle et la signale
+    au callback de progression; stop() renvoie les durées en secondes.
+    """
+
+    def __init__(self, progress=_no_progress):
+        self.timings = {}
+        self._progress = progress
+        self._stage = None
+        self._start = 0.0
+
+    def start(self, stage):
+        now = time.perf_counter()
+        self._close(now)
+        self._stage, self._start = stage, now
+        self._progress(stage)
+
+    def stop(self):
+        self._close(time.perf_counter())
+        self._stage = None
+        return self.timings
+
+    def _close(self, now):
+        if self._stage is not None:
+            self.timings[self._stage] = self.timings.get(self._stage, 0.0) + now - self._start
+
+# ============================================================================
+# STATUTS
+# ============================================================================
+def get_status(class_name):
+    """
+    Détermine le statut (PLEINE/VIDE/INCONNU) à partir du nom de classe
+    """
+    name = class_name.lower()
+    if "pleine" in name or "full" in name:
+        return {
+            'status': "PLEINE",
+            'emoji': "🔴",
+            'color': "#ef4444",
+            'message': "⚠️ Collecte requise immédiatement!"
+        }
+    if "vide" in name or "empty" in name:
+        return {
+            'status': "VIDE",
+            'emoji': "🟢",
+            'color': "#10b981",
+            'message': "✅ Aucune action nécessaire"
+        }
+    return {
+        'status': "INCONNU",
+        'emoji': "🟡",
+        'color': "#f59e0b",
+        'message': "🔍 Vérification manuelle recommandée"
+    }
+
+
+# Codes de statut du mode multi-poubelles (indices de STATUS_CODES)
+STATUS_CODES = ('PLEINE', 'VIDE', 'INCONNU')
+STATUS_RGB = ((239, 68, 68), (16, 185, 129), (245, 158, 11))
+_status_luts = {}
+
+
+def status_lut(names):
+    """
+    Table id de classe -> code de statut, calculée une fois par jeu de
+    classes: le statut de toutes les boîtes s'obtient par lut[cls]
+    """
+    key = tuple(sorted(names.items()))
+    lut = _status_luts.get(key)
+    if lut is None:
+        lut = np.full(max(names) + 1, STATUS_CODES.index('INCONNU'), dtype=np.int64)
+        for class_id, class_name in names.items():
+            lut[class_id] = STATUS_CODES.index(get_status(class_name)['status'])
+        lut = _status_luts[key] = lut
+    return lut
+
+# ============================================================================
+# DÉCODAGE DES IMAGES
+# ============================================================================
+def load_image(source):
+    """
+    Ouvre et décode complètement une image (fichier uploadé ou chemin)
+    """
+    image = Image.open(source)
+    image.load()
+    return image
+
+
+def decode_images(sources, max_workers=DECODE_WORKERS):
+    """
+    Décode plusieurs images en parallèle (l'ordre est conservé)
+    """
+    if len(sources) <= 1:
+        return [load_image(source) for source in sources]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as executor:
+        return list(executor.map(load_image, sources))
+
+
+def to_rgb_array(image):
+    """
+    Conversion PIL vers numpy RGB (un tableau numpy est supposé déjà RGB,
+    une IngestedImage donne son image d'affichage)
+    """
+    if isinstance(image, IngestedImage):
+        return image.display
+    if isinstance(image, np.ndarray):
+        return image
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return np.array(image)
+
+# ============================================================================
+# INGESTION RAPIDE
+# ============================================================================
+LETTERBOX_FILL = 114        # Gris de remplissage (celui d'Ultralytics)
+JPEG_REDUCTIONS = {8: cv2.IMREAD_REDUCED_COLOR_8, 4: cv2.IMREAD_REDUCED_COLOR_4,
+                   2: cv2.IMREAD_REDUCED_COLOR_2, 1: cv2.IMREAD_COLOR}
+
+# Orientation EXIF (tag 0x0112) -> transformation de l'image décodée
+_EXIF_TRANSFORMS = {
+    2: lambda a: cv2.flip(a, 1),
+    3: lambda a: cv2.rotate(a, cv2.ROTATE_180),
+    4: lambda a: cv2.flip(a, 0),
+    5: lambda a: cv2.transpose(a),
+    6: lambda a: cv2.rotate(a, cv2.ROTATE_90_CLOCKWISE),
+    7: lambda a: cv2.flip(cv2.transpose(a), -1),
+    8: lambda a: cv2.rotate(a, cv2.ROTATE_90_COUNTERCLOCKWISE)
+}
+
+
+class IngestedImage:
+    """
+    Image prête pour le modèle: tampon letterboxé à la taille d'entrée,
+    image d'affichage (décodée à échelle réduite) et de quoi ramener les
+    boîtes dans les coordonnées de l'image d'origine
+    """
+
+    __slots__ = ('display', 'letterboxed', 'gain', 'pad', 'scale', 'original_size', 'timings')
+
+    def __init__(self, display, letterboxed, gain, pad, scale, original_size, timings):
+        self.display = display
+        self.letterboxed = letterboxed
+        self.gain = gain                    # Affichage -> tampon
+        self.pad = pad                      # (gauche, haut) dans le tampon
+        self.scale = scale                  # Origine -> affichage
+        self.original_size = original_size  # (largeur, hauteur), orientation appliquée
+        self.timings = timings
+
+    def to_original(self, xyxy):
+        """Boîtes du tampon letterboxé vers l'image d'origine"""
+        left, top = self.pad
+        width, height = self.original_size
+        boxes = (xyxy - np.array([left, top, left, top], dtype=np.float32)) / (self.gain * self.scale)
+        return np.clip(boxes, 0, np.array([width, height, width, height], dtype=np.float32))
+
+
+def ingest(data, imgsz=FULL_IMGSZ, out=None):
+    """
+    Décode des octets d'image directement à la taille utile.
+
+    Un JPEG bien plus grand que l'entrée du modèle est décodé à 1/2, 1/4 ou
+    1/8 (mise à l'échelle DCT de libjpeg): la pleine résolution n'est jamais
+    matérialisée. L'orientation EXIF est appliquée, puis l'image est
+    redimensionnée directement dans le tampon letterboxé (out, réutilisable).
+    """
+    timer = StageTimer()
+    timer.start('decode')
+    header = Image.open(io.BytesIO(data))   # En-tête seulement: taille, format, EXIF
+    width, height = header.size
+    orientation = header.getexif().get(0x0112, 1)
+
+    reduction = 1
+    if header.format == 'JPEG':
+        reduction = next(r for r in JPEG_REDUCTIONS if r == 1 or max(width, height) / r >= imgsz)
+    array = cv2.imdecode(np.frombuffer(data, np.uint8), JPEG_REDUCTIONS[reduction] | cv2.IMREAD_IGNORE_ORIENTATION)
+    if array is None:
+        # Format non géré par OpenCV: décodage PIL
+        array = np.asarray(header.convert('RGB'))
+    else:
+        array = cv2.cvtColor(array, cv2.COLOR_BGR2RGB, dst=array)
+    if orientation in _EXIF_TRANSFORMS:
+        array = _EXIF_TRANSFORMS[orientation](array)
+        if orientation >= 5:
+            width, height = height, width
+
+    timer.start('preprocess')
+    out, gain, pad = letterbox(array, imgsz, out)
+    return IngestedImage(array, out, gain, pad, array.shape[1] / width, (width, height), timer.stop())
+
+
+def ingest_array(img_array, imgsz=FULL_IMGSZ, out=None):
+    """IngestedImage d'une image RGB déjà décodée (letterbox seulement)"""
+    timer = StageTimer()
+    timer.start('preprocess')
+    out, gain, pad = letterbox(img_array, imgsz, out)
+    height, width = img_array.shape[:2]
+    return IngestedImage(img_array, out, gain, pad, 1.0, (width, height), timer.stop())
+
+
+def letterbox(array, imgsz=FULL_IMGSZ, out=None):
+    """Redimensionne directement dans le tampon carré out; renvoie (tampon, gain, (gauche, haut))"""
+    h, w = array.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = max(1, round(w * gain)), max(1, round(h * gain))
+    left, top = (imgsz - new_w) // 2, (imgsz - new_h) // 2
+    if out is None:
+        out = np.empty((imgsz, imgsz, 3), dtype=np.uint8)
+    out.fill(LETTERBOX_FILL)
+    cv2.resize(array, (new_w, new_h), dst=out[top:top + new_h, left:left + new_w],
+               interpolation=cv2.INTER_AREA if gain < 1 else cv2.INTER_LINEAR)
+    return out, gain, (left, top)
+
+
+def ingest_images(sources, max_workers=DECODE_WORKERS):
+    """Ingestion parallèle de fichiers uploadés (ordre conservé)"""
+    datas = [source.getvalue() for source in sources]
+    if len(datas) <= 1:
+        return [ingest(data) for data in datas]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(datas))) as executor:
+        return list(executor.map(ingest, datas))
+
+# ============================================================================
+# POST-TRAITEMENT
+# ============================================================================
+def draw_detection(img_array, bbox, status, confidence):
+    """
+    Dessine la bounding box et son label sur une copie de l'image
+    """
+    img_with_box = img_array.copy()
+    x1, y1, x2, y2 = bbox.astype(int)
+
+    # Couleur selon status
+    box_color = (239, 68, 68) if status == "PLEINE" else (16, 185, 129)
+
+    cv2.rectangle(img_with_box, (x1, y1), (x2, y2), box_color, 3)
+
+    # Label
+    label = f"{status} {confidence*100:.1f}%"
+    (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)
+    cv2.rectangle(img_with_box, (x1, y1 - label_h - 10), (x1 + label_w, y1), box_color, -1)
+    cv2.putText(img_with_box, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return img_with_box
+
+
+def draw_detections(img_array, xyxy, codes, conf):
+    """
+    Dessine toutes les boîtes en un passage: contours et fonds de label
+    tracés par un seul appel OpenCV par couleur, puis le texte des labels
+    """
+    img_with_boxes = img_array.copy()
+    if len(xyxy) == 0:
+        return img_with_boxes
+
+    boxes = xyxy.astype(np.int32)
+    x1, y1, x2, y2 = boxes.T
+    labels = [f"{STATUS_CODES[code]} {score*100:.1f}%" for code, score in zip(codes, conf)]
+    sizes = np.array([cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0] for label in labels])
+    label_x2, label_y1 = x1 + sizes[:, 0], y1 - sizes[:, 1] - 10
+
+    # Rectangles en polygones (N, 4, 2): boîtes et fonds de label
+    outlines = np.stack([np.stack([x1, y1], 1), np.stack([x2, y1], 1),
+                         np.stack([x2, y2], 1), np.stack([x1, y2], 1)], axis=1)
+    backgrounds = np.stack([np.stack([x1, label_y1], 1), np.stack([label_x2, label_y1], 1),
+                            np.stack([label_x2, y1], 1), np.stack([x1, y1], 1)], axis=1)
+
+    for code, color in enumerate(STATUS_RGB):
+        selected = codes == code
+        if selected.any():
+            cv2.polylines(img_with_boxes, list(outlines[selected]), True, color, 3)
+            cv2.fillPoly(img_with_boxes, list(backgrounds[selected]), color)
+    for label, x, y in zip(labels, x1, y1):
+        cv2.putText(img_with_boxes, label, (int(x), int(y) - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+    return img_with_boxes
+
+
+def extract_detections(prediction):
+    """
+    Copie les boîtes d'une prédiction YOLO vers numpy en un seul transfert
+    """
+    data = prediction.boxes.data.cpu().numpy()
+    return {
+        'xyxy': data[:, :4].astype(np.float32),
+        'conf': data[:, 4].astype(np.float32),
+        'cls': data[:, 5].astype(np.int64)
+    }
+
+
+def filter_detections(detections, confidence_threshold):
+    """
+    Filtre vectorisé des détections par seuil de confiance
+    """
+    mask = detections['conf'] >= confidence_threshold
+    return {name: values[mask] for name, values in detections.items()}
+
+
+def build_result(raw, confidence_threshold=0.25, progress=_no_progress, draw=True, multi=False, max_side=None):
+    """
+    Construit le dictionnaire de résultat à partir des détections brutes.
+
+    Les détections brutes ont été obtenues au seuil plancher: le seuil
+    demandé est appliqué ici par un simple masque, sans nouvelle inférence.
+    draw=False saute le dessin (image_with_detection est alors l'image d'origine).
+    multi=True garde toutes les poubelles ('bins', 'counts') et les dessine
+    toutes; le statut global reste celui de la meilleure boîte.
+    max_side: image annotée rendue à ce plus grand côté au plus (affichage).
+    """
+    timer = StageTimer(progress)
+    timer.start('draw')
+    img_array = raw['image']
+    scale = raw.get('scale', 1.0)   # Boîtes en coordonnées d'origine -> image affichée
+    if max_side:
+        shown = fit(img_array, max_side)
+        scale *= shown.shape[1] / img_array.shape[1]
+        img_array = shown
+
+    detections = filter_detections(raw['detections'], confidence_threshold)
+
+    result_data = {
+        'timestamp': datetime.now(),
+        'image_size': raw.get('image_size', (img_array.shape[1], img_array.shape[0])),
+        'confidence_threshold': confidence_threshold,
+        'cached': raw.get('cached', False),
+        'tier': raw.get('tier', FULL_IMGSZ),
+        'escalated': raw.get('escalated', False),
+        'reused': raw.get('reused', False)
+    }
+
+    if len(detections['conf']) > 0:
+        best_idx = int(detections['conf'].argmax())
+
+        class_id = int(detections['cls'][best_idx])
+        confidence = float(detections['conf'][best_idx])
+        class_name = raw['names'][class_id]
+        bbox = detections['xyxy'][best_idx]
+
+        # Détermination du statut
+        status_info = get_status(class_name)
+
+        if multi:
+            # Statuts de toutes les boîtes par la table des classes
+            codes = status_lut(raw['names'])[detections['cls']]
+            counts = np.bincount(codes, minlength=len(STATUS_CODES))
+            result_data['counts'] = dict(zip(STATUS_CODES, counts.tolist()))
+            result_data['bins'] = [
+                {'status': STATUS_CODES[code], 'confidence': score, 'bbox': box}
+                for code, score, box in zip(codes.tolist(), detections['conf'].tolist(),
+                                            detections['xyxy'].tolist())
+            ]
+            img_with_box = draw_detections(img_array, detections['xyxy'] * scale, codes,
+                                           detections['conf']) if draw else img_array
+        else:
+            # Dessiner la bounding box
+            img_with_box = draw_detection(img_array, bbox * scale, status_info['status'], confidence) if draw else img_array
+
+        result_data.update(status_info)
+        result_data.update({
+            'confidence': confidence,
+            'class_name': class_name,
+            'bbox': bbox.tolist(),
+            'image_with_detection': img_with_box,
+            'num_detections': len(detections['conf'])
+        })
+    else:
+        result_data.update({
+            'status': 'AUCUNE_DETECTION',
+            'emoji': '❌',
+            'color': '#6b7280',
+            'message': 'Aucune poubelle détectée',
+            'confidence': 0.0,
+            'image_with_detection': img_array,
+            'num_detections': 0
+        })
+        if multi:
+            result_data['counts'] = dict.fromkeys(STATUS_CODES, 0)
+            result_data['bins'] = []
+
+    # Un résultat issu du cache ne coûte que le post-traitement
+    timings = {} if result_data['cached'] else dict(raw['timings'])
+    timings.update(timer.stop())
+    result_data['timings'] = timings
+    result_data['processing_time'] = sum(timings.values())
+
+    return result_data
+
+# ============================================================================
+# FONCTIONS DE DÉTECTION
+# ============================================================================
+def detect_raw(image, model, confidence_threshold=MIN_CONFIDENCE, progress=_no_progress, imgsz=FULL_IMGSZ):
+    """
+    Inférence seule: détections brutes au seuil plancher.
+
+    progress(stage) est appelé au début de chaque étape (voir STAGES).
+    """
+    timer = StageTimer(progress)
+
+    timer.start('decode')
+    if not isinstance(image, (np.ndarray, IngestedImage)):
+        image.load()
+
+    timer.start('preprocess')
+    img_array = to_rgb_array(image)
+
+    # Prédiction
+    timer.start('inference')
+    results = model(model_input(image), conf=min(MIN_CONFIDENCE, confidence_threshold), imgsz=imgsz, verbose=False)
+
+    timer.start('postprocess')
+    detections = extract_detections(results[0])
+
+    timings = timer.stop()
+    return map_ingested(image, {
+        'image': img_array,
+        'names': results[0].names,
+        'detections': detections,
+        'timings': timings,
+        'processing_time': sum(timings.values()),
+        'tier': imgsz
+    })
+
+
+def detect_raw_batch(images, model, batch_size=DEFAULT_BATCH_SIZE, confidence_threshold=MIN_CONFIDENCE,
+                     imgsz=FULL_IMGSZ):
+    """
+    Inférence par lots: détections brutes au seuil plancher.
+
+    Chaque lot est letterboxé par le modèle en un seul tenseur et traité en
+    une seule passe avant. Les détections sont produites (generator) dans
+    l'ordre des images, au fur et à mesure que les lots se terminent.
+    Les durées de chaque étape d'un lot sont réparties entre ses images.
+    """
+    batch_size = max(1, int(batch_size))
+
+    for start in range(0, len(images), batch_size):
+        timer = StageTimer()
+
+        timer.start('preprocess')
+        chunk = images[start:start + batch_size]
+        arrays = [to_rgb_array(image) for image in chunk]
+
+        # Prédiction du lot complet
+        timer.start('inference')
+        results = model([model_input(image) for image in chunk], conf=min(MIN_CONFIDENCE, confidence_threshold),
+                        imgsz=imgsz, verbose=False)
+
+        timer.start('postprocess')
+        all_detections = [extract_detections(prediction) for prediction in results]
+
+        timings = {stage: duration / len(arrays) for stage, duration in timer.stop().items()}
+        for image, prediction, img_array, detections in zip(chunk, results, arrays, all_detections):
+            yield map_ingested(image, {
+                'image': img_array,
+                'names': prediction.names,
+                'detections': detections,
+                'timings': dict(timings),
+                'processing_time': sum(timings.values()),
+                'batch_size': len(arrays),
+                'tier': imgsz
+            })
+
+
+def model_input(image):
+    """Ce que reçoit le modèle: le tampon letterboxé d'une IngestedImage, sinon l'image RGB"""
+    return image.letterboxed if isinstance(image, IngestedImage) else to_rgb_array(image)
+
+
+def map_ingested(image, raw):
+    """
+    Image ingérée: boîtes ramenées aux coordonnées d'origine et durées
+    d'ingestion (décodage, letterbox) ajoutées à celles de l'inférence
+    """
+    if not isinstance(image, IngestedImage):
+        return raw
+    raw['detections']['xyxy'] = image.to_original(raw['detections']['xyxy'])
+    for stage, duration in image.timings.items():
+        raw['timings'][stage] = raw['timings'].get(stage, 0.0) + duration
+    raw['processing_time'] = sum(raw['timings'].values())
+    raw['scale'] = image.scale
+    raw['image_size'] = image.original_size
+    return raw
+
+# ============================================================================
+# CASCADE DE RÉSOLUTIONS
+# ============================================================================
+def needs_escalation(detections, confidence_threshold, margin=CASCADE_MARGIN):
+    """Aucune boîte nettement au-dessus du seuil: résultat incertain ou vide"""
+    return not (detections['conf'] >= confidence_threshold + margin).any()
+
+
+def _escalate(low, full, image=None):
+    """Résultat pleine résolution, avec le coût des deux passes (ingestion comptée une fois)"""
+    ingest_timings = image.timings if isinstance(image, IngestedImage) else {}
+    timings = dict(low['timings'])
+    for stage, duration in full['timings'].items():
+        timings[stage] = timings.get(stage, 0.0) + duration - ingest_timings.get(stage, 0.0)
+    return dict(full, timings=timings, processing_time=sum(timings.values()), escalated=True)
+
+
+def detect_raw_cascade(image, model, confidence_threshold=0.25, progress=_no_progress,
+                       low_imgsz=CASCADE_IMGSZ, margin=CASCADE_MARGIN):
+    """
+    Passe à basse résolution d'abord; la pleine résolution n'est lancée que
+    si le meilleur score n'est pas nettement au-dessus du seuil.
+    'tier' indique la résolution qui a répondu.
+    """
+    raw = detect_raw(image, model, confidence_threshold, progress, imgsz=low_imgsz)
+    if not needs_escalation(raw['detections'], confidence_threshold, margin):
+        return raw
+    # Une image ingérée repasse par son tampon (boîtes en coordonnées d'origine)
+    full_input = image if isinstance(image, IngestedImage) else raw['image']
+    full = detect_raw(full_input, model, confidence_threshold, progress, imgsz=FULL_IMGSZ)
+    return _escalate(raw, full, image)
+
+
+def detect_raw_batch_cascade(images, model, batch_size=DEFAULT_BATCH_SIZE, confidence_threshold=0.25,
+                             low_imgsz=CASCADE_IMGSZ, margin=CASCADE_MARGIN):
+    """
+    Cascade par lots: toutes les images à basse résolution, puis un second
+    lot à pleine résolution pour les seules images incertaines (liste, ordre conservé)
+    """
+    raws = list(detect_raw_batch(images, model, batch_size, confidence_threshold, imgsz=low_imgsz))
+    uncertain = [i for i, raw in enumerate(raws)
+                 if needs_escalation(raw['detections'], confidence_threshold, margin)]
+    if uncertain:
+        full_inputs = [images[i] if isinstance(images[i], IngestedImage) else raws[i]['image'] for i in uncertain]
+        fulls = detect_raw_batch(full_inputs, model, batch_size, confidence_threshold, imgsz=FULL_IMGSZ)
+        for i, full in zip(uncertain, fulls):
+            raws[i] = _escalate(raws[i], full, images[i])
+    return raws
+
+
+def detect_bin(image, model, confidence_threshold=0.25, progress=_no_progress, cascade=False, multi=False,
+               tiled=False, gate=None, source="default"):
+    """
+    Effectue la détection sur une image (cascade=True: 320 puis 640 si incertain,
+    multi=True: toutes les poubelles de l'image, tiled=True: découpage en tuiles,
+    gate: SceneGate qui réutilise le dernier résultat de la source si la scène n'a pas changé)
+    """
+    def run(image):
+        if tiled:
+            from tiling import detect_raw_tiled
+            return detect_raw_tiled(image, model, confidence_threshold)
+        if cascade:
+            return detect_raw_cascade(image, model, confidence_threshold, progress)
+        return detect_raw(image, model, confidence_threshold, progress)
+
+    raw = run(image) if gate is None else gate.detect(source, image, run)
+    return build_result(raw, confidence_threshold, progress, multi=multi)
+
+
+def detect_bins(images, model, confidence_threshold=0.25, batch_size=DEFAULT_BATCH_SIZE, draw=True,
+                cascade=False, multi=False):
+    """
+    Effectue la détection sur une liste d'images, par lots (generator)
+    """
+    if cascade:
+        raws = detect_raw_batch_cascade(images, model, batch_size, confidence_threshold)
+    else:
+        raws = detect_raw_batch(images, model, batch_size, confidence_threshold)
+    for raw in raws:
+        result = build_result(raw, confidence_threshold, draw=draw, multi=multi)
+        result['batch_size'] = raw['batch_size']
+        yield result
@@ -0,0 +1,108 @@
+"""
+🖼️ Images d'affichage
+Les images annotées sont rendues à la résolution d'affichage, encodées
+une seule fois (JPEG ou WebP) et gardées par identifiant de résultat: les
+reruns Streamlit renvoient les mêmes octets au lieu de réencoder en PNG
+un tableau pleine résolution. La pleine résolution n'est produite qu'à
+la demande (téléchargement).
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DISPLAY_MAX_SIDE = int(os.environ.get("DISPLAY_MAX_SIDE", 1280))        # Plus grand côté affiché (pixels)
+DISPLAY_FORMAT = os.environ.get("DISPLAY_FORMAT", "jpeg").lower()       # jpeg ou webp
+DISPLAY_QUALITY = int(os.environ.get("DISPLAY_QUALITY", 80))            # Qualité de l'encodage (1-100)
+DISPLAY_CACHE_MB = float(os.environ.get("DISPLAY_CACHE_MB", 64))        # Octets encodés gardés en mémoire
+FULL_QUALITY = 95                                                       # Téléchargement pleine résolution
+
+_ENCODINGS = {
+    'jpeg': ('.jpg', cv2.IMWRITE_JPEG_QUALITY),
+    'webp': ('.webp', cv2.IMWRITE_WEBP_QUALITY)
+}
+
+# ============================================================================
+# ENCODAGE
+# ============================================================================
+def fit(img_array, max_side):
+    """Réduit une image RGB pour que son plus grand côté tienne dans max_side"""
+    h, w = img_array.shape[:2]
+    scale = max_side / max(h, w) if max_side else 1.0
+    if scale >= 1.0:
+        return img_array
+    return cv2.resize(img_array, (max(1, round(w * scale)), max(1, round(h * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+def encode_image(img_array, max_side=DISPLAY_MAX_SIDE, fmt=DISPLAY_FORMAT, quality=DISPLAY_QUALITY):
+    """Image RGB réduite à max_side (None: taille d'origine) et encodée (bytes)"""
+    extension, flag = _ENCODINGS[fmt]
+    ok, buffer = cv2.imencode(extension, cv2.cvtColor(fit(img_array, max_side), cv2.COLOR_RGB2BGR),
+                              [flag, quality])
+    return buffer.tobytes() if ok else None
+
+
+def load_full_resolution(data):
+    """Décodage complet d'un upload, orientation EXIF appliquée (téléchargement, tuiles)"""
+    return np.asarray(ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert('RGB'))
+
+# ============================================================================
+# CACHE
+# ============================================================================
+class EncodedImageCache:
+    """
+    Cache LRU thread-safe d'images encodées, borné en octets et partagé
+    entre sessions. get_or_encode(key, render) n'appelle render() (qui
+    renvoie un tableau RGB) qu'en cas d'absence.
+    """
+
+    def __init__(self, max_bytes=int(DISPLAY_CACHE_MB * 2**20), max_side=DISPLAY_MAX_SIDE,
+                 fmt=DISPLAY_FORMAT, quality=DISPLAY_QUALITY):
+        self.max_bytes = max_bytes
+        self.max_side = max_side
+        self.fmt = fmt
+        self.quality = quality
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, key, render):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        # Encodage hors du verrou: deux sessions concurrentes encodent au pire deux fois
+        data = encode_image(render(), self.max_side, self.fmt, self.quality)
+        with self._lock:
+            if data is not None and key not in self._entries:
+                self._entries[key] = data
+                self.size += len(data)
+                while self.size > self.max_bytes and len(self._entries) > 1:
+                    self.size -= len(self._entries.popitem(last=False)[1])
+        return data
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
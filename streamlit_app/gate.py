@@ -0,0 +1,132 @@
+"""
+🚪 Filtre de changement de scène
+Caméras fixes: deux clichés successifs d'une même source sont souvent
+presque identiques. Une signature de quelques centaines d'octets (image
+réduite en niveaux de gris) est comparée à celle de la dernière image
+réellement analysée pour la source; si la scène n'a pas changé, le
+résultat précédent est réutilisé au lieu de relancer le modèle.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from detection import IngestedImage, to_rgb_array
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+SIGNATURE_SIZE = 32                                                     # Côté de l'image réduite
+# Écart moyen (niveaux de gris 0-255) sous lequel la scène est inchangée; 0 (défaut) désactive le
+# filtre. Vider une poubelle ne déplace la signature que de ~5.6: calibrer par caméra, autour de 2.
+GATE_THRESHOLD = float(os.environ.get("SCENE_GATE_THRESHOLD", 0.0))
+GATE_REFRESH = float(os.environ.get("SCENE_GATE_REFRESH_S", 300))       # Analyse forcée au-delà (secondes)
+GATE_MAX_SOURCES = 1024                                                 # Sources suivies (LRU)
+
+
+def signature(img_array):
+    """
+    Image réduite en niveaux de gris, centrée sur sa moyenne: insensible
+    aux variations globales d'exposition
+    """
+    small = cv2.resize(img_array, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY).astype(np.float32)
+    return gray - gray.mean()
+
+# ============================================================================
+# FILTRE
+# ============================================================================
+class SceneGate:
+    """
+    Filtre thread-safe par source (poubelle/caméra).
+
+    check(source, image) renvoie le résultat précédent (reused=True) si la
+    scène n'a pas changé de plus de threshold depuis la dernière analyse et
+    que celle-ci date de moins de refresh_interval secondes; sinon None et
+    une signature à passer à record() avec le résultat de la nouvelle analyse.
+    """
+
+    def __init__(self, threshold=GATE_THRESHOLD, refresh_interval=GATE_REFRESH,
+                 max_sources=GATE_MAX_SOURCES, metrics=None):
+        self.threshold = threshold
+        self.refresh_interval = refresh_interval
+        self.max_sources = max_sources
+        self.metrics = metrics
+        self.stats = {'checks': 0, 'hits': 0, 'saved_seconds': 0.0}
+        self._sources = OrderedDict()   # source -> dernière analyse
+        self._lock = threading.Lock()
+
+    def check(self, source, image):
+        start = time.perf_counter()
+        img_array = to_rgb_array(image)
+        pending = {
+            'source': source,
+            'signature': signature(img_array),
+            'size': image.original_size if isinstance(image, IngestedImage) else img_array.shape[:2]
+        }
+
+        with self._lock:
+            self.stats['checks'] += 1
+            self._count('scene_gate_checks')
+            entry = self._sources.get(source)
+            if entry is None:
+                return None, pending
+            self._sources.move_to_end(source)
+            unchanged = (entry['size'] == pending['size']
+                         and time.monotonic() - entry['analysed_at'] < self.refresh_interval
+                         and float(np.abs(pending['signature'] - entry['signature']).mean()) < self.threshold)
+            if not unchanged:
+                return None, pending
+
+            raw = self._reuse(entry['raw'], image, img_array, time.perf_counter() - start)
+            saved = max(0.0, entry['raw']['processing_time'] - raw['processing_time'])
+            self.stats['hits'] += 1
+            self.stats['saved_seconds'] += saved
+            self._count('scene_gate_hits')
+            self._count('scene_gate_saved_seconds', saved)
+            return raw, None
+
+    def record(self, pending, raw):
+        """Nouvelle référence de la source (sans l'image, seules les détections sont gardées)"""
+        with self._lock:
+            self._sources[pending['source']] = dict(
+                pending,
+                raw={k: v for k, v in raw.items() if k != 'image'},
+                analysed_at=time.monotonic()
+            )
+            self._sources.move_to_end(pending['source'])
+            if len(self._sources) > self.max_sources:
+                self._sources.popitem(last=False)
+
+    def detect(self, source, image, run):
+        """check(), puis run(image) et record() si la scène a changé"""
+        raw, pending = self.check(source, image)
+        if raw is None:
+            raw = run(image)
+            self.record(pending, raw)
+        return raw
+
+    @staticmethod
+    def _reuse(previous, image, img_array, gate_seconds):
+        # Détections de la dernière analyse, image et coût de la requête courante
+        timings = dict(image.timings) if isinstance(image, IngestedImage) else {}
+        timings['preprocess'] = timings.get('preprocess', 0.0) + gate_seconds
+        return dict(previous, image=img_array, timings=timings,
+                    processing_time=sum(timings.values()), reused=True)
+
+    def snapshot(self):
+        with self._lock:
+            checks = self.stats['checks']
+            return dict(
+                self.stats,
+                sources=len(self._sources),
+                hit_rate=self.stats['hits'] / checks if checks else 0.0
+            )
+
+    def _count(self, name, amount=1):
+        if self.metrics is not None:
+            self.metrics.increment(name, amount)
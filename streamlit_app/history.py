@@ -0,0 +1,59 @@
+"""
+📜 Historique compact des analyses
+Un enregistrement par analyse: les scalaires affichés par la page
+Statistiques, la bbox et une miniature JPEG, sans l'image annotée
+en pleine résolution
+"""
+
+from display import encode_image
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+THUMBNAIL_SIZE = 160        # Plus grand côté de la miniature (pixels)
+THUMBNAIL_QUALITY = 70      # Qualité JPEG de la miniature
+
+
+def encode_thumbnail(img_array, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Miniature JPEG (bytes) d'une image RGB"""
+    return encode_image(img_array, size, 'jpeg', quality)
+
+# ============================================================================
+# ENREGISTREMENT
+# ============================================================================
+class HistoryRecord:
+    """
+    Entrée d'historique à attributs fixes (__slots__): quelques centaines
+    d'octets plus la miniature, au lieu d'une copie de l'image complète
+    """
+
+    __slots__ = ('timestamp', 'status', 'emoji', 'confidence', 'processing_time',
+                 'num_detections', 'bbox', 'image_size', 'thumbnail')
+
+    def __init__(self, timestamp, status, emoji, confidence, processing_time,
+                 num_detections, bbox=None, image_size=None, thumbnail=None):
+        self.timestamp = timestamp
+        self.status = status
+        self.emoji = emoji
+        self.confidence = confidence
+        self.processing_time = processing_time
+        self.num_detections = num_detections
+        self.bbox = bbox
+        self.image_size = image_size
+        self.thumbnail = thumbnail
+
+    @classmethod
+    def from_result(cls, result):
+        """Enregistrement compact d'un résultat de build_result"""
+        bbox = result.get('bbox')
+        return cls(
+            timestamp=result['timestamp'],
+            status=result['status'],
+            emoji=result['emoji'],
+            confidence=float(result['confidence']),
+            processing_time=float(result['processing_time']),
+            num_detections=int(result['num_detections']),
+            bbox=tuple(round(float(v), 1) for v in bbox) if bbox is not None else None,
+            image_size=result['image_size'],
+            thumbnail=encode_thumbnail(result['image_with_detection'])
+        )
@@ -0,0 +1,191 @@
+"""
+⏱️ Métriques de latence par étape
+Histogrammes glissants (p50/p95/p99) partagés par toutes les sessions,
+exportables en JSON ou au format texte Prometheus
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+WINDOW_SIZE = 1024          # Échantillons gardés par étape pour les quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Bornes des buckets cumulés (secondes), façon client Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+METRIC_PREFIX = "smartbin"
+
+# ============================================================================
+# HISTOGRAMME GLISSANT
+# ============================================================================
+class RollingHistogram:
+    """
+    Histogramme d'une durée: buckets cumulés depuis le démarrage, et fenêtre
+    glissante des derniers échantillons pour les quantiles
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, buckets=BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.window = deque(maxlen=window_size)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.window.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+    def quantiles(self, quantiles=QUANTILES):
+        if not self.window:
+            return {q: 0.0 for q in quantiles}
+        values = np.quantile(np.fromiter(self.window, dtype=np.float64), quantiles)
+        return dict(zip(quantiles, values.tolist()))
+
+# ============================================================================
+# REGISTRE
+# ============================================================================
+class MetricsRegistry:
+    """
+    Registre thread-safe des latences par étape (decode, preprocess,
+    inference, postprocess, draw, total), et de jauges/compteurs simples
+    (profondeur de file, requêtes refusées...)
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE):
+        self.window_size = window_size
+        self.started_at = time.time()
+        self._histograms = {}
+        self._gauges = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Enregistre une durée pour une étape"""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = RollingHistogram(self.window_size)
+            histogram.observe(seconds)
+
+    def set_gauge(self, name, value):
+        """Valeur instantanée (ex: profondeur de file)"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def increment(self, name, amount=1):
+        """Compteur cumulé depuis le démarrage"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_timings(self, timings):
+        """Enregistre les durées par étape d'un résultat, et leur total"""
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+        self.observe('total', sum(timings.values()))
+
+    def snapshot(self):
+        """Vue JSON-compatible: compte, moyenne et quantiles par étape"""
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                quantiles = histogram.quantiles()
+                stages[stage] = {
+                    'count': histogram.count,
+                    'mean': histogram.sum / histogram.count,
+                    'p50': quantiles[0.5],
+                    'p95': quantiles[0.95],
+                    'p99': quantiles[0.99]
+                }
+            gauges = dict(self._gauges)
+            counters = dict(self._counters)
+        return {
+            'uptime_seconds': time.time() - self.started_at,
+            'window_size': self.window_size,
+            'stages': stages,
+            'gauges': gauges,
+            'counters': counters
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Format texte d'exposition Prometheus"""
+        histogram_name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        summary_name = f"{METRIC_PREFIX}_stage_duration_window_seconds"
+
+        lines = [
+            f"# HELP {histogram_name} Durée des étapes de détection depuis le démarrage.",
+            f"# TYPE {histogram_name} histogram"
+        ]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            for stage, histogram in histograms:
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    lines.append(f'{histogram_name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+                lines.append(f'{histogram_name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{histogram_name}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{histogram_name}_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {summary_name} Quantiles des étapes sur la fenêtre glissante.")
+            lines.append(f"# TYPE {summary_name} summary")
+            for stage, histogram in histograms:
+                for q, value in histogram.quantiles().items():
+                    lines.append(f'{summary_name}{{stage="{stage}",quantile="{q}"}} {value}')
+                lines.append(f'{summary_name}_sum{{stage="{stage}"}} {sum(histogram.window)}')
+                lines.append(f'{summary_name}_count{{stage="{stage}"}} {len(histogram.window)}')
+
+            for name, value in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} gauge")
+                lines.append(f"{METRIC_PREFIX}_{name} {value}")
+            for name, value in sorted(self._counters.items()):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+                lines.append(f"{METRIC_PREFIX}_{name}_total {value}")
+
+        return "\n".join(lines) + "\n"
+
+# ============================================================================
+# SERVEUR D'EXPORT
+# ============================================================================
+def start_metrics_server(registry, port, host="0.0.0.0"):
+    """
+    Démarre un serveur HTTP (thread daemon) exposant le registre:
+    /metrics (Prometheus) et /metrics.json (JSON)
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = registry.to_prometheus().encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = registry.to_json().encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,289 @@
+"""
+🧮 Quantification INT8 du modèle
+Quantification post-entraînement (dynamique ou statique) du modèle ONNX,
+et comparaison avec le modèle FP32: latence, RSS maximal, accord PLEINE/VIDE
+(chaque modèle est mesuré dans un processus neuf)
+
+Quantification statique calibrée puis évaluation sur un dossier réservé:
+    python quantization.py --mode static --calibration calib/ --holdout holdout/
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from backends import export_model, exported_path, find_weights, load_detector, EXPORT_IMGSZ
+from detection import detect_raw, build_result, load_image
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+QUANT_MODES = ('dynamic', 'static')
+DEFAULT_QUANT_MODE = os.environ.get("QUANT_MODE", "dynamic")
+QUANT_CALIBRATION_DIR = os.environ.get("QUANT_CALIBRATION_DIR")
+NUM_CALIBRATION_IMAGES = 64
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png')
+
+# ============================================================================
+# CALIBRATION
+# ============================================================================
+def list_images(folder):
+    """Images d'un dossier, triées"""
+    return sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+
+
+def letterbox_tensor(img_array, imgsz=EXPORT_IMGSZ):
+    """
+    Prétraitement identique à Ultralytics pour un modèle exporté:
+    letterbox carré (gris 114), RGB, NCHW float32 dans [0, 1]
+    """
+    h, w = img_array.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = round(w * scale), round(h * scale)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = cv2.resize(
+        img_array, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+    )
+    return canvas.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+
+
+def make_calibration_reader(folder, input_name, count=NUM_CALIBRATION_IMAGES):
+    """Lecteur de calibration ONNX Runtime sur un dossier d'images"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class ImageFolderReader(CalibrationDataReader):
+        def __init__(self):
+            self.paths = iter(list_images(folder)[:count])
+
+        def get_next(self):
+            path = next(self.paths, None)
+            if path is None:
+                return None
+            img_array = np.array(load_image(path).convert('RGB'))
+            return {input_name: letterbox_tensor(img_array)}
+
+    return ImageFolderReader()
+
+# ============================================================================
+# QUANTIFICATION
+# ============================================================================
+def quantized_path(weights_path, mode):
+    """Emplacement du modèle INT8, à côté du modèle ONNX FP32"""
+    fp32_path = exported_path(weights_path, 'onnx')
+    return fp32_path.with_name(f"{fp32_path.stem}.int8-{mode}.onnx")
+
+
+def report_path(weights_path, mode):
+    """Rapport d'évaluation FP32/INT8, enregistré à côté du modèle INT8"""
+    return quantized_path(weights_path, mode).with_suffix('.report.json')
+
+
+def load_report(weights_path, mode=DEFAULT_QUANT_MODE):
+    """Dernier rapport d'évaluation, ou None"""
+    path = report_path(weights_path, mode)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def head_nodes(onnx_model):
+    """
+    Noeuds de décodage de la tête Detect (DFL, ancres, concaténations),
+    laissés en FP32: seules les convolutions cv2/cv3 sont quantifiées
+    """
+    indices = [int(m.group(1)) for node in onnx_model.graph.node
+               for m in [re.match(r"/model\.(\d+)/", node.name)] if m]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in onnx_model.graph.node
+            if node.name.startswith(prefix) and "/cv2." not in node.name and "/cv3." not in node.name]
+
+
+def quantize_model(weights_path, mode=DEFAULT_QUANT_MODE, calibration_dir=QUANT_CALIBRATION_DIR):
+    """
+    Produit (une seule fois) le modèle INT8 à partir de l'export ONNX FP32.
+
+    dynamic: poids INT8, activations quantifiées à la volée (sans données);
+             ConvInteger est souvent plus lent que FP32 sur CPU, à mesurer
+    static: poids et activations INT8 (QDQ), calibrés sur calibration_dir
+    """
+    import onnx
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Mode de quantification inconnu: {mode} (choix: {', '.join(QUANT_MODES)})")
+    target = quantized_path(weights_path, mode)
+    if target.exists():
+        return target
+    if mode == 'static' and not calibration_dir:
+        raise ValueError("La quantification statique nécessite un dossier de calibration")
+
+    fp32_path = export_model(weights_path, 'onnx')
+    prepared_path = fp32_path.with_name(f"{fp32_path.stem}.prep.onnx")
+    quant_pre_process(str(fp32_path), str(prepared_path), skip_symbolic_shape=True)
+
+    prepared = onnx.load(str(prepared_path))
+    excluded = head_nodes(prepared)
+
+    if mode == 'dynamic':
+        quantize_dynamic(
+            str(prepared_path), str(target),
+            weight_type=QuantType.QUInt8,
+            op_types_to_quantize=['Conv', 'MatMul'],
+            nodes_to_exclude=excluded
+        )
+    else:
+        reader = make_calibration_reader(calibration_dir, prepared.graph.input[0].name)
+        quantize_static(
+            str(prepared_path), str(target), reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            nodes_to_exclude=excluded
+        )
+
+    prepared_path.unlink(missing_ok=True)
+    return target
+
+
+def load_quantized(weights_path, mode=DEFAULT_QUANT_MODE, calibration_dir=QUANT_CALIBRATION_DIR):
+    """Charge le modèle INT8 via l'API YOLO (même contrat que detect_bin)"""
+    from ultralytics import YOLO
+    return YOLO(str(quantize_model(weights_path, mode, calibration_dir)), task='detect')
+
+# ============================================================================
+# ÉVALUATION
+# ============================================================================
+def peak_rss_mb():
+    """RSS maximal atteint par le processus depuis son démarrage (Mo)"""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10   # Octets sur macOS, Ko ailleurs
+
+
+def measure_model(precision, weights_path, mode, calibration_dir, image_paths, confidence_threshold):
+    """
+    Charge le modèle FP32 (PyTorch) ou INT8 et l'exécute sur les images:
+    latences, statuts détectés et RSS maximal du processus (inférences
+    comprises). Exécutée dans un processus neuf par measure_isolated()
+    """
+    # Imports communs aux deux modèles avant la référence: seuls le
+    # chargement et les inférences sont comptés dans peak_added_mb
+    import torch  # noqa: F401
+    import onnxruntime  # noqa: F401
+    import ultralytics  # noqa: F401
+    images = [load_image(p) for p in image_paths]
+    baseline = peak_rss_mb()
+
+    if precision == 'fp32':
+        model = load_detector(weights_path, 'pytorch')
+    else:
+        model = load_quantized(weights_path, mode, calibration_dir)
+
+    # Préchauffage (allocation des buffers, sessions ONNX)
+    detect_raw(images[0], model)
+
+    latencies, statuses = [], []
+    for image in images:
+        raw = detect_raw(image, model)
+        latencies.append(raw['timings']['inference'])
+        statuses.append(build_result(raw, confidence_threshold)['status'])
+
+    latencies = np.array(latencies) * 1000
+    peak = peak_rss_mb()
+    return {
+        'latency_ms': {
+            'mean': float(latencies.mean()),
+            'p50': float(np.percentile(latencies, 50)),
+            'p95': float(np.percentile(latencies, 95))
+        },
+        'peak_rss_mb': peak,
+        'peak_added_mb': peak - baseline
+    }, statuses
+
+
+def measure_isolated(*args):
+    """
+    measure_model() dans un processus neuf (spawn): la mesure INT8 n'hérite
+    ni des imports, ni du modèle FP32, ni du tas de la mesure précédente
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(measure_model, *args).result()
+
+
+def evaluate(weights_path, mode, holdout_dir, calibration_dir=None, confidence_threshold=0.25):
+    """
+    Compare FP32 (PyTorch) et INT8 sur le dossier réservé: latence
+    d'inférence, RSS maximal, taille du modèle et taux d'accord des statuts
+    """
+    image_paths = list_images(holdout_dir)
+    if not image_paths:
+        raise ValueError(f"Aucune image dans {holdout_dir}")
+
+    int8_path = quantize_model(weights_path, mode, calibration_dir)
+
+    fp32, fp32_statuses = measure_isolated(
+        'fp32', weights_path, mode, calibration_dir, image_paths, confidence_threshold)
+    int8, int8_statuses = measure_isolated(
+        'int8', weights_path, mode, calibration_dir, image_paths, confidence_threshold)
+
+    fp32['model_size_mb'] = Path(weights_path).stat().st_size / 2**20
+    int8['model_size_mb'] = int8_path.stat().st_size / 2**20
+
+    agreements = [a == b for a, b in zip(fp32_statuses, int8_statuses)]
+    disagreements = [
+        {'image': path.name, 'fp32': a, 'int8': b}
+        for path, a, b in zip(image_paths, fp32_statuses, int8_statuses) if a != b
+    ]
+    return {
+        'mode': mode,
+        'images': len(image_paths),
+        'confidence_threshold': confidence_threshold,
+        'fp32': fp32,
+        'int8': int8,
+        'speedup': fp32['latency_ms']['mean'] / int8['latency_ms']['mean'],
+        'status_agreement': sum(agreements) / len(agreements),
+        'disagreements': disagreements
+    }
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quantification INT8 et comparaison avec FP32")
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--mode", choices=QUANT_MODES, default=DEFAULT_QUANT_MODE)
+    parser.add_argument("--calibration", type=Path, default=QUANT_CALIBRATION_DIR,
+                        help="Dossier d'images de calibration (mode static)")
+    parser.add_argument("--holdout", type=Path, required=True, help="Dossier d'images d'évaluation")
+    parser.add_argument("--conf", type=float, default=0.25, help="Seuil de confiance")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Taux d'accord PLEINE/VIDE minimum (code retour 1 sinon)")
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    report = evaluate(weights, args.mode, args.holdout, args.calibration, args.conf)
+    report['min_agreement'] = args.min_agreement
+    report['passed'] = report['status_agreement'] >= args.min_agreement
+    report_path(weights, args.mode).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report, indent=2))
+    return 0 if report['passed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
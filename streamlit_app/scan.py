@@ -0,0 +1,264 @@
+"""
+🧹 Analyse en ligne de commande d'un parc de poubelles
+Parcourt un dossier, une archive tar ou zip d'images de caméras, répartit
+les images sur un pool de processus (un modèle par processus) et écrit les
+résultats au fil de l'eau en JSONL ou CSV. Reprise possible après
+interruption: les fichiers déjà présents dans la sortie sont sautés.
+
+    python scan.py photos/ --output resultats.jsonl
+    python scan.py nuit.tar.gz --output resultats.csv --workers 4 --threads 1
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+CHUNK_SIZE = 8              # Images par tâche (= taille de lot du modèle)
+REPORT_INTERVAL = 5.0       # Secondes entre deux affichages du débit
+
+FIELDS = ('file', 'status', 'confidence', 'class_name', 'num_detections',
+          'x1', 'y1', 'x2', 'y2', 'width', 'height', 'processing_time', 'error')
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+def iter_sources(path):
+    """
+    (nom, source) pour chaque image d'un dossier (récursif), d'un tar ou
+    d'un zip. La source est un chemin, ou les octets d'un membre d'archive.
+    """
+    path = Path(path)
+    if path.is_dir():
+        for file in sorted(path.rglob("*")):
+            if file.suffix.lower() in IMAGE_SUFFIXES and file.is_file():
+                yield file.relative_to(path).as_posix(), str(file)
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and Path(info.filename).suffix.lower() in IMAGE_SUFFIXES:
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        # Lecture en flux: pas d'accès aléatoire, valable pour .tar.gz
+        with tarfile.open(path, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and Path(member.name).suffix.lower() in IMAGE_SUFFIXES:
+                    yield Path(member.name).as_posix(), archive.extractfile(member).read()
+    else:
+        raise ValueError(f"Ni dossier, ni archive tar/zip: {path}")
+
+
+def chunked(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# ============================================================================
+# PROCESSUS DE TRAVAIL
+# ============================================================================
+_model = None
+
+
+def _init_worker(weights, backend, threads):
+    """Un réplica du modèle par processus"""
+    global _model
+    import torch
+    from backends import load_detector
+
+    torch.set_num_threads(threads)
+    _model = load_detector(weights, backend)
+
+
+def _error_row(name, error):
+    return {'file': name, 'error': f"{type(error).__name__}: {error}"}
+
+
+def _scan_chunk(items, confidence_threshold):
+    """Décode puis analyse un lot; une image illisible donne une ligne d'erreur"""
+    from detection import detect_bins, ingest
+
+    rows, names, images = [], [], []
+    for name, source in items:
+        try:
+            images.append(ingest(source if isinstance(source, bytes) else Path(source).read_bytes()))
+            names.append(name)
+        except Exception as e:
+            rows.append(_error_row(name, e))
+
+    try:
+        results = list(detect_bins(images, _model, confidence_threshold, len(images) or 1, draw=False))
+    except Exception as e:
+        return rows + [_error_row(name, e) for name in names]
+
+    for name, result in zip(names, results):
+        x1, y1, x2, y2 = result.get('bbox') or (None, None, None, None)
+        rows.append({
+            'file': name,
+            'status': result['status'],
+            'confidence': round(result['confidence'], 4),
+            'class_name': result.get('class_name'),
+            'num_detections': result['num_detections'],
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2,
+            'width': result['image_size'][0],
+            'height': result['image_size'][1],
+            'processing_time': round(result['processing_time'], 4)
+        })
+    return rows
+
+# ============================================================================
+# SORTIE
+# ============================================================================
+class ResultWriter:
+    """
+    Sortie JSONL ou CSV (selon l'extension) ouverte en ajout; chaque lot
+    est écrit et vidé sur disque dès réception
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.is_csv = self.path.suffix.lower() == '.csv'
+        new_file = not self.path.exists() or self.path.stat().st_size == 0
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        if self.is_csv:
+            self._csv = csv.DictWriter(self._file, fieldnames=FIELDS)
+            if new_file:
+                self._csv.writeheader()
+
+    def done(self):
+        """Fichiers déjà analysés avec succès (reprise): ceux en erreur sont réessayés"""
+        if not self.path.exists():
+            return set()
+        with open(self.path, newline='', encoding='utf-8') as f:
+            if self.is_csv:
+                return {row['file'] for row in csv.DictReader(f) if not row.get('error')}
+            # Une dernière ligne tronquée par une interruption est ignorée
+            done = set()
+            for line in f:
+                try:
+                    row = json.loads(line)
+                    if not row.get('error'):
+                        done.add(row['file'])
+                except (ValueError, KeyError, AttributeError):
+                    pass
+            return done
+
+    def write(self, rows):
+        for row in rows:
+            if self.is_csv:
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+# ============================================================================
+# ANALYSE
+# ============================================================================
+def scan(source, output, weights, backend='pytorch', workers=None, threads=None,
+         confidence_threshold=0.25, chunk_size=CHUNK_SIZE):
+    """Analyse toutes les images de source; renvoie les compteurs"""
+    workers = workers or os.cpu_count() or 1
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+    writer = ResultWriter(output)
+    done = writer.done()
+    pending_items = ((name, src) for name, src in iter_sources(source) if name not in done)
+    stats = {'skipped': len(done), 'processed': 0, 'errors': 0}
+    if done:
+        print(f"Reprise: {len(done)} fichiers déjà traités", file=sys.stderr)
+
+    # spawn: les processus n'héritent pas des threads de torch du parent
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(str(weights), backend, threads)
+    )
+    chunks = chunked(pending_items, chunk_size)
+    in_flight = set()
+    start = last_report = time.perf_counter()
+    try:
+        while True:
+            # Au plus deux lots en vol par processus: mémoire bornée sur une grosse archive
+            while len(in_flight) < 2 * workers:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                in_flight.add(executor.submit(_scan_chunk, chunk, confidence_threshold))
+            if not in_flight:
+                break
+
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                rows = future.result()
+                writer.write(rows)
+                stats['processed'] += len(rows)
+                stats['errors'] += sum(1 for row in rows if row.get('error'))
+
+            now = time.perf_counter()
+            if now - last_report >= REPORT_INTERVAL:
+                last_report = now
+                print(f"{stats['processed']} images, {stats['processed'] / (now - start):.1f} img/s",
+                      file=sys.stderr)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    stats['seconds'] = elapsed
+    stats['images_per_second'] = stats['processed'] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def main(argv=None):
+    from backends import BACKENDS, DEFAULT_BACKEND, find_weights
+
+    parser = argparse.ArgumentParser(description="Analyse d'un dossier ou d'une archive d'images")
+    parser.add_argument("source", type=Path, help="Dossier, archive .tar(.gz) ou .zip")
+    parser.add_argument("--output", type=Path, required=True, help="Résultats .jsonl ou .csv (reprise si existant)")
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--workers", type=int, default=None, help="Processus (défaut: nombre de CPU)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads torch par processus")
+    parser.add_argument("--confidence", type=float, default=0.25)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    try:
+        stats = scan(args.source, args.output, weights, args.backend, args.workers,
+                     args.threads, args.confidence, args.chunk_size)
+    except KeyboardInterrupt:
+        print("Interrompu: relancer la même commande pour reprendre", file=sys.stderr)
+        return 130
+
+    print(f"{stats['processed']} images ({stats['errors']} erreurs, {stats['skipped']} déjà traitées) "
+          f"en {stats['seconds']:.1f}s, {stats['images_per_second']:.1f} img/s", file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
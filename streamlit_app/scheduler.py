@@ -0,0 +1,204 @@
+"""
+🚦 Planificateur d'inférence partagé
+Une seule file devant le modèle en cache, commune à toutes les sessions
+Streamlit: tourniquet équitable entre sessions, lots opportunistes,
+refus explicite quand la file est pleine
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+from detection import (detect_raw_batch, detect_raw_batch_cascade, CASCADE_MARGIN, DEFAULT_BATCH_SIZE,
+                       MAX_CONFIDENCE)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MAX_QUEUE = int(os.environ.get("SCHEDULER_MAX_QUEUE", 64))              # Images en attente, toutes sessions
+MAX_PER_SESSION = int(os.environ.get("SCHEDULER_MAX_PER_SESSION", 32))  # Images en attente par session
+MAX_WAIT_MS = float(os.environ.get("SCHEDULER_MAX_WAIT_MS", 5))         # Attente pour compléter un lot
+
+
+def _no_progress(stage):
+    pass
+
+
+class SchedulerBusy(RuntimeError):
+    """File pleine: la requête est refusée au lieu d'attendre sans fin"""
+
+
+class _Job:
+    __slots__ = ('image', 'future', 'progress', 'queued_at')
+
+    def __init__(self, image, progress):
+        self.image = image
+        self.future = Future()
+        self.progress = progress
+        self.queued_at = time.perf_counter()
+
+# ============================================================================
+# PLANIFICATEUR
+# ============================================================================
+class InferenceScheduler:
+    """
+    Seul thread autorisé à utiliser le modèle (le prédicteur YOLO n'est pas
+    thread-safe).
+
+    Chaque session a sa propre file; un lot prend une image par session à
+    tour de rôle, jusqu'à max_batch_size: une session qui envoie 30 images
+    ne bloque pas celle qui en envoie une. Le lot part dès que le modèle est
+    libre, après au plus max_wait pour se compléter.
+
+    cascade_imgsz: si fourni, chaque lot passe d'abord à cette résolution et
+    seules les images incertaines (au seuil cascade_threshold) repassent à
+    pleine résolution. Les détections brutes sont mises en cache puis
+    refiltrées au seuil du curseur, choisi après coup: par défaut le premier
+    étage n'est accepté que si une boîte atteint MAX_CONFIDENCE, et reste
+    donc retenue à tout seuil. Moins d'images s'arrêtent à basse résolution
+    (gain moindre), mais le résultat ne dépend plus du seuil.
+    """
+
+    def __init__(self, model, max_batch_size=DEFAULT_BATCH_SIZE, max_queue=MAX_QUEUE,
+                 max_per_session=MAX_PER_SESSION, max_wait=MAX_WAIT_MS / 1000, metrics=None,
+                 cascade_imgsz=None, cascade_threshold=MAX_CONFIDENCE - CASCADE_MARGIN):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.cascade_imgsz = cascade_imgsz
+        self.cascade_threshold = cascade_threshold
+        self.stats = {'submitted': 0, 'rejected': 0, 'batches': 0, 'images': 0, 'escalated': 0}
+
+        self._sessions = OrderedDict()  # session -> deque de _Job, dans l'ordre du tourniquet
+        self._depth = 0
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------------
+    # API des sessions
+    # ------------------------------------------------------------------------
+    def submit(self, session_id, images, progress=_no_progress):
+        """
+        Met des images en file pour une session; renvoie un Future par image
+        (détections brutes de detect_raw_batch). Lève SchedulerBusy si la
+        file globale ou celle de la session est pleine.
+        """
+        with self._cond:
+            pending = len(self._sessions.get(session_id, ()))
+            if (self._depth + len(images) > self.max_queue
+                    or pending + len(images) > self.max_per_session):
+                self.stats['rejected'] += 1
+                self._count('scheduler_rejected')
+                raise SchedulerBusy(
+                    f"Serveur occupé ({self._depth} images en attente), réessayez dans un instant"
+                )
+
+            jobs = [_Job(image, progress) for image in images]
+            self._sessions.setdefault(session_id, deque()).extend(jobs)
+            self._depth += len(jobs)
+            self.stats['submitted'] += len(jobs)
+            self._update_gauges()
+            progress('queue')
+            self._cond.notify()
+
+        return [job.future for job in jobs]
+
+    def detect(self, session_id, image, progress=_no_progress):
+        """Détection bloquante d'une image"""
+        return self.submit(session_id, [image], progress)[0].result()
+
+    def detect_batch(self, session_id, images, progress=_no_progress):
+        """Détection bloquante de plusieurs images (ordre conservé)"""
+        return [future.result() for future in self.submit(session_id, images, progress)]
+
+    def snapshot(self):
+        with self._cond:
+            return dict(
+                self.stats,
+                queue_depth=self._depth,
+                active_sessions=len(self._sessions),
+                mean_batch_size=self.stats['images'] / self.stats['batches'] if self.stats['batches'] else 0.0,
+                escalated_fraction=self.stats['escalated'] / self.stats['images'] if self.stats['images'] else 0.0
+            )
+
+    # ------------------------------------------------------------------------
+    # Boucle du modèle
+    # ------------------------------------------------------------------------
+    def _next_batch(self):
+        with self._cond:
+            while self._depth == 0:
+                self._cond.wait()
+
+            # Lot opportuniste: quelques millisecondes pour le compléter
+            deadline = time.monotonic() + self.max_wait
+            while self._depth < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Tourniquet: une image par session et par tour
+            batch = []
+            while len(batch) < self.max_batch_size and self._sessions:
+                session_id, jobs = next(iter(self._sessions.items()))
+                batch.append(jobs.popleft())
+                if jobs:
+                    self._sessions.move_to_end(session_id)
+                else:
+                    del self._sessions[session_id]
+            self._depth -= len(batch)
+            self._update_gauges()
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [job for job in self._next_batch() if job.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for job in batch:
+                job.progress('inference')
+                if self.metrics is not None:
+                    self.metrics.observe('queue_wait', started - job.queued_at)
+
+            try:
+                images = [job.image for job in batch]
+                if self.cascade_imgsz:
+                    raws = detect_raw_batch_cascade(images, self.model, len(batch), self.cascade_threshold,
+                                                    low_imgsz=self.cascade_imgsz)
+                else:
+                    raws = list(detect_raw_batch(images, self.model, len(batch)))
+            except Exception as e:
+                for job in batch:
+                    job.future.set_exception(e)
+                continue
+
+            self.stats['batches'] += 1
+            self.stats['images'] += len(batch)
+            self._count('scheduler_batches')
+            escalated = sum(1 for raw in raws if raw.get('escalated'))
+            if escalated:
+                self.stats['escalated'] += escalated
+                self._count('cascade_escalated', escalated)
+            for job, raw in zip(batch, raws):
+                job.progress('postprocess')
+                job.future.set_result(raw)
+
+    # ------------------------------------------------------------------------
+    # Métriques
+    # ------------------------------------------------------------------------
+    def _update_gauges(self):
+        if self.metrics is not None:
+            self.metrics.set_gauge('scheduler_queue_depth', self._depth)
+            self.metrics.set_gauge('scheduler_active_sessions', len(self._sessions))
+
+    def _count(self, name, amount=1):
+        if self.metrics is not None:
+            self.metrics.increment(name, amount)
@@ -0,0 +1,120 @@
+"""
+🚀 Démarrage à chaud
+Charge et préchauffe le modèle dès le lancement du serveur, en parallèle
+du démarrage de Streamlit, et chronomètre chaque étape: la première
+session trouve un modèle prêt au lieu de payer l'import de torch, le
+chargement des poids et la première inférence.
+
+    python startup.py [options de streamlit run]
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import psutil
+
+from backends import MODEL_PATHS, DEFAULT_BACKEND, load_detector, warm_up
+from detection import DEFAULT_BATCH_SIZE
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", DEFAULT_BACKEND)
+WARMUP_BATCH_SIZES = (1, DEFAULT_BATCH_SIZE)    # Image seule et lot du planificateur
+
+_lock = threading.Lock()
+_preloads = {}      # backend -> état du chargement
+
+# ============================================================================
+# PRÉCHARGEMENT
+# ============================================================================
+def preload(backend=MODEL_BACKEND):
+    """Lance le chargement du modèle en arrière-plan (une seule fois par backend)"""
+    with _lock:
+        entry = _preloads.get(backend)
+        if entry is None:
+            entry = _preloads[backend] = {
+                'done': threading.Event(),
+                'model': None,
+                'path': None,
+                'errors': [],
+                'timings': {},
+                'ready_at': None
+            }
+            threading.Thread(target=_load, args=(backend, entry),
+                             name="model-preload", daemon=True).start()
+    return entry
+
+
+def _load(backend, entry):
+    timings = entry['timings']
+    try:
+        start = time.perf_counter()
+        import ultralytics  # noqa: F401  (torch compris)
+        timings['import'] = time.perf_counter() - start
+
+        for path in MODEL_PATHS:
+            if not path.exists():
+                continue
+            try:
+                start = time.perf_counter()
+                model = load_detector(path, backend)
+                timings['load'] = time.perf_counter() - start
+
+                start = time.perf_counter()
+                warm_up(model, WARMUP_BATCH_SIZES)
+                timings['warmup'] = time.perf_counter() - start
+
+                entry['model'], entry['path'] = model, str(path.absolute())
+                break
+            except Exception as e:
+                entry['errors'].append(f"Erreur chargement {path}: {e}")
+    except Exception as e:
+        entry['errors'].append(f"Erreur au démarrage: {e}")
+    finally:
+        entry['ready_at'] = time.time()
+        entry['done'].set()
+
+
+def get_model(backend=MODEL_BACKEND):
+    """(modèle, chemin) une fois chargé et préchauffé; (None, None) si introuvable"""
+    entry = preload(backend)
+    entry['done'].wait()
+    return entry['model'], entry['path']
+
+
+def report(backend=MODEL_BACKEND):
+    """
+    Durées du démarrage: étapes du préchargement et délai entre le
+    lancement du processus et le modèle prêt
+    """
+    entry = preload(backend)
+    ready_at = entry['ready_at']
+    return {
+        'backend': backend,
+        'ready': entry['done'].is_set() and entry['model'] is not None,
+        'timings': dict(entry['timings']),
+        'ready_after': ready_at - psutil.Process().create_time() if ready_at else None,
+        'errors': list(entry['errors'])
+    }
+
+# ============================================================================
+# LANCEMENT
+# ============================================================================
+def main(argv=None):
+    """Précharge le modèle puis lance `streamlit run app.py` dans le même processus"""
+    from streamlit.web import cli
+
+    preload(MODEL_BACKEND)
+    argv = sys.argv[1:] if argv is None else argv
+    sys.argv = ["streamlit", "run", str(Path(__file__).with_name("app.py")), *argv]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    # Réimporté sous son nom: app.py doit retrouver le même état que ce lanceur
+    import startup
+    sys.exit(startup.main())
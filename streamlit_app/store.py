@@ -0,0 +1,257 @@
+"""
+🗄️ Stockage persistant des détections
+Base SQLite locale (mode WAL) en ajout seul, indexée par date, statut et
+poubelle/caméra. Les écritures sont regroupées par un thread d'écriture,
+hors du chemin de la requête. Dans la même transaction, il tient à jour
+des cumuls horaires par source et statut et la liste des sources: la page
+Statistiques lit ces tables, dont la taille ne dépend pas du nombre de lignes.
+"""
+
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+WRITE_BATCH_SIZE = 256      # Lignes max par transaction
+FLUSH_INTERVAL = 0.5        # Secondes max avant l'écriture d'un lot incomplet
+WRITE_RETRIES = 3           # Tentatives d'un lot avant abandon (base verrouillée, disque plein)
+RETRY_DELAY = 0.5           # Attente avant nouvelle tentative, croissante (secondes)
+ROLLUP_SECONDS = 3600       # Granularité des cumuls (les intervalles lus en sont des multiples)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    session TEXT,
+    status TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    processing_time REAL NOT NULL,
+    num_detections INTEGER NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    width INTEGER, height INTEGER,
+    cached INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections(ts);
+CREATE INDEX IF NOT EXISTS idx_detections_status_ts ON detections(status, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_source_ts ON detections(source, ts);
+CREATE TABLE IF NOT EXISTS detections_hourly (
+    bucket INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sum_confidence REAL NOT NULL,
+    sum_processing_time REAL NOT NULL,
+    PRIMARY KEY (bucket, source, status)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+ROLLUP_UPSERT = """
+INSERT INTO detections_hourly VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (bucket, source, status) DO UPDATE SET
+    n = n + excluded.n,
+    sum_confidence = sum_confidence + excluded.sum_confidence,
+    sum_processing_time = sum_processing_time + excluded.sum_processing_time
+"""
+
+COLUMNS = ('ts', 'source', 'session', 'status', 'confidence', 'processing_time',
+           'num_detections', 'x1', 'y1', 'x2', 'y2', 'width', 'height', 'cached')
+
+_STOP = object()
+
+# ============================================================================
+# BASE
+# ============================================================================
+class DetectionStore:
+    """
+    append() met une ligne en file et rend la main immédiatement; le thread
+    d'écriture l'insère avec les suivantes en une seule transaction.
+    Les lectures utilisent une connexion par thread (WAL: les lecteurs ne
+    bloquent pas l'écrivain). Un lot dont l'écriture échoue encore après
+    WRITE_RETRIES tentatives est abandonné et compté dans stats; le thread
+    d'écriture continue.
+    """
+
+    def __init__(self, path, batch_size=WRITE_BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = queue.Queue()
+        self._local = threading.local()
+        self.stats = {'written': 0, 'errors': 0, 'dropped': 0, 'last_error': None}
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._backfill(conn)
+
+        self._writer = threading.Thread(target=self._write_loop, name="detection-store", daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------------
+    def append(self, result, source="default", session=None):
+        """Ajoute un résultat de build_result (non bloquant)"""
+        bbox = result.get('bbox') or (None, None, None, None)
+        width, height = result['image_size']
+        self._pending.put((
+            result['timestamp'].timestamp(), source, session, result['status'],
+            float(result['confidence']), float(result['processing_time']),
+            int(result['num_detections']), *[None if v is None else float(v) for v in bbox],
+            int(width), int(height), int(bool(result.get('cached')))
+        ))
+
+    def flush(self, timeout=5.0):
+        """Attend que les lignes en file soient écrites"""
+        done = threading.Event()
+        self._pending.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        self._pending.put(_STOP)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Suffisant en WAL
+        insert = f"INSERT INTO detections ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        stopping = False
+        while not stopping:
+            rows, waiters = [], []
+            item = self._pending.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                rows.append(item)
+                if len(rows) >= self.batch_size:
+                    break
+                try:
+                    item = self._pending.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+            try:
+                if rows:
+                    self._insert(conn, insert, rows)
+            finally:
+                # Jamais de flush() bloqué jusqu'à son délai, même après une erreur
+                for waiter in waiters:
+                    waiter.set()
+        conn.close()
+
+    def _insert(self, conn, insert, rows):
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                with conn:
+                    conn.executemany(insert, rows)
+                    conn.executemany(ROLLUP_UPSERT, _rollup(rows))
+                    conn.executemany("INSERT OR IGNORE INTO sources VALUES (?)", {(row[1],) for row in rows})
+                self.stats['written'] += len(rows)
+                return
+            except sqlite3.Error as e:
+                self.stats['errors'] += 1
+                self.stats['last_error'] = f"{type(e).__name__}: {e}"
+                if attempt < WRITE_RETRIES:
+                    time.sleep(RETRY_DELAY * attempt)
+        self.stats['dropped'] += len(rows)
+        print(f"⚠️ Base des détections: lot de {len(rows)} lignes abandonné ({self.stats['last_error']})",
+              file=sys.stderr)
+
+    @staticmethod
+    def _backfill(conn):
+        """Base créée avant les cumuls: calcul unique depuis la table des détections"""
+        conn.execute("BEGIN IMMEDIATE")   # Un seul processus fait le calcul
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM detections_hourly)").fetchone()[0]:
+            return
+        conn.execute(
+            f"INSERT INTO detections_hourly SELECT CAST(ts / {ROLLUP_SECONDS} AS INTEGER) * {ROLLUP_SECONDS}, "
+            f"source, status, COUNT(*), SUM(confidence), SUM(processing_time) "
+            f"FROM detections GROUP BY 1, 2, 3"
+        )
+        conn.execute("INSERT OR IGNORE INTO sources SELECT DISTINCT source FROM detections")
+
+    # ------------------------------------------------------------------------
+    # Lecture (agrégats)
+    # ------------------------------------------------------------------------
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _where(since=None, source=None, column="ts"):
+        clauses, params = [], []
+        if since is not None:
+            clauses.append(f"{column} >= ?")
+            params.append(since)
+        if source is not None:
+            clauses.append("source = ?")
+            params.append(source)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _rollup_where(self, since=None, source=None):
+        # Début de l'heure contenant since: période comptée à l'heure près
+        bucket = int(since // ROLLUP_SECONDS * ROLLUP_SECONDS) if since is not None else None
+        return self._where(bucket, source, column="bucket")
+
+    def summary(self, since=None, source=None):
+        """Total, confiance et temps moyens, répartition par statut (depuis les cumuls horaires)"""
+        where, params = self._rollup_where(since, source)
+        rows = self._reader().execute(
+            f"SELECT status, SUM(n) AS n, SUM(sum_confidence) AS confidence, "
+            f"SUM(sum_processing_time) AS processing_time FROM detections_hourly{where} GROUP BY status", params
+        ).fetchall()
+        total = sum(r['n'] for r in rows)
+        return {
+            'total': total,
+            'avg_confidence': sum(r['confidence'] for r in rows) / total if total else 0.0,
+            'avg_processing_time': sum(r['processing_time'] for r in rows) / total if total else 0.0,
+            'status_counts': {r['status']: r['n'] for r in rows}
+        }
+
+    def timeseries(self, bucket_seconds=3600, since=None, source=None):
+        """
+        Nombre de détections par statut et par intervalle de temps; depuis
+        les cumuls si l'intervalle est un multiple de ROLLUP_SECONDS
+        """
+        if bucket_seconds % ROLLUP_SECONDS == 0:
+            where, params = self._rollup_where(since, source)
+            query = (f"SELECT bucket / ? * ? AS b, status, SUM(n) AS n "
+                     f"FROM detections_hourly{where} GROUP BY b, status ORDER BY b")
+        else:
+            where, params = self._where(since, source)
+            query = (f"SELECT CAST(ts / ? AS INTEGER) * ? AS b, status, COUNT(*) AS n "
+                     f"FROM detections{where} GROUP BY b, status ORDER BY b")
+        rows = self._reader().execute(query, [bucket_seconds, bucket_seconds, *params]).fetchall()
+        return [{'bucket': r['b'], 'status': r['status'], 'count': r['n']} for r in rows]
+
+    def sources(self):
+        """Identifiants de poubelle/caméra connus"""
+        return [r['source'] for r in self._reader().execute("SELECT source FROM sources ORDER BY source")]
+
+
+def _rollup(rows):
+    """Cumuls horaires (heure, source, statut) d'un lot de lignes au format COLUMNS"""
+    sums = {}
+    for row in rows:
+        key = (int(row[0] // ROLLUP_SECONDS * ROLLUP_SECONDS), row[1], row[3])
+        n, confidence, processing_time = sums.get(key, (0, 0.0, 0.0))
+        sums[key] = (n + 1, confidence + row[4], processing_time + row[5])
+    return [(*key, *values) for key, values in sums.items()]
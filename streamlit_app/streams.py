@@ -0,0 +1,386 @@
+"""
+📡 Flux de caméras en direct
+Un lecteur léger par source (RTSP/HTTP, fichier vidéo ou dossier d'images
+pour les essais) ne garde que la dernière image; un seul thread
+d'inférence sert les caméras à tour de rôle, chacune dans la limite de
+son budget d'images par seconde, et regroupe les images de caméras
+différentes dans une même passe du modèle.
+
+    python streams.py entree=rtsp://10.0.0.12/stream parking=videos/parking.mp4 essais/ --fps 2
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+
+import cv2
+
+from detection import build_result, detect_raw_batch, DEFAULT_BATCH_SIZE
+from scan import IMAGE_SUFFIXES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+STREAM_FPS = float(os.environ.get("STREAM_FPS", 1.0))     # Analyses par seconde et par caméra
+FOLDER_FPS = 5.0            # Cadence simulée d'un dossier d'images
+RECONNECT_DELAY = 2.0       # Première attente avant reconnexion (doublée jusqu'à 30 s)
+MAX_RECONNECT_DELAY = 30.0
+REPORT_INTERVAL = 5.0       # Secondes entre deux affichages (ligne de commande)
+
+
+def parse_sources(specs):
+    """
+    Sources `nom=uri` (ou `uri` seul, nommée d'après le fichier) en
+    dictionnaire ordonné nom -> uri
+    """
+    sources = OrderedDict()
+    for i, spec in enumerate(specs, 1):
+        name, sep, uri = spec.partition("=")
+        if not sep or "://" in name:
+            name, uri = Path(spec.rstrip("/")).stem or f"camera{i}", spec
+        if name in sources:
+            name = f"{name}{i}"
+        sources[name] = uri
+    return sources
+
+# ============================================================================
+# LECTEUR D'UNE SOURCE
+# ============================================================================
+class CameraReader:
+    """
+    Lit une source dans son propre thread et ne garde que la dernière
+    image: une caméra plus rapide que son budget n'accumule pas de retard.
+
+    Les images sont avancées sans conversion (grab) et converties en RGB
+    seulement au rythme de min_interval. Un fichier vidéo est lu à sa
+    cadence et un dossier à FOLDER_FPS, en boucle; un flux perdu est rouvert
+    avec une attente croissante.
+    """
+
+    def __init__(self, name, uri, min_interval=0.0, folder_fps=FOLDER_FPS, loop=True):
+        self.name = name
+        self.uri = uri
+        self.min_interval = min_interval
+        self.folder_fps = folder_fps
+        self.loop = loop
+        self.stats = {'state': "connecting", 'read': 0, 'dropped': 0, 'reconnects': 0, 'error': None}
+
+        self._frame = None          # (numéro, image RGB, instant de capture)
+        self._seq = 0
+        self._taken = 0
+        self._published_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"camera-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def take(self):
+        """Dernière image (numéro, image, instant de capture) si nouvelle, sinon None"""
+        with self._lock:
+            if self._frame is None or self._seq == self._taken:
+                return None
+            self._taken = self._seq
+            return self._frame
+
+    def has_new(self):
+        with self._lock:
+            return self._seq > self._taken
+
+    # ------------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------------
+    def _run(self):
+        delay = RECONNECT_DELAY
+        while not self._stop.is_set():
+            try:
+                if Path(self.uri).is_dir():
+                    self._read_folder(Path(self.uri))
+                else:
+                    self._read_capture()
+                delay = RECONNECT_DELAY
+                if not self.loop:
+                    self.stats['state'] = "ended"
+                    return
+            except Exception as e:
+                self.stats.update(state="error", error=str(e))
+                self.stats['reconnects'] += 1
+                if self._stop.wait(delay):
+                    return
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+    def _read_capture(self):
+        capture = cv2.VideoCapture(self.uri)
+        if not capture.isOpened():
+            raise ValueError(f"Source illisible: {self.uri}")
+        try:
+            # Fichier local: lu au rythme de sa cadence, comme une caméra
+            pace = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 25.0) if Path(self.uri).is_file() else 0.0
+            self.stats.update(state="live", error=None)
+            next_read = time.monotonic()
+            while not self._stop.is_set():
+                if pace:
+                    next_read += pace
+                    self._stop.wait(max(0.0, next_read - time.monotonic()))
+                if not capture.grab():
+                    if Path(self.uri).is_file():
+                        return          # Fin du fichier
+                    raise ConnectionError(f"Flux interrompu: {self.uri}")
+                self.stats['read'] += 1
+                if not self._due():
+                    self.stats['dropped'] += 1
+                    continue
+                ok, frame = capture.retrieve()
+                if ok:
+                    self._publish(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        finally:
+            capture.release()
+
+    def _read_folder(self, folder):
+        files = sorted(f for f in folder.rglob("*") if f.suffix.lower() in IMAGE_SUFFIXES and f.is_file())
+        if not files:
+            raise ValueError(f"Aucune image dans {folder}")
+        self.stats.update(state="live", error=None)
+        for file in files:
+            if self._stop.wait(1.0 / self.folder_fps):
+                return
+            self.stats['read'] += 1
+            if not self._due():
+                self.stats['dropped'] += 1
+                continue
+            frame = cv2.imread(str(file))
+            if frame is not None:
+                self._publish(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+    def _due(self):
+        return time.monotonic() - self._published_at >= self.min_interval
+
+    def _publish(self, frame):
+        with self._lock:
+            if self._seq > self._taken:
+                # Image précédente jamais analysée: remplacée par la nouvelle
+                self.stats['dropped'] += 1
+            self._seq += 1
+            self._frame = (self._seq, frame, time.time())
+            self._published_at = time.monotonic()
+
+# ============================================================================
+# GESTIONNAIRE
+# ============================================================================
+class StreamManager:
+    """
+    Inférence sur N caméras avec un budget de fps par caméra.
+
+    Le thread d'inférence prend, à tour de rôle, les caméras dont le budget
+    est échu et qui ont une nouvelle image, jusqu'à batch_size: ces images
+    partent ensemble dans une seule passe du modèle (ou du planificateur
+    partagé si scheduler est fourni). status() donne pour chaque caméra le
+    dernier statut PLEINE/VIDE, le retard et les images abandonnées.
+    """
+
+    def __init__(self, sources, model=None, scheduler=None, fps=STREAM_FPS, batch_size=DEFAULT_BATCH_SIZE,
+                 confidence_threshold=0.25, store=None, metrics=None, session_id="streams"):
+        self.model = model
+        self.scheduler = scheduler
+        self.interval = 1.0 / fps if fps > 0 else 0.0
+        self.batch_size = max(1, int(batch_size))
+        self.confidence_threshold = confidence_threshold
+        self.store = store
+        self.metrics = metrics
+        self.session_id = session_id
+        self.stats = {'batches': 0, 'frames': 0, 'errors': 0}
+
+        self.readers = OrderedDict(
+            # Conversion au double du budget: une image fraîche attend chaque échéance
+            (name, CameraReader(name, uri, min_interval=self.interval / 2)) for name, uri in sources.items()
+        )
+        self._latest = {name: None for name in self.readers}   # Dernier résultat par caméra
+        self._analysed = dict.fromkeys(self.readers, 0)
+        self._next_due = dict.fromkeys(self.readers, 0.0)
+        self._order = deque(self.readers)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._started_at = None
+        self._thread = threading.Thread(target=self._run, name="stream-inference", daemon=True)
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for reader in self.readers.values():
+            reader.start()
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        for reader in self.readers.values():
+            reader.stop(timeout)
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------------
+    # Consultation
+    # ------------------------------------------------------------------------
+    def status(self):
+        """État de chaque caméra: source, dernier statut, retard, images lues et abandonnées"""
+        now = time.time()
+        uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        with self._lock:
+            rows = OrderedDict()
+            for name, reader in self.readers.items():
+                latest = self._latest[name] or {}
+                rows[name] = dict(
+                    reader.stats,
+                    uri=reader.uri,
+                    status=latest.get('status'),
+                    emoji=latest.get('emoji'),
+                    confidence=latest.get('confidence'),
+                    num_detections=latest.get('num_detections'),
+                    lag=latest.get('lag'),
+                    age=now - latest['updated_at'] if latest else None,
+                    analysed=self._analysed[name],
+                    fps=self._analysed[name] / uptime if uptime else 0.0
+                )
+            return rows
+
+    def snapshot(self):
+        with self._lock:
+            return dict(
+                self.stats,
+                sources=len(self.readers),
+                mean_batch_size=self.stats['frames'] / self.stats['batches'] if self.stats['batches'] else 0.0
+            )
+
+    # ------------------------------------------------------------------------
+    # Boucle d'inférence
+    # ------------------------------------------------------------------------
+    def _next_batch(self):
+        """Tourniquet sur les caméras dont le budget est échu et qui ont une nouvelle image"""
+        now = time.monotonic()
+        batch = []
+        for _ in range(len(self._order)):
+            name = self._order[0]
+            self._order.rotate(-1)
+            if self._next_due[name] <= now:
+                frame = self.readers[name].take()
+                if frame is not None:
+                    batch.append((name, frame))
+                    # Échéances régulières, sans rattraper un retard accumulé
+                    self._next_due[name] = max(now, self._next_due[name] + self.interval)
+                    if len(batch) == self.batch_size:
+                        break
+        return batch
+
+    def _idle_wait(self):
+        # Jusqu'à la prochaine échéance, au plus 50 ms (nouvelle image attendue)
+        now = time.monotonic()
+        ready = [due for name, due in self._next_due.items() if self.readers[name].has_new()]
+        self._stop.wait(min(0.05, max(0.001, min(ready) - now)) if ready else 0.05)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if not batch:
+                self._idle_wait()
+                continue
+
+            images = [image for _, (_, image, _) in batch]
+            try:
+                if self.scheduler is not None:
+                    raws = self.scheduler.detect_batch(self.session_id, images)
+                else:
+                    raws = list(detect_raw_batch(images, self.model, len(images)))
+            except Exception as e:
+                # Modèle ou planificateur indisponible: les caméras gardent leur dernier statut
+                with self._lock:
+                    self.stats['errors'] += 1
+                for name, _ in batch:
+                    self.readers[name].stats['error'] = str(e)
+                self._stop.wait(1.0)
+                continue
+
+            for (name, (_, _, captured_at)), raw in zip(batch, raws):
+                self._record(name, build_result(raw, self.confidence_threshold, draw=False), captured_at)
+            with self._lock:
+                self.stats['batches'] += 1
+                self.stats['frames'] += len(batch)
+
+    def _record(self, name, result, captured_at):
+        lag = time.time() - captured_at
+        with self._lock:
+            self._latest[name] = {
+                'status': result['status'],
+                'emoji': result['emoji'],
+                'confidence': result['confidence'],
+                'num_detections': result['num_detections'],
+                'lag': lag,
+                'updated_at': time.time()
+            }
+            self._analysed[name] += 1
+        if self.metrics is not None:
+            self.metrics.record_timings(result['timings'])
+            self.metrics.observe('stream_lag', lag)
+        if self.store is not None:
+            self.store.append(result, source=name, session=self.session_id)
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def format_status(rows):
+    lines = [f"{'caméra':<16} {'état':<10} {'statut':<18} {'conf':>6} {'retard':>8} {'fps':>5} "
+             f"{'lues':>7} {'abandon':>8}"]
+    for name, row in rows.items():
+        lag = f"{row['lag']*1000:.0f}ms" if row['lag'] is not None else "-"
+        conf = f"{row['confidence']*100:.0f}%" if row['confidence'] is not None else "-"
+        lines.append(f"{name[:16]:<16} {row['state']:<10} {row['status'] or '-':<18} {conf:>6} {lag:>8} "
+                     f"{row['fps']:>5.2f} {row['read']:>7} {row['dropped']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from backends import BACKENDS, DEFAULT_BACKEND, find_weights, load_detector
+
+    parser = argparse.ArgumentParser(description="Analyse en direct de plusieurs caméras")
+    parser.add_argument("sources", nargs="+", help="nom=uri: RTSP/HTTP, fichier vidéo ou dossier d'images")
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--fps", type=float, default=STREAM_FPS, help="Analyses par seconde et par caméra")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--confidence", type=float, default=0.25)
+    parser.add_argument("--duration", type=float, default=None, help="Arrêt après ce nombre de secondes")
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    manager = StreamManager(parse_sources(args.sources), model=load_detector(weights, args.backend),
+                            fps=args.fps, batch_size=args.batch_size,
+                            confidence_threshold=args.confidence).start()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(REPORT_INTERVAL if deadline is None else
+                       max(0.0, min(REPORT_INTERVAL, deadline - time.monotonic())))
+            print(format_status(manager.status()), file=sys.stderr)
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        manager.stop()
+
+    stats = manager.snapshot()
+    print(f"{stats['frames']} images en {stats['batches']} lots "
+          f"(moyenne {stats['mean_batch_size']:.1f} caméras par passe)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
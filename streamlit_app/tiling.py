@@ -0,0 +1,147 @@
+"""
+🔲 Inférence par tuiles
+Découpe une image haute résolution (caméras 4K) en tuiles qui se
+chevauchent, les passe au modèle par lots et fusionne les détections par
+une NMS entre tuiles: une poubelle lointaine de quelques dizaines de
+pixels n'est plus écrasée par le redimensionnement de l'image entière.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from detection import detect_raw_batch, to_rgb_array, IngestedImage, DEFAULT_BATCH_SIZE, MIN_CONFIDENCE, StageTimer
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+TILE_SIZE = int(os.environ.get("TILE_SIZE", 640))           # Côté d'une tuile (pixels)
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", 0.2))   # Recouvrement entre tuiles voisines
+MAX_TILES = int(os.environ.get("MAX_TILES", 16))            # Budget: tuiles agrandies au-delà
+MERGE_THRESHOLD = 0.5       # Intersection / plus petite boîte au-delà de laquelle deux boîtes fusionnent
+
+# ============================================================================
+# DÉCOUPAGE
+# ============================================================================
+def _positions(length, tile, stride):
+    if length <= tile:
+        return [0]
+    n = int(np.ceil((length - tile) / stride)) + 1
+    return np.linspace(0, length - tile, n).round().astype(int).tolist()
+
+
+def tile_grid(width, height, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, max_tiles=MAX_TILES):
+    """
+    Fenêtres (x1, y1, x2, y2) couvrant l'image avec le recouvrement demandé.
+    Si la grille dépasse max_tiles, les tuiles sont agrandies jusqu'à tenir
+    dans le budget (latence bornée, résolution effective réduite).
+    """
+    while True:
+        stride = max(1, int(tile_size * (1 - overlap)))
+        xs = _positions(width, tile_size, stride)
+        ys = _positions(height, tile_size, stride)
+        if len(xs) * len(ys) <= max_tiles:
+            break
+        tile_size = int(tile_size * 1.25)
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height)) for y in ys for x in xs]
+
+# ============================================================================
+# FUSION
+# ============================================================================
+def merge_nms(xyxy, conf, threshold=MERGE_THRESHOLD):
+    """
+    NMS gloutonne, toutes classes confondues (une poubelle n'a qu'un statut),
+    sur l'intersection rapportée à la plus petite boîte: une boîte coupée
+    au bord d'une tuile est absorbée par la boîte entière voisine.
+    Renvoie les indices gardés, par confiance décroissante.
+    """
+    order = np.argsort(-conf)
+    areas = np.prod(np.clip(xyxy[:, 2:] - xyxy[:, :2], 0, None), axis=1)
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        tl = np.maximum(xyxy[best, :2], xyxy[rest, :2])
+        br = np.minimum(xyxy[best, 2:], xyxy[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        smaller = np.minimum(areas[best], areas[rest])
+        overlap = np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0)
+        order = rest[overlap < threshold]
+    return np.array(keep, dtype=np.int64)
+
+# ============================================================================
+# DÉTECTION
+# ============================================================================
+def detect_raw_tiled(image, model, confidence_threshold=MIN_CONFIDENCE, tile_size=TILE_SIZE,
+                     overlap=TILE_OVERLAP, max_tiles=MAX_TILES, batch_size=DEFAULT_BATCH_SIZE,
+                     full_frame=True, run_batch=None):
+    """
+    Détections brutes d'une image découpée en tuiles (même forme que detect_raw).
+
+    full_frame: ajoute l'image entière au lot, pour les poubelles plus
+    grandes qu'une tuile. model peut être une liste de réplicas: les lots de
+    tuiles sont alors répartis sur un thread par réplica (un même prédicteur
+    YOLO n'est pas thread-safe). run_batch(arrays) remplace l'appel direct
+    au modèle (ex: planificateur partagé de l'application).
+
+    L'image doit être en pleine résolution (boîtes dans ses coordonnées):
+    une IngestedImage, décodée à échelle réduite, est refusée.
+    """
+    if isinstance(image, IngestedImage):
+        raise ValueError("Découpage en tuiles: image pleine résolution attendue, pas une IngestedImage réduite")
+    timer = StageTimer()
+    timer.start('preprocess')
+    img_array = to_rgb_array(image)
+    height, width = img_array.shape[:2]
+    windows = tile_grid(width, height, tile_size, overlap, max_tiles)
+    # Vues sans copie; le modèle letterboxe chaque tuile
+    crops = [img_array[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+    offsets = [(x1, y1) for x1, y1, _, _ in windows]
+    if full_frame and len(windows) > 1:
+        crops.append(img_array)
+        offsets.append((0, 0))
+    timings = timer.stop()
+
+    if run_batch is None:
+        replicas = model if isinstance(model, (list, tuple)) else [model]
+        chunks = [crops[i:i + batch_size] for i in range(0, len(crops), batch_size)]
+        if len(replicas) > 1 and len(chunks) > 1:
+            # Un thread par réplica, qui traite ses lots l'un après l'autre
+            def run_replica(r):
+                return {i: list(detect_raw_batch(chunks[i], replicas[r], batch_size, confidence_threshold))
+                        for i in range(r, len(chunks), len(replicas))}
+
+            by_chunk = {}
+            with ThreadPoolExecutor(max_workers=len(replicas), thread_name_prefix="tiles") as executor:
+                for part in executor.map(run_replica, range(len(replicas))):
+                    by_chunk.update(part)
+            raws = [raw for i in range(len(chunks)) for raw in by_chunk[i]]
+        else:
+            raws = list(detect_raw_batch(crops, replicas[0], batch_size, confidence_threshold))
+    else:
+        raws = run_batch(crops)
+
+    # Coût total de l'image: somme des durées de ses tuiles
+    for raw in raws:
+        for stage, duration in raw['timings'].items():
+            timings[stage] = timings.get(stage, 0.0) + duration
+
+    start = time.perf_counter()
+    shifted = [raw['detections']['xyxy'] + np.array([x, y, x, y], dtype=np.float32)
+               for raw, (x, y) in zip(raws, offsets)]
+    xyxy = np.concatenate(shifted) if shifted else np.zeros((0, 4), np.float32)
+    conf = np.concatenate([raw['detections']['conf'] for raw in raws])
+    cls = np.concatenate([raw['detections']['cls'] for raw in raws])
+    keep = merge_nms(xyxy, conf)
+    timings['postprocess'] = timings.get('postprocess', 0.0) + time.perf_counter() - start
+
+    return {
+        'image': img_array,
+        'names': raws[0]['names'],
+        'detections': {'xyxy': xyxy[keep], 'conf': conf[keep], 'cls': cls[keep]},
+        'timings': timings,
+        'processing_time': sum(timings.values()),
+        'tiles': len(windows)
+    }
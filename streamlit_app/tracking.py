@@ -0,0 +1,281 @@
+"""
+🛰️ Suivi des poubelles entre les images
+Suivi multi-objets léger (Kalman + association IoU en deux passes, à la
+ByteTrack) au-dessus des détections brutes de detect_raw
+
+Le détecteur ne tourne que sur les images clés; entre deux, les pistes sont
+propagées par le filtre de Kalman. Le statut PLEINE/VIDE de chaque piste
+est lissé par un vote pondéré sur une fenêtre temporelle.
+
+Vérification du comportement (poubelle qui sort du champ):
+    python tracking.py
+"""
+
+import sys
+from collections import deque
+from itertools import count
+
+import numpy as np
+
+from backends import box_iou
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+IOU_THRESHOLD = 0.3         # IoU minimal pour associer détection et piste
+HIGH_THRESHOLD = 0.5        # Détections sûres: associent et créent des pistes (vidéo: seuil d'analyse)
+LOW_THRESHOLD = 0.1         # Détections faibles: prolongent seulement des pistes
+MAX_AGE = 30                # Images sans association avant suppression
+SMOOTHING_WINDOW = 15       # Votes gardés pour le lissage du statut
+
+# ============================================================================
+# FILTRE DE KALMAN
+# ============================================================================
+class KalmanBoxFilter:
+    """
+    Filtre de Kalman à vitesse constante sur (cx, cy, w, h) et leurs vitesses.
+    Bruits proportionnels à la taille de la boîte (comme ByteTrack).
+    """
+
+    _std_position = 1.0 / 20
+    _std_velocity = 1.0 / 160
+
+    def __init__(self, box):
+        self.F = np.eye(8)
+        self.F[:4, 4:] = np.eye(4)
+        self.H = np.eye(4, 8)
+
+        z = self._to_measurement(box)
+        self.x = np.concatenate([z, np.zeros(4)])
+        w, h = z[2], z[3]
+        std = np.array([2 * self._std_position * w, 2 * self._std_position * h,
+                        2 * self._std_position * w, 2 * self._std_position * h,
+                        10 * self._std_velocity * w, 10 * self._std_velocity * h,
+                        10 * self._std_velocity * w, 10 * self._std_velocity * h])
+        self.P = np.diag(std ** 2)
+
+    def predict(self):
+        w, h = self.x[2], self.x[3]
+        std = np.array([self._std_position * w, self._std_position * h,
+                        self._std_position * w, self._std_position * h,
+                        self._std_velocity * w, self._std_velocity * h,
+                        self._std_velocity * w, self._std_velocity * h])
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + np.diag(std ** 2)
+        # Taille jamais négative
+        self.x[2:4] = np.maximum(self.x[2:4], 1.0)
+
+    def update(self, box):
+        z = self._to_measurement(box)
+        w, h = self.x[2], self.x[3]
+        R = np.diag(np.array([self._std_position * w, self._std_position * h,
+                              self._std_position * w, self._std_position * h]) ** 2)
+        S = self.H @ self.P @ self.H.T + R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self.H @ self.x)
+        self.P = (np.eye(8) - K @ self.H) @ self.P
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.x[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+    @staticmethod
+    def _to_measurement(box):
+        x1, y1, x2, y2 = box
+        return np.array([(x1 + x2) / 2, (y1 + y2) / 2, max(x2 - x1, 1.0), max(y2 - y1, 1.0)])
+
+# ============================================================================
+# PISTES
+# ============================================================================
+class Track:
+    """Une poubelle suivie: filtre de Kalman et votes de classe récents"""
+
+    def __init__(self, track_id, box, cls, conf, window=SMOOTHING_WINDOW):
+        self.track_id = track_id
+        self.kalman = KalmanBoxFilter(box)
+        self.votes = deque([(cls, conf)], maxlen=window)
+        self.hits = 1
+        self.time_since_update = 0
+        self.matched = True     # Associée à la dernière image clé
+
+    def predict(self):
+        self.kalman.predict()
+        self.time_since_update += 1
+
+    def update(self, box, cls, conf):
+        self.kalman.update(box)
+        self.votes.append((cls, conf))
+        self.hits += 1
+        self.time_since_update = 0
+        self.matched = True
+
+    def smoothed(self):
+        """Classe majoritaire pondérée par la confiance, et sa confiance moyenne"""
+        weights = {}
+        for cls, conf in self.votes:
+            weights[cls] = weights.get(cls, 0.0) + conf
+        best = max(weights, key=weights.get)
+        confidences = [conf for cls, conf in self.votes if cls == best]
+        return best, sum(confidences) / len(confidences)
+
+
+def greedy_match(iou, threshold):
+    """Association gloutonne par IoU décroissant: paires (piste, détection)"""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    used_rows, used_cols = set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        row, col = np.unravel_index(flat, iou.shape)
+        if iou[row, col] < threshold:
+            break
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((int(row), int(col)))
+    return pairs
+
+# ============================================================================
+# SUIVEUR
+# ============================================================================
+class BinTracker:
+    """
+    Suivi multi-poubelles à la ByteTrack.
+
+    update(detections) sur une image clé, predict() entre deux: les deux
+    renvoient les pistes associées à la dernière image clé au format des
+    détections brutes (xyxy, conf, cls), avec la classe et la confiance
+    lissées, et 'track_id'. Une piste manquée n'est plus rapportée mais
+    reste gardée max_age images pour être ré-associée. `changed` indique si la dernière image clé a créé, perdu
+    ou manqué une piste: l'appelant relance alors la détection plus tôt.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, high_threshold=HIGH_THRESHOLD,
+                 low_threshold=LOW_THRESHOLD, max_age=MAX_AGE, window=SMOOTHING_WINDOW):
+        self.iou_threshold = iou_threshold
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.max_age = max_age
+        self.window = window
+        self.tracks = []
+        self.changed = False
+        self._ids = count(1)
+
+    def predict(self):
+        """Propage les pistes d'une image, sans détection"""
+        for track in self.tracks:
+            track.predict()
+        return self.as_detections()
+
+    def update(self, detections):
+        """Associe les détections d'une image clé aux pistes"""
+        for track in self.tracks:
+            track.predict()
+
+        xyxy, conf, cls = detections['xyxy'], detections['conf'], detections['cls']
+        high = np.flatnonzero(conf >= self.high_threshold)
+        low = np.flatnonzero((conf >= self.low_threshold) & (conf < self.high_threshold))
+
+        # Passe 1: détections sûres contre toutes les pistes
+        remaining = list(range(len(self.tracks)))
+        unmatched_high = set(high.tolist())
+        remaining, matched = self._associate(remaining, high, xyxy, cls, conf)
+        unmatched_high -= matched
+
+        # Passe 2: détections faibles contre les pistes restantes
+        remaining, _ = self._associate(remaining, low, xyxy, cls, conf)
+        newly_missed = sum(self.tracks[i].matched for i in remaining)
+        for i in remaining:
+            self.tracks[i].matched = False
+
+        # Pistes perdues trop longtemps
+        before = len(self.tracks)
+        self.tracks = [t for t in self.tracks if t.time_since_update <= self.max_age]
+        lost = before - len(self.tracks)
+
+        # Nouvelles pistes pour les détections sûres non associées
+        for i in sorted(unmatched_high):
+            self.tracks.append(Track(next(self._ids), xyxy[i], int(cls[i]), float(conf[i]), self.window))
+
+        # Piste créée, perdue ou manquée: la scène bouge, re-détecter tôt
+        self.changed = bool(lost or unmatched_high or newly_missed)
+        return self.as_detections()
+
+    def as_detections(self):
+        """Pistes associées à la dernière image clé, au format des détections brutes"""
+        # Le lissage masque le scintillement, pas une poubelle sortie du champ
+        active = [t for t in self.tracks if t.matched and t.time_since_update <= self.max_age]
+        if not active:
+            return {
+                'xyxy': np.zeros((0, 4), dtype=np.float32),
+                'conf': np.zeros(0, dtype=np.float32),
+                'cls': np.zeros(0, dtype=np.int64),
+                'track_id': np.zeros(0, dtype=np.int64)
+            }
+        smoothed = [t.smoothed() for t in active]
+        return {
+            'xyxy': np.stack([t.kalman.box for t in active]),
+            'conf': np.array([c for _, c in smoothed], dtype=np.float32),
+            'cls': np.array([k for k, _ in smoothed], dtype=np.int64),
+            'track_id': np.array([t.track_id for t in active], dtype=np.int64)
+        }
+
+    def _associate(self, track_indices, det_indices, xyxy, cls, conf):
+        if not track_indices or len(det_indices) == 0:
+            return track_indices, set()
+        track_boxes = np.stack([self.tracks[i].kalman.box for i in track_indices])
+        iou = box_iou(track_boxes, xyxy[det_indices])
+        matched_tracks, matched_dets = set(), set()
+        for row, col in greedy_match(iou, self.iou_threshold):
+            det = int(det_indices[col])
+            self.tracks[track_indices[row]].update(xyxy[det], int(cls[det]), float(conf[det]))
+            matched_tracks.add(row)
+            matched_dets.add(det)
+        remaining = [t for k, t in enumerate(track_indices) if k not in matched_tracks]
+        return remaining, matched_dets
+
+# ============================================================================
+# VÉRIFICATION
+# ============================================================================
+def check_vanished_bin(keyframes=5):
+    """
+    Une poubelle suivie puis absente des détections disparaît de la sortie
+    dès l'image clé suivante, comme sans suivi (AUCUNE_DETECTION), et reste
+    absente des images propagées; revenue, elle retrouve sa piste.
+    Renvoie la liste des écarts (vide si conforme).
+    """
+    seen = {
+        'xyxy': np.array([[100, 100, 200, 220]], dtype=np.float32),
+        'conf': np.array([0.8], dtype=np.float32),
+        'cls': np.array([0], dtype=np.int64)
+    }
+    empty = {'xyxy': np.zeros((0, 4), dtype=np.float32), 'conf': np.zeros(0, dtype=np.float32),
+             'cls': np.zeros(0, dtype=np.int64)}
+    tracker = BinTracker()
+    problems = []
+    for _ in range(keyframes):
+        if len(tracker.update(seen)['conf']) != 1:
+            problems.append("poubelle visible non rapportée")
+    track_id = int(tracker.as_detections()['track_id'][0])
+    for step in range(keyframes):
+        if len(tracker.update(empty)['conf']) or len(tracker.predict()['conf']):
+            problems.append(f"poubelle disparue encore rapportée ({step + 1} images clés après)")
+    returned = tracker.update(seen)
+    if list(returned['track_id']) != [track_id]:
+        problems.append(f"poubelle revenue sans sa piste: {list(returned['track_id'])} au lieu de [{track_id}]")
+    return problems
+
+
+def main(argv=None):
+    problems = check_vanished_bin()
+    for problem in problems:
+        print(f"❌ {problem}", file=sys.stderr)
+    if not problems:
+        print("✅ Suivi conforme: une poubelle disparue sort de la sortie à l'image clé suivante")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+🎥 Analyse vidéo
+Pipeline en trois étapes reliées par des files bornées:
+décodage (thread) → inférence par lots (thread) → dessin/encodage (appelant)
+
+La vidéo est lue image par image depuis le disque: la mémoire utilisée ne
+dépend que de la taille des files, pas de la durée de la vidéo.
+"""
+
+import queue
+import threading
+import time
+
+import cv2
+
+from detection import build_result, detect_raw_batch, DEFAULT_BATCH_SIZE
+from scheduler import SchedulerBusy
+from tracking import BinTracker, LOW_THRESHOLD
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+DEFAULT_QUEUE_SIZE = 32     # Images en attente entre deux étapes
+OUTPUT_CODECS = ('avc1', 'mp4v')  # avc1 lisible par les navigateurs si disponible
+BUSY_RETRY_DELAY = 0.05    # Première attente quand la file partagée est pleine (secondes)
+BUSY_RETRY_MAX_DELAY = 1.0 # Attente max entre deux tentatives
+
+_END = object()  # Fin de flux entre les étapes
+
+# ============================================================================
+# ANALYSEUR
+# ============================================================================
+class VideoAnalyzer:
+    """
+    Analyse une vidéo image par image.
+
+    stride: une image analysée toutes les `stride` images (les autres sont
+    sautées sans décodage). target_fps: cadence d'analyse visée; le pas est
+    adapté à la cadence source et, lorsque le pipeline prend du retard sur
+    le temps réel de la vidéo, le décodeur abandonne les images qui ne
+    trouvent pas de place dans la file au lieu d'attendre.
+
+    track: les poubelles sont suivies d'une image à l'autre (tracking.py) et
+    leur statut est lissé dans le temps. Le modèle ne tourne alors que sur
+    une image analysée sur `detect_every` (plus tôt si une piste apparaît
+    ou se perd); les pistes sont propagées entre deux détections.
+
+    Si scheduler est fourni (scheduler.py), chaque lot passe par la file
+    partagée au nom de session_id: le modèle reste utilisé par un seul
+    thread et la vidéo n'accapare pas le modèle au détriment des autres
+    sessions. File pleine (SchedulerBusy): le lot est resoumis après une
+    attente croissante, jusqu'à l'arrêt du pipeline; l'analyse ralentit
+    au lieu d'échouer.
+    """
+
+    def __init__(self, model, confidence_threshold=0.25, stride=1, target_fps=None,
+                 batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE, scheduler=None,
+                 session_id=None, track=False, detect_every=1):
+        self.model = model
+        self.confidence_threshold = confidence_threshold
+        self.stride = max(1, int(stride))
+        self.target_fps = target_fps
+        self.batch_size = max(1, int(batch_size))
+        self.queue_size = queue_size
+        self.scheduler = scheduler
+        self.session_id = session_id
+        self.track = track
+        self.detect_every = max(1, int(detect_every)) if track else 1
+        self.stats = {}
+
+    def run(self, source, output_path=None):
+        """
+        Analyse la vidéo `source` (chemin ou URL lisible par OpenCV).
+
+        Generator: produit une entrée de chronologie par image analysée, au
+        fil de l'eau. L'image annotée est écrite dans output_path si fourni.
+        """
+        capture = cv2.VideoCapture(str(source))
+        if not capture.isOpened():
+            raise ValueError(f"Vidéo illisible: {source}")
+
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        stride = self.stride
+        if self.target_fps:
+            stride = max(stride, round(source_fps / self.target_fps))
+        drop_under_load = bool(self.target_fps)
+
+        self.stats = {
+            'source_fps': source_fps,
+            'total_frames': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+            'stride': stride,
+            'decoded': 0,
+            'skipped': 0,
+            'dropped': 0,
+            'analyzed': 0,
+            'detected': 0,
+            'busy_retries': 0,
+            'elapsed': 0.0
+        }
+
+        frames = queue.Queue(maxsize=self.queue_size)
+        raws = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+
+        start_time = time.perf_counter()
+        decoder = threading.Thread(
+            target=self._decode, name="video-decode",
+            args=(capture, stride, drop_under_load, source_fps, start_time, frames, stop, errors)
+        )
+        inferer = threading.Thread(
+            target=self._infer, name="video-infer",
+            args=(frames, raws, stop, errors)
+        )
+
+        writer = None
+        decoder.start()
+        inferer.start()
+        try:
+            last_frame = None
+            last_index = -stride
+            while True:
+                item = raws.get()
+                if item is _END:
+                    break
+                index, raw = item
+
+                # Dessin de la détection sur l'image
+                result = build_result(raw, self.confidence_threshold)
+                annotated = cv2.cvtColor(result['image_with_detection'], cv2.COLOR_RGB2BGR)
+
+                if output_path is not None:
+                    if writer is None:
+                        writer = self._open_writer(output_path, source_fps / stride, annotated.shape)
+                    # Images abandonnées: la précédente est répétée pour garder le rythme
+                    for _ in range((index - last_index) // stride - 1):
+                        if last_frame is not None:
+                            writer.write(last_frame)
+                    writer.write(annotated)
+                last_frame, last_index = annotated, index
+
+                self.stats['analyzed'] += 1
+                self.stats['elapsed'] = time.perf_counter() - start_time
+                yield {
+                    'frame': index,
+                    'time': index / source_fps,
+                    'status': result['status'],
+                    'confidence': result['confidence'],
+                    'num_detections': result['num_detections'],
+                    'keyframe': raw.get('keyframe', True),
+                    'processing_time': result['processing_time']
+                }
+        finally:
+            stop.set()
+            self._drain(frames)
+            self._drain(raws)
+            decoder.join()
+            inferer.join()
+            capture.release()
+            if writer is not None:
+                writer.release()
+
+        if errors:
+            raise errors[0]
+
+    # ------------------------------------------------------------------------
+    # Étapes du pipeline
+    # ------------------------------------------------------------------------
+    def _decode(self, capture, stride, drop_under_load, source_fps, start_time, frames, stop, errors):
+        try:
+            index = -1
+            while not stop.is_set():
+                # grab() avance sans décoder: les images sautées sont gratuites
+                if not capture.grab():
+                    break
+                index += 1
+                if index % stride:
+                    self.stats['skipped'] += 1
+                    continue
+
+                ok, frame = capture.retrieve()
+                if not ok:
+                    break
+                self.stats['decoded'] += 1
+                item = (index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+                # En retard sur le temps réel: abandon si la file est pleine
+                behind = time.perf_counter() - start_time > index / source_fps
+                if drop_under_load and behind:
+                    try:
+                        frames.put_nowait(item)
+                    except queue.Full:
+                        self.stats['dropped'] += 1
+                elif not self._put(frames, item, stop):
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            self._put(frames, _END, stop)
+
+    def _infer(self, frames, raws, stop, errors):
+        # Pistes créées dès le seuil d'analyse: le suivi ne masque aucune détection
+        # que le chemin sans suivi rapporterait
+        tracker = BinTracker(high_threshold=self.confidence_threshold,
+                             low_threshold=min(LOW_THRESHOLD, self.confidence_threshold)) if self.track else None
+        since_detection = self.detect_every
+        names = None
+        try:
+            finished = False
+            while not finished and not stop.is_set():
+                # Lot: la première image est attendue, les suivantes sont prises si prêtes
+                batch = [self._get(frames, stop)]
+                while len(batch) < self.batch_size and batch[-1] is not _END:
+                    try:
+                        batch.append(frames.get_nowait())
+                    except queue.Empty:
+                        break
+                if batch[-1] is _END:
+                    batch.pop()
+                    finished = True
+                if not batch:
+                    continue
+
+                # Images clés: celles qui passent par le modèle
+                keyframes = []
+                for _ in batch:
+                    since_detection += 1
+                    keyframe = tracker is None or since_detection >= self.detect_every or tracker.changed
+                    if keyframe:
+                        since_detection = 0
+                    keyframes.append(keyframe)
+                arrays = [frame for (_, frame), keyframe in zip(batch, keyframes) if keyframe]
+
+                if not arrays:
+                    detected = iter(())
+                elif self.scheduler is not None:
+                    scheduled = self._schedule(arrays, stop)
+                    if scheduled is None:
+                        return
+                    detected = iter(scheduled)
+                else:
+                    detected = detect_raw_batch(arrays, self.model, len(arrays))
+                self.stats['detected'] += len(arrays)
+
+                for (index, frame), keyframe in zip(batch, keyframes):
+                    raw = next(detected) if keyframe else None
+                    if tracker is not None:
+                        names = raw['names'] if raw is not None else names
+                        raw = self._track(tracker, raw, frame, names)
+                    if not self._put(raws, (index, raw), stop):
+                        return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            self._put(raws, _END, stop)
+
+    def _schedule(self, arrays, stop):
+        """
+        Détection par la file partagée, par morceaux qu'elle peut accepter;
+        SchedulerBusy: nouvelle tentative après une attente croissante.
+        None si le pipeline est arrêté pendant l'attente
+        """
+        limit = max(1, min(self.scheduler.max_queue, self.scheduler.max_per_session))
+        detected = []
+        for start in range(0, len(arrays), limit):
+            chunk = arrays[start:start + limit]
+            delay = BUSY_RETRY_DELAY
+            while True:
+                try:
+                    detected.extend(self.scheduler.detect_batch(self.session_id, chunk))
+                    break
+                except SchedulerBusy:
+                    self.stats['busy_retries'] += 1
+                    if stop.wait(delay):
+                        return None
+                    delay = min(delay * 2, BUSY_RETRY_MAX_DELAY)
+        return detected
+
+    @staticmethod
+    def _track(tracker, raw, frame, names):
+        """
+        Remplace les détections par les pistes (statut lissé); sans
+        détection, les pistes sont seulement propagées
+        """
+        start = time.perf_counter()
+        if raw is None:
+            tracked = {'image': frame, 'names': names, 'detections': tracker.predict(),
+                       'timings': {}, 'keyframe': False}
+        else:
+            tracked = dict(raw, detections=tracker.update(raw['detections']),
+                           timings=dict(raw['timings']), keyframe=True)
+        tracked['timings']['track'] = time.perf_counter() - start
+        tracked['processing_time'] = sum(tracked['timings'].values())
+        return tracked
+
+    # ------------------------------------------------------------------------
+    # Utilitaires
+    # ------------------------------------------------------------------------
+    @staticmethod
+    def _put(q, item, stop):
+        """put bloquant, interrompu si le pipeline est arrêté"""
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _get(q, stop):
+        """get bloquant, fin de flux si le pipeline est arrêté"""
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    @staticmethod
+    def _drain(q):
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _open_writer(output_path, fps, shape):
+        height, width = shape[:2]
+        for codec in OUTPUT_CODECS:
+            writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*codec), fps, (width, height))
+            if writer.isOpened():
+                return writer
+        raise RuntimeError(f"Aucun encodeur vidéo disponible ({', '.join(OUTPUT_CODECS)})")
+
+
+def summarize_timeline(timeline, stats):
+    """Synthèse d'une analyse: répartition des statuts et débit"""
+    counts = {}
+    for entry in timeline:
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    return {
+        'frames_analyzed': len(timeline),
+        'status_counts': counts,
+        'analysis_fps': stats['analyzed'] / stats['elapsed'] if stats.get('elapsed') else 0.0,
+        'detection_ratio': stats['detected'] / stats['analyzed'] if stats.get('analyzed') else 0.0,
+        **stats
+    }
@@ -0,0 +1,465 @@
+"""
+🏭 Pool de processus d'inférence
+Un seul processus Python n'occupe pas tous les cœurs d'un serveur
+d'inférence. Le pool lance N processus, chacun épinglé sur une tranche
+de cœurs avec autant de threads torch. Les poids sont chargés par mmap
+(backend pytorch-mmap): les réplicas partagent les mêmes pages au lieu de
+multiplier la mémoire du modèle. Les images sont letterboxées directement
+dans un anneau de mémoire partagée par processus: seuls des numéros de
+case et les détections transitent par les files, jamais les tableaux.
+
+Mesure du passage de 1 à N processus (débit et RSS total):
+    python workers.py --workers 1,2,4 --images dossier/ --output pool.json
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import psutil
+
+from detection import (detect_raw_batch, ingest, ingest_array, map_ingested, to_rgb_array,
+                       IngestedImage, DEFAULT_BATCH_SIZE, FULL_IMGSZ)
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+CORES_PER_WORKER = int(os.environ.get("POOL_CORES_PER_WORKER", 4))    # Nombre de processus par défaut
+POOL_SLOTS = int(os.environ.get("POOL_SLOTS", DEFAULT_BATCH_SIZE))   # Cases de l'anneau = lot max par processus
+START_TIMEOUT = 600         # Chargement et préchauffage d'un processus (secondes)
+LIVENESS_INTERVAL = 1.0     # Vérification des processus arrêtés (secondes)
+DEFAULT_ROUNDS = 5          # Passages mesurés sur les images (mesure de montée en charge)
+
+
+def available_cores():
+    """Cœurs utilisables par ce processus (affinité CPU si disponible)"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_slices(cores, workers):
+    """Tranches contiguës et disjointes de cœurs, une par processus"""
+    return [slice_.tolist() for slice_ in np.array_split(np.array(cores), workers) if len(slice_)]
+
+# ============================================================================
+# PROCESSUS DE TRAVAIL
+# ============================================================================
+def _worker_main(index, weights, shm_name, slots, imgsz, cores, threads, tasks, results):
+    """
+    Boucle d'un processus: lit les numéros de case de sa file, passe les
+    cases correspondantes de l'anneau au modèle en un lot et renvoie les
+    détections (sans l'image)
+    """
+    try:
+        if cores and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cores)
+        import torch
+        from backends import exported_path, load_detector, mapped_tensors, warm_up
+
+        torch.set_num_threads(threads)
+        start = time.perf_counter()
+        model = load_detector(weights, 'pytorch-mmap')
+        warm_up(model, (1, slots), imgsz)
+        # Poids recopiés (deepcopy, conversion): chaque processus paierait sa copie
+        mapped = mapped_tensors(model, exported_path(weights, 'pytorch-mmap'))
+        if mapped is not None and mapped[0] < mapped[1]:
+            raise RuntimeError(f"poids recopiés en mémoire privée ({mapped[0]}/{mapped[1]} tenseurs projetés)")
+        shm = shared_memory.SharedMemory(name=shm_name)
+        ring = np.ndarray((slots, imgsz, imgsz, 3), dtype=np.uint8, buffer=shm.buf)
+    except Exception as e:
+        results.put(('failed', index, f"{type(e).__name__}: {e}"))
+        return
+    results.put(('ready', index, {'pid': os.getpid(), 'cores': cores, 'threads': threads,
+                                  'mapped_tensors': mapped, 'startup_seconds': time.perf_counter() - start}))
+
+    try:
+        while True:
+            # Lot opportuniste: la première case est attendue, les suivantes prises si prêtes
+            batch = [tasks.get()]
+            while batch[-1] is not None and len(batch) < slots:
+                try:
+                    batch.append(tasks.get_nowait())
+                except queue.Empty:
+                    break
+            stopping = batch[-1] is None
+            batch = [task for task in batch if task is not None]
+            if batch:
+                job_ids = [job_id for job_id, _ in batch]
+                try:
+                    raws = detect_raw_batch([ring[slot] for _, slot in batch], model, len(batch), imgsz=imgsz)
+                    results.put(('done', index, [
+                        (job_id, {k: v for k, v in raw.items() if k != 'image'})
+                        for job_id, raw in zip(job_ids, raws)
+                    ]))
+                except Exception as e:
+                    results.put(('error', index, (job_ids, f"{type(e).__name__}: {e}")))
+            if stopping:
+                return
+    finally:
+        del ring
+        shm.close()
+
+# ============================================================================
+# POOL
+# ============================================================================
+class WorkerPool:
+    """
+    N processus d'inférence, chacun avec son réplica du modèle (poids mmap
+    partagés) et son anneau de slots images en mémoire partagée.
+
+    submit(image) choisit le processus qui a le plus de cases libres,
+    letterboxe l'image directement dans une case (octets d'upload, image
+    RGB ou IngestedImage) et renvoie un Future: détections brutes au format
+    de detect_raw_batch, boîtes dans les coordonnées de l'image d'origine.
+    Sans case libre, submit attend: la mémoire reste bornée. Un processus
+    arrêté fait échouer ses requêtes en cours et ne reçoit plus d'images.
+    """
+
+    def __init__(self, weights, workers=None, threads=None, slots=POOL_SLOTS, imgsz=FULL_IMGSZ,
+                 cores=None, start_timeout=START_TIMEOUT):
+        from backends import export_model, exported_path
+
+        cores = cores or available_cores()
+        # Au plus un processus par cœur: les tranches sont disjointes
+        workers = min(workers or max(1, len(cores) // CORES_PER_WORKER), len(cores))
+        self.slots = max(1, int(slots))
+        self.imgsz = imgsz
+        self.stats = {'submitted': 0, 'completed': 0, 'errors': 0, 'batches': 0}
+        self.workers = []
+
+        # Export unique avant le lancement: les processus ne font que projeter le fichier
+        export_model(weights, 'pytorch-mmap')
+        self.mapped_path = exported_path(weights, 'pytorch-mmap')
+
+        context = multiprocessing.get_context("spawn")
+        self._results = context.Queue()
+        self._cond = threading.Condition()
+        self._jobs = {}
+        self._ids = itertools.count()
+        frame_bytes = imgsz * imgsz * 3
+        for index, worker_cores in enumerate(core_slices(cores, workers)):
+            shm = shared_memory.SharedMemory(create=True, size=self.slots * frame_bytes)
+            tasks = context.Queue()
+            process = context.Process(
+                target=_worker_main, name=f"inference-worker-{index}", daemon=True,
+                args=(index, str(weights), shm.name, self.slots, imgsz, worker_cores,
+                      threads or len(worker_cores), tasks, self._results)
+            )
+            process.start()
+            self.workers.append({
+                'process': process,
+                'tasks': tasks,
+                'shm': shm,
+                'ring': np.ndarray((self.slots, imgsz, imgsz, 3), dtype=np.uint8, buffer=shm.buf),
+                'free': deque(range(self.slots)),
+                'cores': worker_cores,
+                'info': None,
+                'dead': False
+            })
+
+        try:
+            self._wait_ready(start_timeout)
+        except Exception:
+            self.close()
+            raise
+        self._collector = threading.Thread(target=self._collect, name="pool-results", daemon=True)
+        self._collector.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------------
+    # Soumission
+    # ------------------------------------------------------------------------
+    def submit(self, image):
+        with self._cond:
+            while True:
+                alive = [w for w in self.workers if not w['dead']]
+                if not alive:
+                    raise RuntimeError("Aucun processus d'inférence en marche")
+                worker = max(alive, key=lambda w: len(w['free']))
+                if worker['free']:
+                    slot = worker['free'].popleft()
+                    break
+                self._cond.wait()
+
+        # Letterbox écrit directement dans la case partagée
+        try:
+            out = worker['ring'][slot]
+            if isinstance(image, (bytes, bytearray)):
+                image = ingest(bytes(image), self.imgsz, out=out)
+            elif isinstance(image, IngestedImage) and image.letterboxed.shape == out.shape:
+                np.copyto(out, image.letterboxed)
+                image = IngestedImage(image.display, out, image.gain, image.pad, image.scale,
+                                      image.original_size, image.timings)
+            else:
+                image = ingest_array(to_rgb_array(image), self.imgsz, out=out)
+        except Exception:
+            self._release(worker, slot)
+            raise
+
+        future = Future()
+        job_id = next(self._ids)
+        with self._cond:
+            if worker['dead']:
+                raise RuntimeError("Processus d'inférence arrêté pendant la soumission")
+            self._jobs[job_id] = (future, image, worker, slot)
+            self.stats['submitted'] += 1
+        worker['tasks'].put((job_id, slot))
+        return future
+
+    def detect_batch(self, images):
+        """Détection bloquante de plusieurs images, réparties sur les processus (ordre conservé)"""
+        return [future.result() for future in [self.submit(image) for image in images]]
+
+    # ------------------------------------------------------------------------
+    # Résultats
+    # ------------------------------------------------------------------------
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        pending = len(self.workers)
+        while pending:
+            try:
+                kind, index, payload = self._results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                for index, worker in enumerate(self.workers):
+                    if worker['info'] is None and not worker['process'].is_alive():
+                        raise RuntimeError(f"Processus {index} arrêté au démarrage "
+                                           f"(code {worker['process'].exitcode})")
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{pending} processus non prêts après {timeout:.0f}s")
+                continue
+            if kind == 'failed':
+                raise RuntimeError(f"Processus {index}: {payload}")
+            self.workers[index]['info'] = payload
+            pending -= 1
+
+    def _collect(self):
+        while True:
+            try:
+                message = self._results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                return
+            self._check_alive()
+            if not message:
+                continue
+            kind, index, payload = message
+            if kind == 'done':
+                self.stats['batches'] += 1
+                for job_id, raw in payload:
+                    job = self._pop(job_id)
+                    if job is None:
+                        continue
+                    future, image, worker, slot = job
+                    self._release(worker, slot)
+                    raw['image'] = image.display
+                    future.set_result(map_ingested(image, raw))
+            elif kind == 'error':
+                job_ids, error = payload
+                for job_id in job_ids:
+                    job = self._pop(job_id)
+                    if job is None:
+                        continue
+                    future, _, worker, slot = job
+                    self._release(worker, slot)
+                    self.stats['errors'] += 1
+                    future.set_exception(RuntimeError(error))
+
+    def _check_alive(self):
+        """Processus arrêtés: leurs requêtes en cours échouent au lieu d'attendre indéfiniment"""
+        for index, worker in enumerate(self.workers):
+            if worker['dead'] or worker['process'].is_alive():
+                continue
+            with self._cond:
+                worker['dead'] = True
+                lost = [job_id for job_id, job in self._jobs.items() if job[2] is worker]
+                failed = [self._jobs.pop(job_id)[0] for job_id in lost]
+                self.stats['errors'] += len(failed)
+                self._cond.notify_all()
+            error = RuntimeError(f"Processus {index} arrêté (code {worker['process'].exitcode})")
+            for future in failed:
+                future.set_exception(error)
+
+    def _pop(self, job_id):
+        """Requête terminée, ou None si elle a déjà échoué (processus arrêté)"""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+            if job is not None:
+                self.stats['completed'] += 1
+            return job
+
+    def _release(self, worker, slot):
+        with self._cond:
+            worker['free'].append(slot)
+            self._cond.notify()
+
+    # ------------------------------------------------------------------------
+    # Mémoire et arrêt
+    # ------------------------------------------------------------------------
+    def memory(self):
+        """
+        RSS de chaque processus et totaux. Les pages partagées (poids mmap,
+        bibliothèques) sont comptées dans le RSS de chaque processus; le PSS
+        (Linux) les répartit entre eux et donne l'empreinte réelle. weights_*:
+        part du fichier de poids projeté (None hors Linux).
+        """
+        from backends import mapped_memory
+
+        rows = []
+        for role, pid in [('parent', os.getpid())] + [('worker', w['info']['pid']) for w in self.workers]:
+            info = psutil.Process(pid).memory_full_info()
+            weights = mapped_memory(pid, self.mapped_path)
+            rows.append({
+                'role': role,
+                'pid': pid,
+                'rss_mb': info.rss / 2**20,
+                'pss_mb': getattr(info, 'pss', info.rss) / 2**20,
+                'uss_mb': info.uss / 2**20,
+                'weights_rss_mb': weights['rss'] / 2**20 if weights else None,
+                'weights_pss_mb': weights['pss'] / 2**20 if weights else None
+            })
+        return {
+            'processes': rows,
+            'total_rss_mb': sum(row['rss_mb'] for row in rows),
+            'total_pss_mb': sum(row['pss_mb'] for row in rows),
+            'weights_file_mb': self.mapped_path.stat().st_size / 2**20,
+            'shared_ring_mb': sum(w['shm'].size for w in self.workers) / 2**20
+        }
+
+    def info(self):
+        return [dict(w['info'] or {}, alive=w['process'].is_alive()) for w in self.workers]
+
+    def close(self, timeout=10.0):
+        for worker in self.workers:
+            if worker['process'].is_alive():
+                worker['tasks'].put(None)
+        for worker in self.workers:
+            worker['process'].join(timeout)
+            if worker['process'].is_alive():
+                worker['process'].terminate()
+            del worker['ring']
+            worker['shm'].close()
+            worker['shm'].unlink()
+        self._results.put(None)
+        self.workers = []
+
+# ============================================================================
+# MONTÉE EN CHARGE
+# ============================================================================
+def sharing_problems(memory):
+    """
+    Poids réellement partagés: chaque processus de travail projette le
+    fichier et le PSS des poids, tous processus confondus, ne dépasse pas
+    une copie du fichier (sinon le PSS ne baisse pas avec les processus).
+    Liste des écarts, vide si tout va bien ou si la mesure manque (hors Linux).
+    """
+    workers = [row for row in memory['processes'] if row['role'] == 'worker']
+    if any(row['weights_pss_mb'] is None for row in workers):
+        return []
+    size = memory['weights_file_mb']
+    problems = [f"processus {row['pid']}: {row['weights_rss_mb']:.1f} MB projetés sur {size:.1f} MB de poids"
+                for row in workers if row['weights_rss_mb'] < 0.5 * size]
+    total_pss = sum(row['weights_pss_mb'] for row in memory['processes'])
+    if total_pss > 1.1 * size:
+        problems.append(f"PSS des poids {total_pss:.1f} MB pour un fichier de {size:.1f} MB: pages non partagées")
+    return problems
+
+
+def measure_scaling(weights, images, worker_counts, threads=None, rounds=DEFAULT_ROUNDS, slots=POOL_SLOTS):
+    """
+    Débit et mémoire du pool pour chaque nombre de processus; accélération
+    et efficacité rapportées au premier nombre mesuré
+    """
+    cores = available_cores()
+    rows = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        with WorkerPool(weights, workers, threads, slots, cores=cores) as pool:
+            startup = time.perf_counter() - start
+            pool.detect_batch(images)   # Préchauffage du chemin complet
+            start = time.perf_counter()
+            for _ in range(rounds):
+                pool.detect_batch(images)
+            elapsed = time.perf_counter() - start
+            memory = pool.memory()
+            rows.append({
+                'workers': len(pool.workers),
+                'cores_per_worker': [len(info['cores']) for info in pool.info()],
+                'startup_seconds': startup,
+                'images': len(images) * rounds,
+                'throughput_ips': len(images) * rounds / elapsed,
+                'mean_batch_size': pool.stats['completed'] / pool.stats['batches'] if pool.stats['batches'] else 0.0,
+                'total_rss_mb': memory['total_rss_mb'],
+                'total_pss_mb': memory['total_pss_mb'],
+                'sharing_problems': sharing_problems(memory),
+                'memory': memory
+            })
+
+    base = rows[0] if rows else None
+    for row in rows:
+        row['speedup'] = row['throughput_ips'] / base['throughput_ips'] if base['throughput_ips'] else 0.0
+        row['efficiency'] = row['speedup'] * base['workers'] / row['workers']
+    return {'cores': len(cores), 'results': rows}
+
+# ============================================================================
+# LIGNE DE COMMANDE
+# ============================================================================
+def main(argv=None):
+    from backends import find_weights, load_parity_images
+
+    parser = argparse.ArgumentParser(description="Montée en charge du pool de processus d'inférence")
+    parser.add_argument("--weights", type=Path, default=None, help="Poids .pt (défaut: recherche)")
+    parser.add_argument("--images", type=Path, default=None, help="Dossier d'images (défaut: synthétiques)")
+    parser.add_argument("--count", type=int, default=32, help="Images par passage")
+    parser.add_argument("--workers", default=None, help="Nombres de processus, ex: 1,2,4 (défaut: 1 et le maximum)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads torch par processus (défaut: ses cœurs)")
+    parser.add_argument("--slots", type=int, default=POOL_SLOTS, help="Cases de l'anneau par processus")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--output", type=Path, default=None, help="Rapport JSON (défaut: stdout)")
+    args = parser.parse_args(argv)
+
+    weights = args.weights or find_weights()
+    if weights is None:
+        parser.error("best.pt introuvable")
+
+    if args.workers:
+        worker_counts = [int(w) for w in args.workers.split(",")]
+    else:
+        worker_counts = sorted({1, max(1, len(available_cores()) // CORES_PER_WORKER)})
+
+    report = measure_scaling(weights, load_parity_images(args.images, args.count), worker_counts,
+                             args.threads, args.rounds, args.slots)
+    for row in report['results']:
+        print(f"{row['workers']} processus: {row['throughput_ips']:.1f} img/s (x{row['speedup']:.2f}, "
+              f"efficacité {row['efficiency']*100:.0f}%) • RSS total {row['total_rss_mb']:.0f} MB, "
+              f"PSS {row['total_pss_mb']:.0f} MB", file=sys.stderr)
+        for problem in row['sharing_problems']:
+            print(f"⚠️ Poids non partagés: {problem}", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    return 1 if any(row['sharing_problems'] for row in report['results']) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())